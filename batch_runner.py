@@ -0,0 +1,269 @@
+# ============================================================================
+# Batch Runner
+# ============================================================================
+
+"""
+Runs many values checks (e.g. every district's DAP, JFMP and NBFT program)
+back to back against shared warm caches.
+
+Jobs come from a JSON manifest. Every job is a set of Settings fields (at least
+input_data), on top of the manifest defaults and the configuration in
+gipps_values_checking_tool.py:
+
+    {
+        "workspace": "C:\\\\data\\\\temp\\\\season_2025",
+        "defaults": {"themes": ["forests", "biodiversity", "water", "heritage", "summary"]},
+        "jobs": [
+            {"input_data": "C:\\\\data\\\\gippsdap\\\\Tambo_DAP.shp", "mode": "DAP", "district": "Tambo"},
+            {"input_data": "C:\\\\data\\\\gippsdap\\\\JFMP_2526.shp", "mode": "JFMP", "name": "jfmp_2526"}
+        ]
+    }
+
+Each job writes its outputs to its own folder under the workspace (its name,
+or input/mode/district). A batch summary CSV is written to the workspace.
+
+What is shared between the jobs run by a process:
+    - geometry backend (arcpy imported and set up once)
+    - values sources read by more than one job, read once for the extent of
+      every input in the batch grown by the largest buffer, and kept loaded
+      and spatially indexed (WarmSources) until no later job reads them -
+      each job only prunes them to its own works
+    - risk registers, loaded once per mode
+    - buffer cache (on disk, keyed by works content, locked between processes)
+
+Jobs are spread over --workers processes, largest input first, each process
+keeping its own warm caches. Phase 2 of each job runs in its process
+(Settings.workers is 1 for batch jobs).
+
+Usage:
+    python batch_runner.py season_manifest.json --workers 3
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from collections import Counter
+from typing import Dict, List, Set
+
+import gipps_values_checking_tool as tool
+from geometry_backend import get_backend
+from source_cache import WarmSources
+
+# Batch summary CSV columns, in order
+SUMMARY_FIELDS = ['name', 'input_data', 'mode', 'district', 'success', 'error', 'seconds', 'rows', 'outputs']
+
+# Extent layer covering every input of the batch
+EXTENT_LAYER = "batch_extent"
+
+
+def load_manifest(path: str) -> Dict:
+    """Read a batch manifest; every job needs an input_data"""
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest.setdefault('workspace', tool.WORKSPACE)
+    manifest.setdefault('defaults', {})
+    for i, job in enumerate(manifest.get('jobs', [])):
+        if 'input_data' not in job:
+            raise ValueError(f"Job {i + 1} in {path} has no input_data")
+    return manifest
+
+
+def job_name(job: Dict) -> str:
+    """Output folder name of a job"""
+    if job.get('name'):
+        return job['name']
+    parts = [Path(job['input_data']).stem, job.get('mode'), job.get('district')]
+    return "_".join(str(part).replace(" ", "_") for part in parts if part)
+
+
+def input_size(path: str) -> int:
+    """Bytes on disk of a works input (a shapefile's .shp, with or without extension); 0 if it is not a plain file, e.g. a feature class"""
+    for candidate in (str(path), f"{path}.shp"):
+        if os.path.isfile(candidate):
+            return os.path.getsize(candidate)
+    return 0
+
+
+def job_settings(job: Dict, defaults: Dict, workspace: Path) -> tool.Settings:
+    """Settings for one job: tool configuration, then manifest defaults, then the job's own fields"""
+    fields = {
+        'mode': tool.MODE,
+        'themes': tool.THEMES,
+        'district': tool.DISTRICT,
+        'backend': tool.BACKEND,
+        'buffer_cache': tool.BUFFER_CACHE,
+        'buffer_cache_max_mb': tool.BUFFER_CACHE_MAX_MB,
+        'previous_run': tool.PREVIOUS_RUN,
+        'output_formats': tool.OUTPUT_FORMATS,
+        'risk_registers': tool.RISK_REGISTERS,
+        'risk_register_field': tool.RISK_REGISTER_FIELD,
+        'lod_tolerance': tool.LOD_TOLERANCE,
+        'spatial_index': tool.SPATIAL_INDEX,
+        'snapshots': tool.SNAPSHOTS,
+        'prefetch': tool.PREFETCH,
+    }
+    fields.update(defaults)
+    fields.update({key: value for key, value in job.items() if key != 'name'})
+    fields['workspace'] = workspace / job_name(job)
+    fields['workers'] = 1   # the batch runs jobs in parallel instead
+    workspace.mkdir(parents=True, exist_ok=True)
+    return tool.Settings(**fields)
+
+
+def source_paths(settings: tool.Settings) -> Set[str]:
+    """Values source paths a job reads (from its compiled plan - no data is read)"""
+    return {overlay.path for overlay in tool.ValuesChecker(settings).plan().overlays}
+
+
+class BatchWorker:
+    """Runs jobs one after another in this process, sharing a backend and warm caches"""
+
+    def __init__(self, backend, extent_layer, distance: float, logger: logging.Logger, shared: Set[str]):
+        self.backend = backend
+        self.logger = logger
+        self.warm_sources = WarmSources(backend, extent_layer, distance, logger, shared)
+        self.register_cache = {}
+
+    def run(self, job: Dict, settings: tool.Settings, later_sources: Set[str]) -> Dict:
+        """Run one job, then release the warm sources not in later_sources (read by jobs still to start); returns its summary row"""
+        self.logger.info(f"Batch job {job_name(job)}: {settings.input_data} ({settings.mode})")
+        start = time.perf_counter()
+        checker = tool.ValuesChecker(settings, backend=self.backend, warm_sources=self.warm_sources,
+                                     register_cache=self.register_cache)
+        result = checker.process()
+        self.warm_sources.release(later_sources)
+        return {
+            'name': job_name(job),
+            'input_data': settings.input_data,
+            'mode': settings.mode,
+            'district': settings.district,
+            'success': result['success'],
+            'error': result.get('error'),
+            'seconds': round(time.perf_counter() - start, 2),
+            'rows': sum(result['counts'].values()) if result['success'] else None,
+            'outputs': len(result.get('outputs', [])),
+        }
+
+
+# Worker used by this batch process (set by _init_batch_worker)
+_batch_worker = None
+
+def _init_batch_worker(backend_name: str, workspace: Path, data_paths: Dict[str, str], shared_extent, distance: float,
+                       shared: Set[str]):
+    """Process pool initializer - one backend and set of warm caches per process"""
+    global _batch_worker
+    tool.DATA_PATHS.update(data_paths)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    backend = get_backend(backend_name)
+    backend.setup_environment(workspace)
+    extent_layer = backend.attach(shared_extent, EXTENT_LAYER)
+    backend.pin(extent_layer)
+    _batch_worker = BatchWorker(backend, extent_layer, distance, logging.getLogger(__name__), shared)
+
+def _run_batch_job(job: Dict, settings: tool.Settings, later_sources: Set[str]) -> Dict:
+    """Process pool task - run one job in this process"""
+    return _batch_worker.run(job, settings, later_sources)
+
+
+def run_batch(manifest: Dict, workers: int = 1, logger: logging.Logger = None) -> List[Dict]:
+    """Run every job in the manifest; returns summary rows in manifest order"""
+    logger = logger or logging.getLogger(__name__)
+    workspace = Path(manifest['workspace'])
+    workspace.mkdir(parents=True, exist_ok=True)
+    jobs = manifest['jobs']
+    settings = [job_settings(job, manifest['defaults'], workspace) for job in jobs]
+    backend_names = {job_setting.backend for job_setting in settings}
+    if len(backend_names) > 1:
+        raise ValueError(f"Batch jobs must use one backend, got {', '.join(sorted(backend_names))}")
+
+    backend = get_backend(backend_names.pop())
+    backend.setup_environment(workspace)
+
+    # Largest inputs first, so the longest job is never left until last - file size stands in for feature count,
+    # which would read every input once more on top of the envelope below
+    sizes = [input_size(job_setting.input_data) for job_setting in settings]
+    order = sorted(range(len(jobs)), key=lambda i: sizes[i], reverse=True)
+
+    # Sources are read once for all works, out to the largest buffer any job uses
+    extent_layer = backend.envelope([job_setting.input_data for job_setting in settings], EXTENT_LAYER)
+    backend.pin(extent_layer)
+    distance = max(tool.ValuesChecker._resolve_buffer_band(name)[1] for name in tool.BUFFERS)
+    logger.info(f"Running {len(jobs)} batch jobs on {workers} worker(s), sources read to {distance:g}m of all works")
+
+    # Only sources read by more than one job are kept warm, and each is released once no job still to start reads it.
+    # Jobs start in order (the pool hands them out as submitted), so after job order[n] only order[n + 1:] can need a source.
+    sources = [source_paths(job_setting) for job_setting in settings]
+    uses = Counter(path for job_sources in sources for path in job_sources)
+    shared = {path for path, count in uses.items() if count > 1}
+    later_sources, later = {}, set()
+    for i in reversed(order):
+        later_sources[i] = later & shared
+        later = later | sources[i]
+
+    summaries = {}
+    if workers <= 1:
+        worker = BatchWorker(backend, extent_layer, distance, logger, shared)
+        for i in order:
+            summaries[i] = worker.run(jobs[i], settings[i], later_sources[i])
+        worker.warm_sources.clear()
+    else:
+        scratch = workspace / "scratch"
+        shared_extent = backend.share(extent_layer, scratch)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                     initargs=(backend.name, workspace, tool.DATA_PATHS, shared_extent, distance, shared)) as executor:
+                futures = {executor.submit(_run_batch_job, jobs[i], settings[i], later_sources[i]): i for i in order}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        summaries[i] = future.result()
+                    except Exception as e:
+                        logger.warning(f"Batch job {job_name(jobs[i])} failed: {e}")
+                        summaries[i] = {'name': job_name(jobs[i]), 'input_data': settings[i].input_data, 'mode': settings[i].mode,
+                                        'district': settings[i].district, 'success': False, 'error': str(e)}
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    return [summaries[i] for i in range(len(jobs))]
+
+
+def write_summary(summaries: List[Dict], workspace: Path) -> str:
+    """Write the batch summary CSV to the workspace; returns its path"""
+    path = Path(workspace) / f"{datetime.now().strftime('%Y%m%d')}_batch_summary.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(summaries)
+    return str(path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run a batch of values checks against shared warm caches")
+    parser.add_argument("manifest", help="JSON manifest of jobs")
+    parser.add_argument("--workers", type=int, default=tool.WORKERS, help="jobs run at once, each process keeping its own caches")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    manifest = load_manifest(args.manifest)
+    start = time.perf_counter()
+    summaries = run_batch(manifest, args.workers)
+    summary_path = write_summary(summaries, manifest['workspace'])
+
+    print("=" * 60)
+    for summary in summaries:
+        status = "OK" if summary['success'] else f"FAILED: {summary['error']}"
+        print(f"  {summary['name']:<40}{summary.get('seconds') or 0:>8.1f}s  {status}")
+    print(f"Batch finished in {time.perf_counter() - start:.1f}s - summary: {summary_path}")
+    return 0 if all(summary['success'] for summary in summaries) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# ============================================================================
+# Result Store Memory Benchmark
+# ============================================================================
+
+"""
+Memory per result of a ResultBatch against the dict per result it replaced.
+
+Builds synthetic aggregated join rows for a few DATASET_MATRIX entries, checks
+a batch iterates to the same result dicts, then measures (tracemalloc) what
+each store holds on top of the rows themselves - with the mitigation column
+added, as the theme writers see them.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_result_store [rows]
+"""
+
+import sys
+import tracemalloc
+
+from benchmarks.bench_row_builder import DATASETS, DATE_CHECKED, MODE, make_rows
+from dataset_matrix import DATASET_MATRIX
+from geometry_backend import BAND_FIELD
+from gipps_values_checking_tool import (DESCRIPTION_FIELD, DISTRICT_FIELD, ID_FIELD, NAME_FIELD, RISK_LEVEL_FIELD,
+                                        DatasetConfig)
+from mitigation_engine import MitigationEngine
+from qbid_matrix import QBID_MATRIX
+from row_builder import RowBuilder
+
+
+def build_dicts(builder: RowBuilder, rows: list, engine: MitigationEngine, theme: str) -> list:
+    """A dict per result, mitigated the way results were before ResultBatch"""
+    results = [builder.build(row) for row in rows]
+    mitigations = engine.apply(theme, _batch(builder, rows)).column('mitigation')
+    for result, mitigation in zip(results, mitigations):
+        result['mitigation'] = mitigation
+    return results
+
+
+def build_batch(builder: RowBuilder, rows: list, engine: MitigationEngine, theme: str):
+    return engine.apply(theme, _batch(builder, rows))
+
+
+def _batch(builder: RowBuilder, rows: list):
+    batch = builder.new_batch()
+    for row in rows:
+        batch.append(builder.record(row))
+    return batch
+
+
+def retained_bytes(build, *args) -> tuple:
+    """(result, bytes still allocated by build once it returns)"""
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    result = build(*args)
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, end - start
+
+
+def main(count: int = 200_000):
+    engine = MitigationEngine(MODE)
+    print(f"{'dataset':<15}{'dict bytes/result':>20}{'batch bytes/result':>20}{'saving':>10}")
+    for theme, dataset_name in DATASETS:
+        config = DatasetConfig(**DATASET_MATRIX[theme][dataset_name])
+        valid_fields = [ID_FIELD, NAME_FIELD, DESCRIPTION_FIELD, DISTRICT_FIELD, RISK_LEVEL_FIELD]
+        valid_fields += config.fields + [BAND_FIELD, 'X', 'Y']
+        rows = make_rows(valid_fields, count)
+
+        works_fields = [ID_FIELD, DISTRICT_FIELD, NAME_FIELD, DESCRIPTION_FIELD, RISK_LEVEL_FIELD]
+        builder = RowBuilder(valid_fields, config, theme, DATE_CHECKED, works_fields, QBID_MATRIX.get(MODE, {}).get(theme))
+
+        # Same results, same key order
+        sample = rows[:1000]
+        expected = build_dicts(builder, sample, engine, theme)
+        actual = list(build_batch(builder, sample, engine, theme))
+        assert [list(result.items()) for result in expected] == [list(result.items()) for result in actual]
+
+        dicts, dict_bytes = retained_bytes(build_dicts, builder, rows, engine, theme)
+        del dicts
+        batch, batch_bytes = retained_bytes(build_batch, builder, rows, engine, theme)
+        del batch
+        print(f"{dataset_name:<15}{dict_bytes / count:>20,.0f}{batch_bytes / count:>20,.0f}{dict_bytes / batch_bytes:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,128 @@
+# ============================================================================
+# Row Builder Micro-benchmark
+# ============================================================================
+
+"""
+Rows/sec of RowBuilder against the per-row list.index lookups it replaced.
+
+Builds synthetic aggregated join rows for a few DATASET_MATRIX entries, checks
+both builders give identical results, then times each.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_row_builder [rows]
+"""
+
+import random
+import sys
+import time
+
+from dataset_matrix import DATASET_MATRIX
+from geometry_backend import BAND_FIELD
+from gipps_values_checking_tool import (DESCRIPTION_FIELD, DISTRICT_FIELD, ID_FIELD, NAME_FIELD, RISK_LEVEL_FIELD,
+                                        DatasetConfig)
+from qbid_matrix import QBID_MATRIX
+from row_builder import RowBuilder
+
+MODE = "JFMP"
+DATE_CHECKED = "20250707"
+DATASETS = [("biodiversity", "vba_fauna25"), ("biodiversity", "evc"), ("forests", "fmz")]
+
+
+def legacy_build_row(row: tuple, valid_fields, config: DatasetConfig, theme: str) -> dict:
+    """_build_result_row and _build_quickbase_id as they were before RowBuilder"""
+    result = {
+        'UNIQUE_ID':   row[valid_fields.index(f'{ID_FIELD}')],
+        'DISTRICT':    row[valid_fields.index(f'{DISTRICT_FIELD}')],
+        'NAME':        row[valid_fields.index(f'{NAME_FIELD}')],
+        'DESCRIPTION': row[valid_fields.index(f'{DESCRIPTION_FIELD}')],
+        'RISK_LVL':    row[valid_fields.index(f'{RISK_LEVEL_FIELD}')],
+        'Theme': theme,
+        'Value_Type': config.value_type,
+        'Buffer': row[valid_fields.index(BAND_FIELD)],
+        'Value': None,
+        'Value_Description': None,
+        'Value_ID': None,
+        'X': int(row[valid_fields.index('X')] or 0),
+        'Y': int(row[valid_fields.index('Y')] or 0),
+        'QBID': None,
+        'QBID_Alt': None,
+        'DATE_CHECKED': DATE_CHECKED
+    }
+    if isinstance(config.value_field, str):
+        result['Value'] = row[valid_fields.index(config.value_field)]
+    elif isinstance(config.value_field, list):
+        vf_values = []
+        for vf in config.value_field:
+            vf_values.append(row[valid_fields.index(vf)])
+        result['Value'] = ", ".join(str(item) for item in vf_values)
+    if config.id_field:
+        result['Value_ID'] = row[valid_fields.index(config.id_field)]
+    if config.description_field:
+        result['Value_Description'] = row[valid_fields.index(config.description_field)]
+    for fieldname in config.fields:
+        if fieldname not in result:
+            if fieldname not in filter(None, [config.value_field, config.id_field, config.description_field]):
+                result[fieldname] = row[valid_fields.index(fieldname)] or 'Field not found'
+
+    try:
+        qbid_fields = QBID_MATRIX[MODE][theme]
+        result['QBID_Test'] = "|".join(str(result[item]) for item in qbid_fields if result[item] not in [None, "", 0])
+    except Exception:
+        qbid_fields = ["UNIQUE_ID", "Value_Type", "Value", "Value_ID"]
+        result['QBID_Test'] = "|".join(str(result[item]) for item in qbid_fields if result[item] not in [None, "", 0])
+
+    qbid_fields = ["UNIQUE_ID", "Value_Type", "Value", "Value_ID", "X", "Y"]
+    result['QBID_Alt'] = "|".join(str(result[item]) for item in qbid_fields if result[item] not in [None, "", 0])
+    return result
+
+
+def make_rows(valid_fields, count: int, seed: int = 1) -> list:
+    """Synthetic aggregated join rows: some nulls and zeros, like real cursor output"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        row = []
+        for name in valid_fields:
+            if name in ("X", "Y"):
+                row.append(float(rng.randint(2_000_000, 3_000_000)))
+            elif name == BAND_FIELD:
+                row.append(rng.choice(["500m", "1000m_ring"]))
+            elif name == ID_FIELD:
+                row.append(f"DAP{i % 500:04d}")
+            else:
+                row.append(rng.choice([None, "", 0, f"{name}_{rng.randint(1, 50)}"]))
+        rows.append(tuple(row))
+    return rows
+
+
+def rows_per_second(build, rows) -> float:
+    start = time.perf_counter()
+    for row in rows:
+        build(row)
+    return len(rows) / (time.perf_counter() - start)
+
+
+def main(count: int = 200_000):
+    print(f"{'dataset':<15}{'legacy rows/s':>16}{'RowBuilder rows/s':>20}{'speedup':>10}")
+    for theme, dataset_name in DATASETS:
+        config = DatasetConfig(**DATASET_MATRIX[theme][dataset_name])
+        valid_fields = [ID_FIELD, NAME_FIELD, DESCRIPTION_FIELD, DISTRICT_FIELD, RISK_LEVEL_FIELD]
+        valid_fields += config.fields + [BAND_FIELD, 'X', 'Y']
+        rows = make_rows(valid_fields, count)
+
+        works_fields = [ID_FIELD, DISTRICT_FIELD, NAME_FIELD, DESCRIPTION_FIELD, RISK_LEVEL_FIELD]
+        builder = RowBuilder(valid_fields, config, theme, DATE_CHECKED, works_fields, QBID_MATRIX.get(MODE, {}).get(theme))
+        legacy = lambda row: legacy_build_row(row, valid_fields, config, theme)
+
+        # Same results, same key order
+        for row in rows[:1000]:
+            expected, actual = legacy(row), builder.build(row)
+            assert list(expected.items()) == list(actual.items()), (expected, actual)
+
+        legacy_rate = rows_per_second(legacy, rows)
+        builder_rate = rows_per_second(builder.build, rows)
+        print(f"{dataset_name:<15}{legacy_rate:>16,.0f}{builder_rate:>20,.0f}{builder_rate / legacy_rate:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,232 @@
+# ============================================================================
+# Synthetic Benchmark Fixtures
+# ============================================================================
+
+"""
+Synthetic works and values layers at Gippsland scale, for benchmarking.
+
+Works are polygons or lines (one geometry type per layer, like a works
+shapefile) clustered around a number of district centres.
+Values layers are written for every source path in DATASET_MATRIX, at the same
+paths (geodatabase layers or GeoPackages) under one folder per DATA_PATHS key,
+with:
+    - every field the datasets reading that source use (fields, value/id/
+      description fields and where_clause fields)
+    - where_clause fields filled mostly with the literals the clauses test
+      for, so a realistic share of features pass the selection
+    - point, line or polygon geometry depending on the source (polygons are
+      boxes, or densely digitised outlines like NV2005_EVCBCS with
+      polygon_vertices)
+    - features spread over the whole region, so most are far from any works
+
+Requires geopandas, shapely and pyogrio with the OpenFileGDB driver.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from dataset_matrix import DATASET_MATRIX
+from geometry_backend import OUTPUT_WKID
+
+# Region covered by the values layers and district centres (VICGRID2020 metres, roughly Gippsland)
+REGION = (2_600_000, 2_330_000, 2_950_000, 2_500_000)
+
+# Source geometry types - anything not listed is polygons
+POINT_SOURCES = {
+    "VBA_FAUNA25", "VBA_FLORA25", "VBA_FAUNA_THREATENED", "VBA_FLORA_THREATENED", "VBA_FAUNA_RESTRICTED",
+    "VBA_FLORA_RESTRICTED", "HIST100_POINT", "EG_GIANT_TREES", "EG_ALPINE_HUT_SURVEY", "MINSITE",
+    "RECWEB_SITE", "RECWEB_ASSET", "RECWEB_SIGN", "RECWEB_CARPARK", "RECWEB_HISTORIC_RELIC",
+}
+LINE_SOURCES = {"HY_WATERCOURSE", "POWER_LINE", "FOI_LINE", "TR_RAIL"}
+
+# FIELD <op> operand in a where clause
+_CONDITION = re.compile(
+    r"\b([A-Za-z_][A-Za-z0-9_]*)\s*(<>|>=|<=|=|>|<|\bin\b)\s*(date\s*'[^']*'|\([^)]*\)|'[^']*'|-?[0-9.]+)",
+    re.IGNORECASE
+)
+
+
+def parse_where_fields(where_clause: str) -> Dict[str, Dict]:
+    """Fields tested by a where clause: {field: {'type': 'str'|'num'|'date', 'values': [literals]}}"""
+    fields = {}
+    for name, _, operand in _CONDITION.findall(where_clause or ""):
+        spec = fields.setdefault(name, {'type': 'str', 'values': []})
+        if operand.lower().startswith("date"):
+            spec['type'] = 'date'
+        elif re.fullmatch(r"-?[0-9.]+", operand):
+            spec['type'] = 'num'
+            spec['values'].append(float(operand))
+        else:
+            spec['values'].extend(re.findall(r"'([^']*)'", operand))
+    return fields
+
+
+def source_schemas() -> Dict[str, Dict]:
+    """Every source path in DATASET_MATRIX with the union of fields its datasets need"""
+    schemas = {}
+    for theme_datasets in DATASET_MATRIX.values():
+        for config in theme_datasets.values():
+            schema = schemas.setdefault(config['path'], {})
+            for name, spec in parse_where_fields(config.get('where_clause')).items():
+                existing = schema.setdefault(name, {'type': spec['type'], 'values': []})
+                existing['values'].extend(value for value in spec['values'] if value not in existing['values'])
+
+            named = list(config.get('fields', []))
+            for key in ('value_field', 'id_field', 'description_field'):
+                value = config.get(key)
+                named.extend(value if isinstance(value, list) else [value] if value else [])
+            for name in named:
+                schema.setdefault(name, {'type': 'id' if name.upper().endswith(("_ID", "_NO", "ID")) else 'str', 'values': []})
+    return schemas
+
+
+def _district_centres(districts: int, rng) -> np.ndarray:
+    xmin, ymin, xmax, ymax = REGION
+    return np.column_stack([rng.uniform(xmin + 20_000, xmax - 20_000, districts),
+                            rng.uniform(ymin + 20_000, ymax - 20_000, districts)])
+
+
+def make_works(count: int, districts: int, spread: float, geometry_type: str, rng):
+    """Works polygons or lines clustered within spread metres of district centres"""
+    import geopandas as gpd
+    import shapely
+
+    centres = _district_centres(districts, rng)
+    district = rng.integers(0, districts, count)
+    x = centres[district, 0] + rng.normal(0, spread / 2, count)
+    y = centres[district, 1] + rng.normal(0, spread / 2, count)
+    size = rng.uniform(100, 1500, count)
+
+    if geometry_type == "line":
+        geometry = shapely.linestrings(np.stack([
+            np.column_stack([x, y]),
+            np.column_stack([x + size / 2, y + rng.uniform(-size, size, count) / 3]),
+            np.column_stack([x + size, y + rng.uniform(-size, size, count) / 3]),
+        ], axis=1))
+    else:
+        geometry = shapely.box(x, y, x + size, y + size * rng.uniform(0.3, 1.0, count))
+
+    return gpd.GeoDataFrame({
+        "DAP_REF_NO": [f"BM{i:06d}" for i in range(count)],
+        "DAP_NAME": [f"Works {i}" for i in range(count)],
+        "DESCRIPTIO": rng.choice(["Slashing", "Track upgrade", "Planned burn", "Mechanical works"], count),
+        "DISTRICT": [f"District {d + 1}" for d in district],
+        "RISK_LVL": rng.choice(["DAP", "LRLI", "NBFT"], count, p=[0.5, 0.4, 0.1]),
+    }, geometry=geometry, crs=OUTPUT_WKID)
+
+
+def _field_values(name: str, spec: Dict, count: int, rng):
+    """Column of synthetic values; where_clause fields hit their literals most of the time"""
+    if spec['type'] == 'date':
+        days = rng.integers(0, 365 * 60, count)
+        return np.datetime64("1965-01-01") + days.astype("timedelta64[D]")
+    if spec['type'] == 'num':
+        literals = spec['values'] or [1.0]
+        return np.where(rng.random(count) < 0.7, rng.choice(literals, count), rng.uniform(0, 2 * max(literals) + 1, count))
+    if spec['type'] == 'id':
+        return rng.integers(1, 1_000_000, count)
+    others = np.array([f"{name}_{i}" for i in range(25)], dtype=object)
+    values = others[rng.integers(0, len(others), count)]
+    if spec['values']:
+        hits = rng.random(count) < 0.7
+        values[hits] = np.array(spec['values'], dtype=object)[rng.integers(0, len(spec['values']), hits.sum())]
+    return values
+
+
+def dense_polygons(x, y, size, vertices: int, rng):
+    """Blobs of about size metres with vertices points each, wobbling by under a metre like digitised boundaries"""
+    import shapely
+
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    phase = rng.uniform(0, 2 * np.pi, (len(x), 1))
+    radius = size[:, None] / 2 * (1 + 0.2 * np.sin(3 * angles + phase))
+    radius = radius + rng.uniform(-0.4, 0.4, (len(x), vertices))
+    rings = np.stack([x[:, None] + radius * np.cos(angles), y[:, None] + radius * np.sin(angles)], axis=-1)
+    return shapely.polygons(np.concatenate([rings, rings[:, :1]], axis=1))
+
+
+def make_values(source_name: str, schema: Dict, count: int, rng, polygon_vertices: int = 4):
+    """One synthetic values layer for a source"""
+    import geopandas as gpd
+    import shapely
+
+    xmin, ymin, xmax, ymax = REGION
+    x = rng.uniform(xmin, xmax, count)
+    y = rng.uniform(ymin, ymax, count)
+    if source_name in POINT_SOURCES:
+        geometry = shapely.points(x, y)
+    elif source_name in LINE_SOURCES:
+        steps = rng.normal(0, 400, (count, 4, 2)).cumsum(axis=1)
+        geometry = shapely.linestrings(steps + np.column_stack([x, y])[:, None, :])
+    elif polygon_vertices > 4:
+        geometry = dense_polygons(x, y, rng.uniform(50, 3000, count), polygon_vertices, rng)
+    else:
+        size = rng.uniform(50, 3000, count)
+        geometry = shapely.box(x, y, x + size, y + size * rng.uniform(0.3, 1.0, count))
+
+    attributes = {name: _field_values(name, spec, count, rng) for name, spec in schema.items()}
+    return gpd.GeoDataFrame(attributes, geometry=geometry, crs=OUTPUT_WKID)
+
+
+def source_location(root: Path, path_template: str):
+    """(file to write, layer name) for a DATASET_MATRIX path, with one folder per DATA_PATHS key"""
+    parts = re.split(r"[\\/]", path_template.format(**{key: key for key in data_path_keys()}))
+    for i, part in enumerate(parts[:-1]):
+        if part.lower().endswith(".gdb"):
+            return root.joinpath(*parts[:i + 1]), parts[-1]
+    # Not in a geodatabase - a single-layer GeoPackage keeps long field names (shapefiles would truncate them)
+    return root.joinpath(*parts[:-1], f"{parts[-1]}.gpkg"), parts[-1]
+
+
+def data_path_keys() -> List[str]:
+    """DATA_PATHS placeholders used in DATASET_MATRIX paths"""
+    keys = set()
+    for theme_datasets in DATASET_MATRIX.values():
+        for config in theme_datasets.values():
+            keys.update(re.findall(r"{(\w+)}", config['path']))
+    return sorted(keys)
+
+
+def build_fixtures(root: Path, works: int = 2000, districts: int = 1, spread: float = 30_000,
+                   values: int = 50_000, works_geometry: str = "polygon", seed: int = 1,
+                   polygon_vertices: int = 4) -> Dict:
+    """
+    Write works.gpkg and every values source under root; returns the fixture manifest
+
+    Fixtures already built with the same parameters are reused.
+    """
+    root = Path(root)
+    params = {'works': works, 'districts': districts, 'spread': spread, 'values': values, 'works_geometry': works_geometry, 'seed': seed,
+              'polygon_vertices': polygon_vertices}
+    manifest_path = root / "fixtures.json"
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        if manifest['params'] == params:
+            return manifest
+
+    rng = np.random.default_rng(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    works_path = root / "works.gpkg"
+    make_works(works, districts, spread, works_geometry, rng).to_file(works_path, layer="works", engine="pyogrio")
+
+    sources = {}
+    for path_template, schema in source_schemas().items():
+        out_file, layer = source_location(root, path_template)
+        out_file.parent.mkdir(parents=True, exist_ok=True)
+        frame = make_values(layer, schema, values, rng, polygon_vertices)
+        driver = "OpenFileGDB" if out_file.suffix.lower() == ".gdb" else "GPKG"
+        frame.to_file(out_file, layer=layer, driver=driver, engine="pyogrio")
+        sources[path_template] = str(out_file)
+
+    manifest = {
+        'params': params,
+        'works': str(works_path),
+        'data_paths': {key: str(root / key) for key in data_path_keys()},
+        'sources': sources,
+    }
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    return manifest
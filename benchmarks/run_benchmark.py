@@ -0,0 +1,200 @@
+# ============================================================================
+# Values Checking Benchmark
+# ============================================================================
+
+"""
+End-to-end benchmark of ValuesChecker.process() on synthetic fixtures.
+
+Runs on Linux without ArcGIS (shapely backend) and reports:
+    - wall time of each process() phase
+    - per-overlay time and result rows (datasets sharing an overlay are timed together)
+    - result rows/sec for Phase 2 and peak RSS
+
+Per-overlay timings are only collected with --workers 1 (worker processes
+keep their own).
+
+A JSON report is written to the output folder so runs can be compared over time.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmark --works 2000 --values 50000 --districts 1
+    python -m benchmarks.run_benchmark --works 200 --values 5000 --mode DAP --workers 4
+    python -m benchmarks.run_benchmark --polygon-vertices 512 --lod-tolerance 0.5
+    python -m benchmarks.run_benchmark --spatial-index benchmark_output/spatial_index
+    python -m benchmarks.run_benchmark --snapshots benchmark_output/snapshots
+"""
+
+import argparse
+import json
+import logging
+import resource
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+import gipps_values_checking_tool as tool
+from benchmarks.fixtures import build_fixtures
+
+# ValuesChecker methods timed as phases of process(), in run order
+PHASES = [
+    ("setup", "_setup_workspace"),
+    ("prepare", "_prepare_input_data"),
+    ("buffers", "_create_all_buffers"),
+    ("detect", "_detect_all_values"),       # includes mitigations and CSV writing, which stream with detection
+    ("outputs", "_generate_all_outputs"),
+    ("cleanup", "_cleanup_temp_data"),
+]
+
+
+class TimedValuesChecker(tool.ValuesChecker):
+    """ValuesChecker that records phase and per-overlay timings"""
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.phase_times: Dict[str, float] = {}
+        self.dataset_stats: Dict[str, Dict] = {}
+
+    def _process_overlay(self, overlay, working_data, buffered_layers):
+        start = time.perf_counter()
+        results = super()._process_overlay(overlay, working_data, buffered_layers)
+        self.dataset_stats[overlay.name] = {
+            'theme': overlay.jobs[0].theme,
+            'datasets': [job.dataset_name for job in overlay.jobs],
+            'seconds': round(time.perf_counter() - start, 4),
+            'rows': sum(len(job_results) for job_results in results.values()),
+        }
+        return results
+
+
+def _timed(phase: str, method_name: str):
+    """Wrap a ValuesChecker method so its wall time is added to phase_times"""
+    method = getattr(tool.ValuesChecker, method_name)
+
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.phase_times[phase] = round(self.phase_times.get(phase, 0) + time.perf_counter() - start, 4)
+
+    return wrapper
+
+
+for _phase, _method_name in PHASES:
+    setattr(TimedValuesChecker, _method_name, _timed(_phase, _method_name))
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process and any finished workers (Linux reports KB)"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / 1024, 1)
+
+
+def run_benchmark(args) -> Dict:
+    """Build (or reuse) fixtures, run the checker once and return the report"""
+    out = Path(args.out)
+    fixtures_start = time.perf_counter()
+    fixtures = build_fixtures(out / "fixtures", works=args.works, districts=args.districts, spread=args.spread,
+                              values=args.values, works_geometry=args.works_geometry, seed=args.seed,
+                              polygon_vertices=args.polygon_vertices)
+    fixtures_seconds = time.perf_counter() - fixtures_start
+
+    tool.DATA_PATHS.update(fixtures['data_paths'])
+    tool.MODE = args.mode
+    settings = tool.Settings(
+        input_data=fixtures['works'],
+        workspace=out / "run",
+        mode=args.mode,
+        themes=args.themes,
+        backend="shapely",
+        workers=args.workers,
+        output_formats=args.output_formats,
+        lod_tolerance=args.lod_tolerance,
+        spatial_index=args.spatial_index,
+        snapshots=args.snapshots,
+        prefetch=args.prefetch,
+    )
+
+    # Snapshots are taken (or found up to date) before the timed run, as --snapshot would ahead of a season
+    snapshot_start = time.perf_counter()
+    if args.snapshots:
+        tool.ValuesChecker(settings).build_snapshots()
+    snapshot_seconds = time.perf_counter() - snapshot_start
+
+    checker = TimedValuesChecker(settings)
+    start = time.perf_counter()
+    result = checker.process()
+    total_seconds = time.perf_counter() - start
+    if not result['success']:
+        raise RuntimeError(f"Benchmark run failed: {result['error']}")
+
+    rows = sum(result['counts'].values())
+    detect_seconds = checker.phase_times.get("detect", 0)
+    return {
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'params': {**fixtures['params'], 'mode': args.mode, 'themes': args.themes, 'workers': args.workers,
+               'lod_tolerance': args.lod_tolerance, 'spatial_index': bool(args.spatial_index), 'snapshots': bool(args.snapshots), 'prefetch': args.prefetch},
+        'fixtures_seconds': round(fixtures_seconds, 2),
+        'snapshot_seconds': round(snapshot_seconds, 2),
+        'total_seconds': round(total_seconds, 2),
+        'phases': checker.phase_times,
+        'datasets': checker.dataset_stats,
+        'rows': rows,
+        'rows_per_second': round(rows / detect_seconds, 1) if detect_seconds else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'output_mb': {Path(output).suffix: round(sum(Path(other).stat().st_size for other in result['outputs']
+                                                   if Path(other).suffix == Path(output).suffix) / 1e6, 3)
+                      for output in result['outputs'] if output.endswith(("_values.csv", "_values.parquet", "_values.feather"))},
+    }
+
+
+def print_report(report: Dict):
+    print("=" * 60)
+    print(f"Total: {report['total_seconds']}s  Rows: {report['rows']}  "
+          f"Rows/sec (detect): {report['rows_per_second']}  Peak RSS: {report['peak_rss_mb']} MB")
+    if len(report['output_mb']) > 1:
+        print("  Theme reports: " + ", ".join(f"{suffix} {mb} MB" for suffix, mb in report['output_mb'].items()))
+    print("-" * 60)
+    for phase, seconds in report['phases'].items():
+        print(f"  {phase:<12}{seconds:>10.2f}s")
+    if report['datasets']:
+        print("-" * 60)
+        slowest = sorted(report['datasets'].items(), key=lambda item: item[1]['seconds'], reverse=True)
+        for dataset_name, stats in slowest:
+            print(f"  {dataset_name:<34}{stats['seconds']:>8.2f}s{stats['rows']:>8} rows")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the values checking tool on synthetic data")
+    parser.add_argument("--works", type=int, default=2000, help="number of works features")
+    parser.add_argument("--districts", type=int, default=1, help="number of district clusters the works are spread over")
+    parser.add_argument("--spread", type=float, default=30_000, help="works spread around each district centre (metres)")
+    parser.add_argument("--works-geometry", default="polygon", choices=["polygon", "line"], help="geometry type of the works layer")
+    parser.add_argument("--values", type=int, default=50_000, help="features per values layer")
+    parser.add_argument("--polygon-vertices", type=int, default=4, help="vertices per values polygon (4 = boxes, e.g. 512 for EVC-like outlines)")
+    parser.add_argument("--lod-tolerance", type=float, default=None, help="simplification tolerance for the level-of-detail stage (metres)")
+    parser.add_argument("--spatial-index", default=None, help="folder of source spatial index sidecars (built on the first run, reused after)")
+    parser.add_argument("--snapshots", default=None, help="folder of GeoParquet source snapshots (taken before the run if missing)")
+    parser.add_argument("--prefetch", type=int, default=0, help="values sources loaded ahead in the background (0 = off)")
+    parser.add_argument("--mode", default="JFMP", choices=["DAP", "JFMP", "NBFT"])
+    parser.add_argument("--themes", nargs="+", default=["forests", "biodiversity", "water", "heritage", "summary"])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output-formats", nargs="*", default=[], choices=["parquet", "feather"], help="columnar copies of the reports")
+    parser.add_argument("--out", default="benchmark_output", help="folder for fixtures, run outputs and reports")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)  # before ValuesChecker sets up INFO logging
+    report = run_benchmark(args)
+    print_report(report)
+
+    report_path = Path(args.out) / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    report_path.write_text(json.dumps(report, indent=2))
+    print(f"Report written to {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
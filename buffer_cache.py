@@ -0,0 +1,154 @@
+# ============================================================================
+# Persistent Buffer Cache
+# ============================================================================
+
+"""
+Content-addressed cache of Phase 1 buffer layers, shared across runs.
+
+Each buffer is stored under a key hashed from:
+    - the content of the works layer (geometry and attributes)
+    - the buffer distance and buffer_type
+    - the key of the buffer it was built from (e.g. 1000m_ring <- 500m)
+    - the output spatial reference and geometry backend
+
+so a re-run on the same program reuses its buffers and any change to the works
+rebuilds them. Entries are evicted least-recently-used once the cache folder
+grows past its size limit.
+
+index.json in the cache folder records each entry's path, size and last use.
+Runs (and batch workers) can share a cache folder: every change to the index
+is made under index.lock on the latest index.json, so entries stored by other
+processes are kept (and count towards the size limit). Each process saves
+buffers under its own file names, and a buffer evicted by another process
+while it is being fetched is a cache miss.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+from geometry_backend import OUTPUT_WKID
+
+# A lock older than this is left over from a crashed process and is broken
+STALE_LOCK_SECONDS = 300
+
+
+class BufferCache:
+    """Content-addressed buffer store with LRU eviction by disk size"""
+
+    def __init__(self, backend, folder: Path, max_mb: int = 2048, logger: Optional[logging.Logger] = None):
+        self.backend = backend
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_mb * 1024 * 1024
+        self.logger = logger or logging.getLogger(__name__)
+        self.index_path = self.folder / "index.json"
+        self.index = self._load_index()
+
+    def key(self, input_hash: str, buffer_config: Dict, parent_key: Optional[str] = None) -> str:
+        """Cache key for a buffer of the hashed input (or of its parent buffer)"""
+        key_data = {
+            'input': input_hash,
+            'distance': buffer_config['buffer_distance'],
+            'buffer_type': buffer_config['buffer_type'],
+            'parent': parent_key,
+            'wkid': OUTPUT_WKID,
+            'backend': self.backend.name,
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()[:32]
+
+    def fetch(self, key: str, out_name: str) -> bool:
+        """Restore a cached buffer into the workspace as out_name; False if not cached"""
+        with self._locked():
+            entry = self.index.get(key)
+            if entry is None or not os.path.exists(entry['path']):
+                if self.index.pop(key, None) is not None:
+                    self._save_index()
+                return False
+            entry['last_used'] = time.time()    # most recently used, so the last entry another process evicts
+            self._save_index()
+
+        try:
+            self.backend.load_layer(entry['path'], out_name)
+        except Exception as e:
+            # Evicted by another process since the index was read
+            self.logger.debug(f"Cached buffer {key} could not be read, rebuilding it: {e}")
+            return False
+        return True
+
+    def store(self, key: str, layer):
+        """Save a buffer layer under key, then evict old entries if over the size limit"""
+        # Saved under a name of this process's own, so two runs storing the same buffer never write one file
+        path = self.backend.save_layer(layer, self.folder / f"{key}_{os.getpid()}")
+        with self._locked():
+            previous = self.index.get(key)
+            if previous is not None and previous['path'] != path and os.path.exists(previous['path']):
+                self._remove(path)      # another process stored it first - keep theirs, it may be being fetched
+                return
+            self.index[key] = {'path': path, 'size': self._disk_size(path), 'last_used': time.time()}
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        total = sum(entry['size'] for entry in self.index.values())
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            self._remove(entry['path'])
+            total -= entry['size']
+            del self.index[key]
+            self.logger.debug(f"Evicted cached buffer {key}")
+
+    def _remove(self, path: str):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def _disk_size(self, path: str) -> int:
+        if os.path.isfile(path):
+            return os.path.getsize(path)
+        return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+    @contextmanager
+    def _locked(self):
+        """Hold index.lock with the latest index.json loaded - every read-modify-write of the index goes through here"""
+        lock_path = self.folder / "index.lock"
+        while True:
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - lock_path.stat().st_mtime > STALE_LOCK_SECONDS:
+                        self.logger.warning(f"Breaking stale buffer cache lock {lock_path}")
+                        os.remove(lock_path)
+                except OSError:
+                    pass    # released meanwhile
+                time.sleep(0.05)
+        try:
+            self.index = self._load_index()
+            yield
+        finally:
+            os.remove(lock_path)
+
+    def _load_index(self) -> Dict:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        # Write then swap, so a crashed run never leaves a half-written index (callers hold the lock, see _locked)
+        temp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(temp_path, self.index_path)
@@ -0,0 +1,1257 @@
+# ============================================================================
+# Geometry Backends
+# ============================================================================
+
+"""
+Geometry engine abstraction used by ValuesChecker.
+
+Every geoprocessing step of the values check (copy, buffer, select, intersect,
+dissolve, cursor reads) goes through a backend so the same DATASET_MATRIX can
+be run either inside ArcGIS Pro (ArcpyBackend) or on plain Linux workers with
+GeoPandas/Shapely (ShapelyBackend).
+
+Layer handles are opaque to the checker:
+    - ArcpyBackend: feature class names/paths in arcpy.env.workspace or arcpy layers
+    - ShapelyBackend: names of in-memory layers, source paths or GeoDataFrames
+
+NOTE:   Heavy libraries (arcpy, geopandas, shapely) are only imported when a
+        backend is created, so the shapely backend never needs an ArcGIS licence.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Spatial reference used for all outputs - VICGRID2020
+OUTPUT_WKID = 7899
+
+# GDA2020 geographic - geodesic areas and lengths (shapely backend) are measured on its GRS80 ellipsoid
+GEOGRAPHIC_WKID = 7844
+
+# Field added by distance_join holding the buffer band name, e.g. '500m' or '1000m_ring'
+BAND_FIELD = "BUFFER_BAND"
+
+# Source polygons with fewer vertices than this are never simplified (see set_lod_tolerance)
+LOD_MIN_VERTICES = 64
+
+# Buffers have 8 segments per quarter circle, so their edges fall up to this share of the distance inside it
+BUFFER_CHORD_ERROR = 1 - math.cos(math.pi / 32)
+
+
+@dataclass
+class BufferBand:
+    """A buffer band measured from the works, e.g. 1000m_ring covers 500 < distance <= 1000"""
+    name: str
+    inner: float
+    outer: float
+    layer: Any = None   # materialised buffer layer for this band, used by overlay fallbacks
+
+
+def bands_for_distance(bands: List[BufferBand], distance: float) -> List[str]:
+    """Names of all bands a works->value distance falls in"""
+    return [
+        band.name for band in bands
+        if distance <= band.outer and (band.inner == 0 or distance > band.inner)
+    ]
+
+
+# ============================================================================
+# Base Backend
+# ============================================================================
+
+class GeometryBackend:
+    """Interface for the geoprocessing operations used by ValuesChecker"""
+
+    name = None
+    background_reads = False    # load_source/prefilter can run in a second thread (source prefetch) while the main thread overlays
+
+    def setup_environment(self, workspace: Path):
+        """Configure engine environment settings"""
+        raise NotImplementedError
+
+    def setup_workspace(self, workspace: Path) -> str:
+        """Create (or clear) the output workspace and return its path"""
+        raise NotImplementedError
+
+    def exists(self, layer) -> bool:
+        """Check if a layer or source dataset exists"""
+        raise NotImplementedError
+
+    def count(self, layer) -> int:
+        """Count features in a layer"""
+        raise NotImplementedError
+
+    def copy_features(self, in_layer, out_name: str, where_clause: Optional[str] = None):
+        """Copy features (optionally filtered) into a new workspace layer"""
+        raise NotImplementedError
+
+    def load_source(self, path: str, extent_layer, distance: float, out_name: str):
+        """Read a source into memory, keeping only features inside the extent of extent_layer grown by distance"""
+        raise NotImplementedError
+
+    def prefilter(self, values, works, distance: float, out_name: str):
+        """Keep only values that come within distance of a works feature (spatial index test, may keep a few extra)"""
+        raise NotImplementedError
+
+    def buffer(self, in_layer, out_name: str, distance: str, line_side: str = "FULL"):
+        """Buffer features by a linear distance string, e.g. '500 meters'"""
+        raise NotImplementedError
+
+    def select(self, layer, where_clause: str):
+        """Return a selection of the layer matching the where clause"""
+        raise NotImplementedError
+
+    def intersect(self, in_layers: List[Any], out_name: str):
+        """Intersect works layer with values layer, keeping all attributes"""
+        raise NotImplementedError
+
+    def distance_join(self, works, values, bands: List[BufferBand], out_name: str):
+        """
+        Join values to works for all buffer bands in one pass
+
+        Output matches one Intersect per band, merged: works + values attributes,
+        geometry clipped to the band, and BAND_FIELD holding the band name.
+        """
+        raise NotImplementedError
+
+    def dissolve(self, layer, out_name: str, fields: List[str]):
+        """Dissolve features on the given fields into multipart features"""
+        raise NotImplementedError
+
+    def aggregate(self, layer, fields: List[str]) -> Iterator[tuple]:
+        """
+        Iterate distinct combinations of fields, each followed by X and Y
+
+        Gives the same rows as dissolve on fields then add_geometry_fields, without
+        writing either layer: X/Y come from the centroid (points, polygons) or
+        midpoint (lines) of each group's unioned geometry.
+        """
+        raise NotImplementedError
+
+    def list_fields(self, layer) -> List[str]:
+        """List attribute field names of a layer"""
+        raise NotImplementedError
+
+    def shape_type(self, layer) -> str:
+        """Geometry type in arcpy terms: POINT, MULTIPOINT, POLYGON or POLYLINE"""
+        raise NotImplementedError
+
+    def add_geometry_fields(self, layer) -> str:
+        """
+        Add and calculate X/Y plus AREA_HA or LENGTH_KM; returns geometry type
+
+        X/Y (truncated to whole metres) are the point / polygon centroid, moved
+        inside the polygon if the centroid falls outside it, or the line midpoint.
+        Missing geometries get 0 for every field.
+        """
+        raise NotImplementedError
+
+    def search(self, layer, fields: List[str]) -> Iterator[tuple]:
+        """Iterate attribute tuples for the given fields"""
+        raise NotImplementedError
+
+    def export(self, layer, out_folder: str, out_name: str) -> str:
+        """Export a layer to a shapefile in out_folder"""
+        raise NotImplementedError
+
+    def delete(self, layer):
+        """Delete a workspace layer"""
+        raise NotImplementedError
+
+    def share(self, layer, folder: Path):
+        """Return a handle to a workspace layer that other processes can attach to"""
+        raise NotImplementedError
+
+    def attach(self, shared, name: str):
+        """Attach to a layer shared by another process (see share)"""
+        raise NotImplementedError
+
+    def content_hash(self, layer) -> str:
+        """Hash of a layer's geometry and attribute values, used as a cache key"""
+        raise NotImplementedError
+
+    def feature_hashes(self, layer, id_field: str) -> Dict[str, str]:
+        """Hash of each feature's geometry and attributes, keyed by ID (features sharing an ID are hashed together)"""
+        raise NotImplementedError
+
+    def save_layer(self, layer, path: Path) -> str:
+        """Persist a layer outside the workspace at path (extension added); returns the saved path"""
+        raise NotImplementedError
+
+    def load_layer(self, path: str, out_name: str):
+        """Copy a layer saved with save_layer into the workspace as out_name"""
+        raise NotImplementedError
+
+    def envelope(self, layers: List[Any], out_name: str):
+        """Single rectangle covering every layer (in the output spatial reference)"""
+        raise NotImplementedError
+
+    def pin(self, layer):
+        """Keep a layer through setup_workspace, e.g. sources kept loaded across the runs of a batch"""
+        pass
+
+    def set_lod_tolerance(self, tolerance: Optional[float]):
+        """
+        Overlay dense polygon sources on copies simplified by tolerance metres (None = exact geometry only)
+
+        distance_join finds candidates, measures distances and clips on the
+        simplified copies, going back to the exact geometry for borderline
+        pairs (within the tolerance of a band edge). The same works/value/band
+        rows come out as with exact geometry, but their clipped geometry (so
+        AREA_HA and X/Y) is only good to the tolerance.
+        """
+        pass
+
+    def set_spatial_index(self, folder: Optional[str]):
+        """
+        Keep packed R-tree sidecars of values sources in folder (None = read sources cold)
+
+        load_source then reads only the features near the works by feature id,
+        and prefilter prunes them with the sidecar's tree. Sidecars are rebuilt
+        when their source changes (see spatial_index.py).
+        """
+        pass
+
+    def index_source(self, path: str) -> bool:
+        """Build the spatial index sidecar of a source if it is missing or out of date; True if it was (re)built"""
+        raise NotImplementedError(f"The {self.name} backend does not use spatial index sidecars")
+
+    def set_snapshots(self, folder: Optional[str], fields: Optional[Dict[str, List[str]]] = None):
+        """
+        Read values sources from local GeoParquet snapshots kept in folder (None = read the sources themselves)
+
+        fields lists the fields each source path needs to keep in its snapshot.
+        A snapshot is read while its field list matches - runs do not look at
+        the source again; snapshot_source (--snapshot) refreshes changed ones
+        (see source_snapshot.py). Others are read from the source as before.
+        """
+        pass
+
+    def snapshot_source(self, path: str) -> bool:
+        """Take a snapshot of a source if it has none or it is out of date; True if one was taken"""
+        raise NotImplementedError(f"The {self.name} backend does not read source snapshots")
+
+
+def parse_distance(distance: str) -> float:
+    """Convert a linear unit string such as '500 meters' into metres"""
+    value, _, unit = str(distance).strip().partition(" ")
+    value = float(value)
+    unit = unit.strip().lower()
+    if unit in ("", "meter", "meters", "metre", "metres", "m"):
+        return value
+    if unit in ("kilometer", "kilometers", "kilometre", "kilometres", "km"):
+        return value * 1000
+    raise ValueError(f"Unsupported buffer distance unit: {distance}")
+
+
+# ============================================================================
+# ArcPy Backend
+# ============================================================================
+
+class ArcpyBackend(GeometryBackend):
+    """Backend using ArcGIS Pro geoprocessing tools"""
+
+    name = "arcpy"
+
+    def __init__(self):
+        import arcpy
+        self.arcpy = arcpy
+
+    def setup_environment(self, workspace: Path):
+        arcpy = self.arcpy
+        arcpy.env.overwriteOutput = True
+        arcpy.env.scriptWorkspace = str(workspace)
+        arcpy.env.parallelProcessingFactor = "85%"
+        arcpy.SetLogHistory(False)
+
+        # Set spatial reference to VICGRID2020
+        sr = arcpy.SpatialReference(OUTPUT_WKID)
+        arcpy.env.outputCoordinateSystem = sr
+
+    def setup_workspace(self, workspace: Path) -> str:
+        arcpy = self.arcpy
+        output_gdb = workspace / "Values_Checking_Output.gdb"
+        if output_gdb.exists():
+            arcpy.env.workspace = str(output_gdb)
+
+            # Clear existing data
+            for fc in arcpy.ListFeatureClasses():
+                arcpy.management.Delete(fc)
+            for tbl in arcpy.ListTables():
+                arcpy.management.Delete(tbl)
+        else:
+            arcpy.management.CreateFileGDB(str(workspace), "Values_Checking_Output.gdb")
+
+        arcpy.env.workspace = str(output_gdb)
+        return str(output_gdb)
+
+    def exists(self, layer) -> bool:
+        return self.arcpy.Exists(layer)
+
+    def count(self, layer) -> int:
+        return int(self.arcpy.GetCount_management(layer)[0])
+
+    def copy_features(self, in_layer, out_name: str, where_clause: Optional[str] = None):
+        self.arcpy.conversion.FeatureClassToFeatureClass(
+            in_layer, self.arcpy.env.workspace, out_name, where_clause
+        )
+        return out_name
+
+    def load_source(self, path: str, extent_layer, distance: float, out_name: str):
+        arcpy = self.arcpy
+        extent = arcpy.Describe(extent_layer).extent
+        search_area = arcpy.Extent(
+            extent.XMin - distance, extent.YMin - distance, extent.XMax + distance, extent.YMax + distance,
+            spatial_reference=extent.spatialReference
+        ).polygon
+
+        source_layer = arcpy.management.MakeFeatureLayer(path, f"{out_name}_layer")
+        arcpy.management.SelectLayerByLocation(source_layer, "INTERSECT", search_area, selection_type="NEW_SELECTION")
+        out_path = f"memory\\{out_name}"
+        arcpy.management.CopyFeatures(source_layer, out_path)
+        arcpy.management.Delete(source_layer)
+        return out_path
+
+    def prefilter(self, values, works, distance: float, out_name: str):
+        arcpy = self.arcpy
+        values_layer = arcpy.management.MakeFeatureLayer(values, f"{out_name}_layer")
+        arcpy.management.SelectLayerByLocation(values_layer, "WITHIN_A_DISTANCE", works, f"{distance} Meters", "NEW_SELECTION")
+        out_path = f"memory\\{out_name}"
+        arcpy.management.CopyFeatures(values_layer, out_path)
+        arcpy.management.Delete(values_layer)
+        return out_path
+
+    def buffer(self, in_layer, out_name: str, distance: str, line_side: str = "FULL"):
+        self.arcpy.analysis.Buffer(
+            in_features=in_layer,
+            out_feature_class=out_name,
+            buffer_distance_or_field=distance,
+            line_side=line_side,
+            line_end_type="ROUND",
+            dissolve_option="NONE",
+            dissolve_field=None,
+            method="PLANAR"
+        )
+        return out_name
+
+    def select(self, layer, where_clause: str):
+        return self.arcpy.management.SelectLayerByAttribute(layer, "NEW_SELECTION", where_clause)
+
+    def intersect(self, in_layers: List[Any], out_name: str):
+        return self.arcpy.analysis.Intersect(in_layers, out_name, "ALL")
+
+    def distance_join(self, works, values, bands: List[BufferBand], out_name: str):
+        # Points only need a distance, so one near table replaces every buffer overlay.
+        # Lines and polygons need clipping to each band, so they keep the overlays.
+        if self.shape_type(values) == "POINT":
+            return self._near_join(works, values, bands, out_name)
+        return self._overlay_join(values, bands, out_name)
+
+    def _near_join(self, works, values, bands: List[BufferBand], out_name: str):
+        """Measure every works->value distance once with GenerateNearTable and assign bands"""
+        arcpy = self.arcpy
+        near_table = f"memory\\near_{out_name}"
+        max_distance = max(band.outer for band in bands)
+        arcpy.analysis.GenerateNearTable(
+            in_features=values,
+            near_features=works,
+            out_table=near_table,
+            search_radius=f"{max_distance} Meters",
+            closest="ALL",
+            closest_count=0,
+            method="PLANAR"
+        )
+        pairs = []
+        for value_oid, work_oid, distance in self.search(near_table, ["IN_FID", "NEAR_FID", "NEAR_DIST"]):
+            for band_name in bands_for_distance(bands, distance):
+                pairs.append((work_oid, value_oid, band_name))
+        arcpy.management.Delete(near_table)
+
+        # Output schema: works fields, then values fields (_1 suffix on clashes, like Intersect)
+        works_fields = self._attribute_fields(works)
+        values_fields = self._attribute_fields(values)
+        works_names = [f.name for f in works_fields]
+        values_names = [f"{f.name}_1" if f.name in works_names else f.name for f in values_fields]
+
+        arcpy.management.CreateFeatureclass(
+            arcpy.env.workspace, out_name, "POINT",
+            spatial_reference=arcpy.Describe(values).spatialReference
+        )
+        field_specs = [[name, self._FIELD_TYPES[f.type], "", f.length if f.type == "String" else ""]
+                       for name, f in zip(works_names + values_names, works_fields + values_fields)]
+        field_specs.append([BAND_FIELD, "TEXT", "", 20])
+        arcpy.management.AddFields(out_name, field_specs)
+
+        works_rows = {row[0]: row[1:] for row in self.search(works, ["OID@"] + works_names)}
+        values_rows = {row[0]: row[1:] for row in self.search(values, ["OID@", "SHAPE@"] + [f.name for f in values_fields])}
+
+        with arcpy.da.InsertCursor(out_name, ["SHAPE@"] + works_names + values_names + [BAND_FIELD]) as cursor:
+            for work_oid, value_oid, band_name in pairs:
+                value_row = values_rows[value_oid]
+                cursor.insertRow((value_row[0],) + works_rows[work_oid] + value_row[1:] + (band_name,))
+
+        return out_name
+
+    def _overlay_join(self, values, bands: List[BufferBand], out_name: str):
+        """One Intersect per band buffer, tagged with the band name and merged"""
+        arcpy = self.arcpy
+        band_outputs = []
+        for band in bands:
+            band_output = f"{out_name}_{band.name}"
+            arcpy.analysis.Intersect([band.layer, values], band_output, "ALL")
+            arcpy.management.AddField(band_output, BAND_FIELD, "TEXT", field_length=20)
+            arcpy.management.CalculateField(band_output, BAND_FIELD, f"'{band.name}'", "PYTHON3")
+            band_outputs.append(band_output)
+
+        arcpy.management.Merge(band_outputs, out_name)
+        for band_output in band_outputs:
+            arcpy.management.Delete(band_output)
+        return out_name
+
+    # arcpy field type -> AddFields type keyword
+    _FIELD_TYPES = {
+        'String': 'TEXT', 'Integer': 'LONG', 'SmallInteger': 'SHORT', 'BigInteger': 'BIGINTEGER',
+        'Double': 'DOUBLE', 'Single': 'FLOAT', 'Date': 'DATE', 'DateOnly': 'DATEONLY',
+        'TimeOnly': 'TIMEONLY', 'TimestampOffset': 'TIMESTAMPOFFSET', 'GUID': 'GUID', 'GlobalID': 'GUID'
+    }
+
+    def _attribute_fields(self, layer) -> list:
+        """Editable attribute fields of a layer (no OID, geometry or shape length/area)"""
+        return [f for f in self.arcpy.ListFields(layer) if not f.required and f.type in self._FIELD_TYPES]
+
+    def dissolve(self, layer, out_name: str, fields: List[str]):
+        self.arcpy.analysis.PairwiseDissolve(layer, out_name, dissolve_field=fields, multi_part="MULTI_PART")
+        return out_name
+
+    def aggregate(self, layer, fields: List[str]) -> Iterator[tuple]:
+        geometry_type = self.shape_type(layer)
+        if geometry_type not in ["POINT", "MULTIPOINT", "POLYGON", "POLYLINE"]:
+            raise ValueError(f"Unsupported geometry type: {geometry_type}")
+
+        # One dissolve unions every group at once (pairwise unions per row are quadratic in group size)
+        group_fields = list(dict.fromkeys(fields))  # matrix field lists may repeat a field (e.g. RECORD_ID)
+        dissolved = f"memory\\aggregate_{self.arcpy.Describe(layer).name}"
+        self.arcpy.analysis.PairwiseDissolve(layer, dissolved, dissolve_field=group_fields, multi_part="MULTI_PART")
+        rows = []
+        for row in self.search(dissolved, group_fields + ["SHAPE@"]):
+            values = dict(zip(group_fields, row))
+            rows.append(tuple(values[field] for field in fields) + self._geometry_metrics(row[-1], geometry_type)[:2])
+        self.arcpy.management.Delete(dissolved)
+
+        # Sorted on the key fields, nulls last - same order as the shapely backend's dissolve
+        rows.sort(key=lambda row: [(value is None, value) for value in row[:len(fields)]])
+        yield from rows
+
+    def list_fields(self, layer) -> List[str]:
+        return [f.name for f in self.arcpy.ListFields(layer)]
+
+    def shape_type(self, layer) -> str:
+        return self.arcpy.Describe(layer).shapeType.upper()
+
+    def add_geometry_fields(self, layer) -> str:
+        import numpy as np
+        arcpy = self.arcpy
+        geometry_type = self.shape_type(layer)
+        if geometry_type not in ["POINT", "MULTIPOINT", "POLYGON", "POLYLINE"]:
+            raise ValueError(f"Unsupported geometry type: {geometry_type}")
+
+        # One read pass for every geometry's metrics...
+        measure = {"POLYGON": "AREA_HA", "POLYLINE": "LENGTH_KM"}.get(geometry_type)
+        with arcpy.da.SearchCursor(layer, ["OID@", "SHAPE@"]) as cursor:
+            metrics = [(oid,) + self._geometry_metrics(shape, geometry_type) for oid, shape in cursor]
+
+        # ...and one write pass adding X, Y and AREA_HA/LENGTH_KM together (no AddField + UpdateCursor per field)
+        dtype = [("METRICS_OID", "i4"), ("X", "f8"), ("Y", "f8")] + ([(measure, "f8")] if measure else [])
+        array = np.array([row[:len(dtype)] for row in metrics], dtype=dtype)
+        arcpy.da.ExtendTable(layer, arcpy.Describe(layer).OIDFieldName, array, "METRICS_OID", append_only=False)
+        return geometry_type
+
+    def _geometry_metrics(self, shape, geometry_type: str) -> tuple:
+        """(X, Y, area in ha or length in km) of one geometry; all 0 when it is missing"""
+        if not shape:
+            return (0, 0, 0)
+        if geometry_type == "POLYLINE":
+            point = shape.positionAlongLine(0.5, True).firstPoint
+            measure = shape.getLength('GEODESIC', 'KILOMETERS')
+        else:
+            # Polygon centroid is the true centroid, or a label point inside the polygon if that falls outside it
+            point = shape.centroid
+            measure = shape.getArea('GEODESIC', 'HECTARES') if geometry_type == "POLYGON" else 0
+        return (int(point.X) if point.X else 0, int(point.Y) if point.Y else 0, measure)
+
+    def search(self, layer, fields: List[str]) -> Iterator[tuple]:
+        with self.arcpy.da.SearchCursor(layer, fields) as cursor:
+            for row in cursor:
+                yield row
+
+    def export(self, layer, out_folder: str, out_name: str) -> str:
+        self.arcpy.conversion.FeatureClassToFeatureClass(layer, out_folder, out_name)
+        return os.path.join(out_folder, f"{out_name}.shp")
+
+    def delete(self, layer):
+        self.arcpy.management.Delete(layer)
+
+    def share(self, layer, folder: Path):
+        # Feature classes in the output geodatabase can be read by any process
+        return os.path.join(self.arcpy.env.workspace, layer)
+
+    def attach(self, shared, name: str):
+        return shared
+
+    def content_hash(self, layer) -> str:
+        digest = hashlib.sha256()
+        fields = [f.name for f in self._attribute_fields(layer)]
+        digest.update(",".join(fields).encode())
+        with self.arcpy.da.SearchCursor(layer, fields + ["SHAPE@WKB"]) as cursor:
+            for row in cursor:
+                digest.update(repr(row[:-1]).encode())
+                digest.update(bytes(row[-1] or b""))
+        return digest.hexdigest()
+
+    def feature_hashes(self, layer, id_field: str) -> Dict[str, str]:
+        digests = {}
+        fields = [f.name for f in self._attribute_fields(layer)]
+        id_index = fields.index(id_field)
+        with self.arcpy.da.SearchCursor(layer, fields + ["SHAPE@WKB"]) as cursor:
+            for row in cursor:
+                digest = digests.setdefault(str(row[id_index]), hashlib.sha1())
+                digest.update(repr(row[:-1]).encode())
+                digest.update(bytes(row[-1] or b""))
+        return {work_id: digest.hexdigest() for work_id, digest in digests.items()}
+
+    def save_layer(self, layer, path: Path) -> str:
+        # One file geodatabase per saved layer so entries can be evicted independently
+        gdb_path = f"{path}.gdb"
+        if not self.arcpy.Exists(gdb_path):
+            self.arcpy.management.CreateFileGDB(str(Path(path).parent), Path(gdb_path).name)
+        self.arcpy.management.CopyFeatures(layer, os.path.join(gdb_path, "layer"))
+        return gdb_path
+
+    def load_layer(self, path: str, out_name: str):
+        self.arcpy.management.CopyFeatures(os.path.join(path, "layer"), out_name)
+        return out_name
+
+    def envelope(self, layers: List[Any], out_name: str):
+        arcpy = self.arcpy
+        sr = arcpy.SpatialReference(OUTPUT_WKID)
+        extents = [arcpy.Describe(layer).extent.projectAs(sr) for layer in layers]
+        envelope = arcpy.Extent(
+            min(extent.XMin for extent in extents), min(extent.YMin for extent in extents),
+            max(extent.XMax for extent in extents), max(extent.YMax for extent in extents),
+            spatial_reference=sr
+        )
+        out_path = f"memory\\{out_name}"
+        arcpy.management.CopyFeatures([envelope.polygon], out_path)
+        return out_path
+
+
+# ============================================================================
+# GeoPandas/Shapely Backend
+# ============================================================================
+
+class ShapelyBackend(GeometryBackend):
+    """
+    Backend using GeoPandas/Shapely with STRtree-indexed overlays
+
+    Workspace layers are held in memory as GeoDataFrames keyed by name. Source
+    datasets are read with pyogrio and projected to VICGRID2020, by feature id
+    when they have a spatial index sidecar (set_spatial_index), or from a local
+    GeoParquet snapshot when they have one (set_snapshots). Where clauses
+    are evaluated in an in-memory SQLite table so the same DATASET_MATRIX SQL
+    works on both backends.
+    """
+
+    name = "shapely"
+    background_reads = True
+
+    def __init__(self):
+        import geopandas as gpd
+        import numpy as np
+        import pandas as pd
+        import shapely
+        self.gpd = gpd
+        self.np = np
+        self.pd = pd
+        self.shapely = shapely
+        self.layers = {}
+        self.workspace = None
+        self._container_layers = {}
+        self._sql_tables = {}   # layer name -> SQLite connection holding its attributes
+        self._trees = {}        # layer name -> STRtree of its geometry, for layers prefiltered more than once
+        self.pinned = set()     # layers kept through setup_workspace
+        self.lod_tolerance = None
+        self._lod = {}          # id of a dense source polygon -> simplified copy (pruned copies and selections share the polygon objects)
+        self._lod_layers = {}   # source layer name -> ids of its polygons in _lod
+        self.spatial_index = None
+        self._indexed = {}      # layer loaded through a sidecar -> (sidecar tree, feature ids of its rows)
+        self._bounds = {}       # layer attached from a shared layer -> memory-mapped bounds of its features with geometry
+        self._stamps = {}       # source container -> stamp of its files, for the current run (see spatial_index.source_stamp)
+        self.snapshots = None
+        self._snapshot_fields = {}  # source path -> fields its snapshot keeps
+
+    def setup_environment(self, workspace: Path):
+        self.workspace = Path(workspace)
+
+    def setup_workspace(self, workspace: Path) -> str:
+        self.workspace = Path(workspace)
+        for layer in list(self.layers):
+            if layer not in self.pinned:
+                self.delete(layer)
+        self._stamps.clear()    # sources may have changed since the last run
+        return str(self.workspace)
+
+    # ------------------------------------------------------------------------
+    # Layer resolution
+    # ------------------------------------------------------------------------
+
+    def _resolve_source(self, path: str):
+        """Split a source path into (container, layer), e.g. a .gdb folder and feature class"""
+        parts = re.split(r"[\\/]", str(path))
+        for i, part in enumerate(parts[:-1]):
+            if part.lower().endswith((".gdb", ".gpkg")):
+                return os.sep.join(parts[:i + 1]), parts[-1]
+
+        # Not in a geodatabase - shapefile or single-layer file, with or without extension
+        file_path = os.sep.join(parts)
+        for candidate in (file_path, f"{file_path}.shp", f"{file_path}.gpkg"):
+            if os.path.isfile(candidate):
+                return candidate, None
+        return None, None
+
+    def _read_source(self, path: str, bbox=None, **kwargs):
+        """Read a source dataset from disk, projected to the output spatial reference (kwargs go to pyogrio, e.g. fids)"""
+        container, layer = self._resolve_source(path)
+        if container is None:
+            raise FileNotFoundError(f"Dataset not found: {path}")
+
+        frame = self.gpd.read_file(container, layer=layer, bbox=bbox, engine="pyogrio", **kwargs)
+        if frame.crs is not None and frame.crs.to_epsg() != OUTPUT_WKID:
+            frame = frame.to_crs(epsg=OUTPUT_WKID)
+        return frame
+
+    def _frame(self, layer):
+        """Resolve a layer handle to a GeoDataFrame"""
+        if isinstance(layer, self.gpd.GeoDataFrame):
+            return layer
+        if layer in self.layers:
+            return self.layers[layer]
+        return self._read_source(layer)
+
+    def _store(self, out_name: str, frame):
+        connection = self._sql_tables.pop(out_name, None)
+        if connection is not None:
+            connection.close()
+        self._trees.pop(out_name, None)
+        self._indexed.pop(out_name, None)
+        self._bounds.pop(out_name, None)
+        self._drop_lod(out_name)
+        self.layers[out_name] = frame
+        return frame
+
+    def _where_mask(self, frame, where_clause: str, table_key: Optional[str] = None):
+        """
+        Evaluate an ArcGIS-style SQL where clause against a frame's attributes
+
+        Attributes are loaded into an in-memory SQLite table. If table_key is given
+        the table is kept so repeated selections on the same layer reuse it.
+        """
+        connection = self._sql_tables.get(table_key) if table_key else None
+        if connection is None:
+            attributes = frame.drop(columns=frame.geometry.name)
+            for column in attributes.columns:
+                if self.pd.api.types.is_datetime64_any_dtype(attributes[column]):
+                    attributes[column] = attributes[column].dt.strftime("%Y-%m-%d %H:%M:%S")
+            connection = sqlite3.connect(":memory:")
+            attributes.to_sql("layer", connection, index=False)
+            if table_key:
+                self._sql_tables[table_key] = connection
+
+        # File geodatabase date literals (date '1980-01-01 00:00:00') become plain strings
+        sql = re.sub(r"\bdate\s+'", "'", where_clause, flags=re.IGNORECASE)
+        matches = [row[0] - 1 for row in connection.execute(f"SELECT rowid FROM layer WHERE {sql}")]
+        if not table_key:
+            connection.close()
+
+        mask = self.np.zeros(len(frame), dtype=bool)
+        mask[matches] = True
+        return mask
+
+    # ------------------------------------------------------------------------
+    # Geoprocessing
+    # ------------------------------------------------------------------------
+
+    def exists(self, layer) -> bool:
+        if isinstance(layer, self.gpd.GeoDataFrame) or layer in self.layers:
+            return True
+
+        container, layer_name = self._resolve_source(layer)
+        if container is None or not os.path.exists(container):
+            return False
+        if layer_name is None:
+            return True
+        return layer_name.lower() in (name.lower() for name in self._list_layers(container))
+
+    def _list_layers(self, container: str) -> List[str]:
+        """List layer names in a geodatabase (cached per container)"""
+        if container not in self._container_layers:
+            import pyogrio
+            self._container_layers[container] = [name for name, _ in pyogrio.list_layers(container)]
+        return self._container_layers[container]
+
+    def count(self, layer) -> int:
+        return len(self._frame(layer))
+
+    def copy_features(self, in_layer, out_name: str, where_clause: Optional[str] = None):
+        frame = self._frame(in_layer)
+        if where_clause:
+            frame = frame[self._where_mask(frame, where_clause)]
+        return self._store(out_name, frame.reset_index(drop=True))
+
+    def load_source(self, path: str, extent_layer, distance: float, out_name: str):
+        snapshot = self._snapshot(path)
+        if snapshot is None and self.spatial_index is not None:
+            return self._load_indexed_source(path, extent_layer, distance, out_name)
+
+        xmin, ymin, xmax, ymax = self._frame(extent_layer).total_bounds
+        if snapshot is not None:
+            bbox = (xmin - distance, ymin - distance, xmax + distance, ymax + distance)
+            self._store(out_name, self._read_snapshot(snapshot, bbox))
+            return out_name
+
+        search_area = self.gpd.GeoSeries(
+            [self.shapely.box(xmin - distance, ymin - distance, xmax + distance, ymax + distance)],
+            crs=f"EPSG:{OUTPUT_WKID}"
+        )
+        # bbox is pushed down to the reader, so only the works area is read from the source
+        self._store(out_name, self._read_source(path, bbox=search_area).reset_index(drop=True))
+        return out_name
+
+    def _load_indexed_source(self, path: str, extent_layer, distance: float, out_name: str):
+        """Read only the source features whose sidecar boxes fall within distance of a work's envelope"""
+        tree, _ = self._source_index(path)
+        _, ids = tree.query(self._envelopes(extent_layer, distance))
+        ids = self.np.unique(ids)
+        self._store(out_name, self._read_source(path, fids=ids).reset_index(drop=True))
+        self._indexed[out_name] = (tree, ids)
+        return out_name
+
+    def _source_index(self, path: str) -> tuple:
+        """(sidecar tree of a source, whether it was rebuilt) - a missing or stale sidecar is rebuilt from the source's geometry alone"""
+        from spatial_index import PackedRTree, source_stamp
+
+        container, layer = self._resolve_source(path)
+        if container is None:
+            raise FileNotFoundError(f"Dataset not found: {path}")
+        stamp = source_stamp(container, layer, self._stamps)
+        tree = self.spatial_index.get(path, stamp)
+        if tree is not None:
+            return tree, False
+
+        geometry = self._read_source(path, columns=[], fid_as_index=True)
+        tree = PackedRTree.build(self.shapely.bounds(geometry.geometry.values), geometry.index.values)
+        self.spatial_index.put(path, tree, stamp)
+        return tree, True
+
+    def _envelopes(self, layer, distance: float):
+        """(xmin, ymin, xmax, ymax) of each feature of a layer, grown by distance"""
+        if isinstance(layer, str) and layer in self._bounds:
+            bounds = self._bounds[layer]
+        else:
+            geometry = self._frame(layer).geometry.values
+            bounds = self.shapely.bounds(geometry[~self.shapely.is_missing(geometry)])
+        return bounds + self.np.array([-distance, -distance, distance, distance])
+
+    def index_source(self, path: str) -> bool:
+        if self.spatial_index is None:
+            raise RuntimeError("No spatial index folder set (see set_spatial_index)")
+        return self._source_index(path)[1]
+
+    def set_spatial_index(self, folder: Optional[str]):
+        from spatial_index import SpatialIndexStore
+
+        if folder is None:
+            self.spatial_index = None
+        elif self.spatial_index is None or self.spatial_index.folder != Path(folder):
+            self.spatial_index = SpatialIndexStore(folder)
+
+    def set_snapshots(self, folder: Optional[str], fields: Optional[Dict[str, List[str]]] = None):
+        from source_snapshot import SnapshotStore
+
+        if folder is None:
+            self.snapshots = None
+        elif self.snapshots is None or self.snapshots.folder != Path(folder):
+            self.snapshots = SnapshotStore(folder)
+        self._snapshot_fields = fields or {}
+
+    def _snapshot(self, path: str) -> Optional[Dict]:
+        """Index entry of the snapshot of a source with the fields it needs, or None - the source itself is not touched"""
+        if self.snapshots is None:
+            return None
+        return self.snapshots.get(path, self._snapshot_fields.get(path, []))
+
+    def _read_snapshot(self, snapshot: Dict, bbox):
+        """Features of a snapshot whose bbox intersects bbox, in source order"""
+        from source_snapshot import SNAPSHOT_ROW
+
+        # Only the row groups whose bbox column statistics overlap bbox are decoded
+        frame = self.gpd.read_parquet(snapshot['path'], columns=snapshot['columns'] + ["geometry", SNAPSHOT_ROW], bbox=bbox)
+        return frame.sort_values(SNAPSHOT_ROW).drop(columns=SNAPSHOT_ROW).reset_index(drop=True)
+
+    def snapshot_source(self, path: str) -> bool:
+        import pyogrio
+        from source_snapshot import SNAPSHOT_ROW, SNAPSHOT_ROW_GROUP
+        from spatial_index import source_stamp
+
+        if self.snapshots is None:
+            raise RuntimeError("No snapshot folder set (see set_snapshots)")
+        container, layer = self._resolve_source(path)
+        if container is None:
+            raise FileNotFoundError(f"Dataset not found: {path}")
+        stamp = source_stamp(container, layer, self._stamps)
+        fields = self._snapshot_fields.get(path, [])
+        if self.snapshots.get(path, fields, stamp) is not None:
+            return False
+
+        # Only the fields DATASET_MATRIX reads from the source (matched case-insensitively, as the where clauses are)
+        wanted = {name.upper() for name in fields}
+        columns = [name for name in pyogrio.read_info(container, layer=layer)['fields'] if name.upper() in wanted]
+        frame = self._read_source(path, columns=columns)
+        frame[SNAPSHOT_ROW] = self.np.arange(len(frame))
+        geometry = frame.geometry.values
+        frame = frame[~(self.shapely.is_missing(geometry) | self.shapely.is_empty(geometry))]
+        if len(frame):
+            frame = frame.iloc[self.np.argsort(frame.geometry.hilbert_distance().values, kind="stable")]
+
+        snapshot_path = self.snapshots.snapshot_path(path)
+        temp_path = snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+        frame.to_parquet(temp_path, index=False, compression="zstd", write_covering_bbox=True, row_group_size=SNAPSHOT_ROW_GROUP)
+        os.replace(temp_path, snapshot_path)
+        self.snapshots.put(path, stamp, fields, columns, len(frame))
+        return True
+
+    def prefilter(self, values, works, distance: float, out_name: str):
+        frame = self._frame(values)
+
+        # Envelope of each work grown by distance, tested against the R-tree of value envelopes -
+        # the source's sidecar tree if it was loaded through one, so no tree is built per run
+        envelopes = self._envelopes(works, distance)
+        if isinstance(values, str) and values in self._indexed:
+            tree, ids = self._indexed[values]
+            _, hits = tree.query(envelopes)
+            values_idx = self.np.searchsorted(ids, hits)
+            found = values_idx < len(ids)
+            found[found] = ids[values_idx[found]] == hits[found]
+            values_idx = values_idx[found]
+        else:
+            _, values_idx = self._tree(values, frame).query(self.shapely.box(*envelopes.T))
+
+        values_idx = self.np.unique(values_idx)
+        if self.lod_tolerance and isinstance(values, str):
+            self._build_lod(values, frame.geometry.values[values_idx])
+        self._store(out_name, frame.iloc[values_idx].reset_index(drop=True))
+        return out_name
+
+    def _tree(self, layer, frame):
+        """STRtree of a frame's geometry, kept for pinned layers (prefiltered again on every run of a batch)"""
+        if not isinstance(layer, str) or layer not in self.pinned:
+            return self.shapely.STRtree(frame.geometry.values)
+        if layer not in self._trees:
+            self._trees[layer] = self.shapely.STRtree(frame.geometry.values)
+        return self._trees[layer]
+
+    def set_lod_tolerance(self, tolerance: Optional[float]):
+        if tolerance != self.lod_tolerance:
+            for layer in list(self._lod_layers):
+                self._drop_lod(layer)
+            self.lod_tolerance = tolerance
+
+    def _build_lod(self, layer: str, geometry):
+        """
+        Simplify the dense polygons of a source layer not simplified yet, keeping copies that drop at least half the vertices
+
+        Only the polygons a prefilter keeps are simplified, so warm sources of a
+        batch build up their copies one run at a time.
+        """
+        shapely = self.shapely
+        np = self.np
+        ids = self._lod_layers.setdefault(layer, [])
+        geometry = np.asarray(geometry)
+        vertices = shapely.get_num_coordinates(geometry)
+        dense = np.isin(shapely.get_type_id(geometry), [3, 6]) & (vertices >= LOD_MIN_VERTICES)
+        dense &= np.array([id(original) not in self._lod for original in geometry], dtype=bool)
+        geometry, vertices = geometry[dense], vertices[dense]
+
+        # Douglas-Peucker is far quicker than the topology preserving simplifier, which only redoes the polygons it breaks
+        simplified = shapely.simplify(geometry, self.lod_tolerance, preserve_topology=False)
+        broken = shapely.is_empty(simplified) | ~shapely.is_valid(simplified)
+        simplified[broken] = shapely.simplify(geometry[broken], self.lod_tolerance, preserve_topology=True)
+
+        worth = shapely.get_num_coordinates(simplified) * 2 <= vertices
+        for original, copy in zip(geometry[worth], simplified[worth]):
+            self._lod[id(original)] = copy
+            ids.append(id(original))
+
+    def _drop_lod(self, layer):
+        for key in self._lod_layers.pop(layer, ()):
+            self._lod.pop(key, None)
+
+    def _coarse(self, geometry):
+        """Geometry with simplified copies swapped in where a source polygon has one, and a mask of those rows"""
+        geometry = self.np.asarray(geometry)
+        coarse = geometry.copy()
+        simplified = self.np.zeros(len(geometry), dtype=bool)
+        if self._lod:
+            for i, original in enumerate(geometry):
+                copy = self._lod.get(id(original))
+                if copy is not None:
+                    coarse[i] = copy
+                    simplified[i] = True
+        return coarse, simplified
+
+    def buffer(self, in_layer, out_name: str, distance: str, line_side: str = "FULL"):
+        frame = self._frame(in_layer)
+        geometry = frame.geometry.values
+        buffered = self.shapely.buffer(geometry, parse_distance(distance))
+        if line_side == "OUTSIDE_ONLY":
+            buffered = self.shapely.difference(buffered, geometry)
+
+        result = frame.copy()
+        result[frame.geometry.name] = buffered
+        return self._store(out_name, result)
+
+    def select(self, layer, where_clause: str):
+        frame = self._frame(layer)
+        table_key = layer if isinstance(layer, str) and layer in self.layers else None
+        return frame[self._where_mask(frame, where_clause, table_key)].reset_index(drop=True)
+
+    def intersect(self, in_layers: List[Any], out_name: str):
+        works, values = (self._frame(layer) for layer in in_layers)
+
+        # STRtree on values, queried with every works geometry
+        tree = self.shapely.STRtree(values.geometry.values)
+        works_idx, values_idx = tree.query(works.geometry.values, predicate="intersects")
+
+        # Output has the dimension of the lowest input (points/lines/polygons)
+        value_geometry = values.geometry.values[values_idx]
+        geometry = self.shapely.intersection(works.geometry.values[works_idx], value_geometry)
+        geometry = self._keep_dimension(geometry, self.shapely.get_dimensions(value_geometry))
+        keep = ~self.shapely.is_empty(geometry)
+
+        result = self._pair_frame(works, values, works_idx[keep], values_idx[keep], geometry[keep])
+        return self._store(out_name, result)
+
+    def distance_join(self, works, values, bands: List[BufferBand], out_name: str):
+        shapely = self.shapely
+        np = self.np
+        works = self._frame(works)
+        values = self._frame(values)
+        work_geometry = works.geometry.values
+        value_geometry = values.geometry.values
+
+        # Dense polygons are matched and clipped on their simplified copies (see set_lod_tolerance).
+        # Their boundaries are within about the tolerance of the exact ones, so pairs within twice
+        # that of a band edge are borderline and go back to the exact geometry. Buffer edges are
+        # chords up to BUFFER_CHORD_ERROR of the distance inside the true circle, so that is added.
+        coarse, simplified = self._coarse(value_geometry)
+        margin = 2 * self.lod_tolerance if simplified.any() else 0
+        edge_margin = lambda edge: margin + edge * BUFFER_CHORD_ERROR
+
+        # One STRtree query at the widest band, then one distance per works/value pair
+        tree = shapely.STRtree(coarse)
+        max_distance = max(band.outer for band in bands)
+        works_idx, values_idx = tree.query(work_geometry, predicate="dwithin", distance=max_distance + margin)
+        candidates = coarse[values_idx]
+        distance = shapely.distance(work_geometry[works_idx], candidates)
+        if margin:
+            outer = np.array(sorted({band.outer for band in bands}))
+            borderline = np.flatnonzero(simplified[values_idx] & (np.abs(distance[:, None] - outer) <= edge_margin(outer)).any(axis=1))
+            candidates[borderline] = np.asarray(value_geometry)[values_idx[borderline]]
+            distance[borderline] = shapely.distance(work_geometry[works_idx[borderline]], candidates[borderline])
+            within = distance <= max_distance
+            works_idx, values_idx, candidates, distance = works_idx[within], values_idx[within], candidates[within], distance[within]
+        dimension = shapely.get_dimensions(candidates)
+        is_point = dimension == 0
+
+        band_works, band_values, band_geometry, band_names = [], [], [], []
+        for band in bands:
+            in_band = distance <= band.outer
+            if band.inner > 0:
+                in_band &= (distance > band.inner) | ~is_point
+
+            # Points are inside or outside a band outright
+            points = in_band & is_point
+            band_works.append(works_idx[points])
+            band_values.append(values_idx[points])
+            band_geometry.append(candidates[points])
+            band_names.append(np.full(points.sum(), band.name, dtype=object))
+
+            # Lines and polygons are clipped to the band zone around their works feature
+            shapes = np.flatnonzero(in_band & ~is_point)
+            if len(shapes):
+                zone = shapely.buffer(work_geometry[works_idx[shapes]], band.outer)
+                if band.inner > 0:
+                    zone = shapely.difference(zone, shapely.buffer(work_geometry[works_idx[shapes]], band.inner))
+                clipped = shapely.intersection(candidates[shapes], zone)
+                if margin and band.inner > 0:
+                    # Whether a simplified polygon reaches past the inner edge of a ring is borderline too
+                    lod = np.flatnonzero(simplified[values_idx[shapes]])
+                    ring_works = work_geometry[works_idx[shapes[lod]]]
+                    inside = shapely.covers(shapely.buffer(ring_works, band.inner - edge_margin(band.inner)), candidates[shapes[lod]])
+                    near = shapely.covers(shapely.buffer(ring_works, band.inner + edge_margin(band.inner)), candidates[shapes[lod]])
+                    redo = lod[~inside & (near | shapely.is_empty(clipped[lod]))]
+                    clipped[redo] = shapely.intersection(np.asarray(value_geometry)[values_idx[shapes[redo]]], zone[redo])
+                clipped = self._keep_dimension(clipped, dimension[shapes])
+                keep = ~shapely.is_empty(clipped)
+                band_works.append(works_idx[shapes][keep])
+                band_values.append(values_idx[shapes][keep])
+                band_geometry.append(clipped[keep])
+                band_names.append(np.full(keep.sum(), band.name, dtype=object))
+
+        works_idx = np.concatenate(band_works)
+        values_idx = np.concatenate(band_values)
+        result = self._pair_frame(works, values, works_idx, values_idx, np.concatenate(band_geometry))
+        result[BAND_FIELD] = np.concatenate(band_names)
+        self._store(out_name, result)
+        return out_name     # by name, so selections on the join share one attribute table
+
+    def _pair_frame(self, works, values, works_idx, values_idx, geometry):
+        """Attributes of matched works/value pairs; duplicate names from values get a _1 suffix like Intersect"""
+        works_attributes = works.drop(columns=works.geometry.name).iloc[works_idx].reset_index(drop=True)
+        values_attributes = values.drop(columns=values.geometry.name).iloc[values_idx].reset_index(drop=True)
+        values_attributes.columns = [
+            f"{column}_1" if column in works_attributes.columns else column
+            for column in values_attributes.columns
+        ]
+        return self.gpd.GeoDataFrame(
+            self.pd.concat([works_attributes, values_attributes], axis=1),
+            geometry=geometry, crs=works.crs
+        )
+
+    def _keep_dimension(self, geometry, dimension):
+        """Drop lower-dimension slivers (e.g. touching polygon edges) from intersection output"""
+        shapely = self.shapely
+        mixed = shapely.get_dimensions(geometry) != dimension
+        mixed |= shapely.get_type_id(geometry) == 7  # GeometryCollection
+
+        for i in self.np.flatnonzero(mixed):
+            parts = shapely.get_parts(geometry[i])
+            parts = parts[shapely.get_dimensions(parts) == dimension[i]]
+            geometry[i] = shapely.union_all(parts) if len(parts) else shapely.Point()
+        return geometry
+
+    def dissolve(self, layer, out_name: str, fields: List[str]):
+        frame = self._frame(layer)
+        fields = list(dict.fromkeys(fields))  # matrix field lists may repeat a field (e.g. RECORD_ID)
+        result = frame.dissolve(by=fields, as_index=False, dropna=False)
+        return self._store(out_name, result)
+
+    def aggregate(self, layer, fields: List[str]) -> Iterator[tuple]:
+        shapely = self.shapely
+        np = self.np
+        frame = self._frame(layer)
+        if len(frame) == 0:
+            return
+        geometry_type = self.shape_type(frame)
+        if geometry_type not in ["POINT", "MULTIPOINT", "POLYGON", "POLYLINE"]:
+            raise ValueError(f"Unsupported geometry type: {geometry_type}")
+
+        # Group ids in sorted key order (nulls last), same rows and order as dissolve
+        group_fields = list(dict.fromkeys(fields))
+        group_ids = frame.groupby(group_fields, dropna=False, sort=True).ngroup().values
+        order = np.argsort(group_ids, kind="stable")
+        _, starts = np.unique(group_ids[order], return_index=True)
+
+        attributes = frame[fields].iloc[order[starts]]
+        attributes = attributes.astype(object).where(attributes.notna(), None)
+
+        # Geometry of single-row groups is used as is, only groups of several rows are unioned
+        geometry = frame.geometry.values
+        merged = geometry[order[starts]]
+        sizes = np.diff(np.append(starts, len(order)))
+        for i in np.flatnonzero(sizes > 1):
+            merged[i] = shapely.union_all(geometry[order[starts[i]:starts[i] + sizes[i]]])
+        x, y = self._label_xy(merged, geometry_type)
+
+        for row, row_x, row_y in zip(attributes.itertuples(index=False, name=None), x, y):
+            yield row + (row_x, row_y)
+
+    def list_fields(self, layer) -> List[str]:
+        frame = self._frame(layer)
+        return [column for column in frame.columns if column != frame.geometry.name]
+
+    def shape_type(self, layer) -> str:
+        frame = self._frame(layer)
+        geom_types = set(frame.geometry.geom_type.dropna())
+        if geom_types <= {"Point"}:
+            return "POINT"
+        if geom_types <= {"Point", "MultiPoint"}:
+            return "MULTIPOINT"
+        if geom_types <= {"LineString", "MultiLineString"}:
+            return "POLYLINE"
+        if geom_types <= {"Polygon", "MultiPolygon"}:
+            return "POLYGON"
+        return ", ".join(sorted(geom_types)).upper()
+
+    def add_geometry_fields(self, layer) -> str:
+        shapely = self.shapely
+        np = self.np
+        frame = self._frame(layer)
+        geometry_type = self.shape_type(layer)
+        if geometry_type not in ["POINT", "MULTIPOINT", "POLYGON", "POLYLINE"]:
+            raise ValueError(f"Unsupported geometry type: {geometry_type}")
+
+        # All metrics as array operations over the whole layer, empty geometries get 0
+        geometry = frame.geometry.values
+        missing = shapely.is_missing(geometry) | shapely.is_empty(geometry)
+        x, y = self._label_xy(geometry, geometry_type)
+        frame["X"] = np.where(missing, 0, x)
+        frame["Y"] = np.where(missing, 0, y)
+        if geometry_type == "POLYGON":
+            frame["AREA_HA"] = self._geodesic_measures(geometry, missing, geometry_type) / 10000
+        elif geometry_type == "POLYLINE":
+            frame["LENGTH_KM"] = self._geodesic_measures(geometry, missing, geometry_type) / 1000
+
+        return geometry_type
+
+    def _geodesic_measures(self, geometry, missing, geometry_type: str):
+        """Area (m2) or length (m) of each geometry on the GRS80 ellipsoid, as arcpy's GEODESIC measures; 0 where missing"""
+        from pyproj import Geod
+
+        geod = Geod(ellps="GRS80")
+        geographic = self.gpd.GeoSeries(geometry[~missing], crs=f"EPSG:{OUTPUT_WKID}").to_crs(epsg=GEOGRAPHIC_WKID).values
+        if geometry_type == "POLYGON":
+            measures = [abs(geod.geometry_area_perimeter(shape)[0]) for shape in geographic]
+        else:
+            measures = [geod.geometry_length(shape) for shape in geographic]
+        result = self.np.zeros(len(geometry))
+        result[~missing] = measures
+        return result
+
+    def _label_xy(self, geometry, geometry_type: str):
+        """Truncated X and Y arrays: centroid (inside the polygon, like arcpy) or line midpoint; 0 where missing"""
+        shapely = self.shapely
+        np = self.np
+        if geometry_type == "POLYLINE":
+            points = shapely.line_interpolate_point(geometry, 0.5, normalized=True)
+        else:
+            points = shapely.centroid(geometry)
+            if geometry_type == "POLYGON":
+                outside = ~shapely.covers(geometry, points) & ~shapely.is_empty(geometry)
+                points[outside] = shapely.point_on_surface(geometry[outside])
+        return np.nan_to_num(np.trunc(shapely.get_x(points))), np.nan_to_num(np.trunc(shapely.get_y(points)))
+
+    def search(self, layer, fields: List[str]) -> Iterator[tuple]:
+        attributes = self._frame(layer)[fields]
+
+        # Match cursor behaviour: nulls come back as None, not NaN
+        attributes = attributes.astype(object).where(attributes.notna(), None)
+        yield from attributes.itertuples(index=False, name=None)
+
+    def export(self, layer, out_folder: str, out_name: str) -> str:
+        out_path = os.path.join(out_folder, f"{out_name}.shp")
+        self._frame(layer).to_file(out_path, engine="pyogrio")
+        return out_path
+
+    def delete(self, layer):
+        self.layers.pop(layer, None)
+        self._trees.pop(layer, None)
+        self._indexed.pop(layer, None)
+        self._bounds.pop(layer, None)
+        self._drop_lod(layer)
+        self.pinned.discard(layer)
+        connection = self._sql_tables.pop(layer, None)
+        if connection is not None:
+            connection.close()
+
+    def share(self, layer, folder: Path):
+        # In-memory layers are written once as uncompressed GeoParquet (columns read straight into arrays) with
+        # the bounds of their features beside it, which every worker memory-maps for its prefilter queries.
+        # Without pyarrow they go to a GeoPackage the workers read once
+        folder.mkdir(parents=True, exist_ok=True)
+        frame = self._frame(layer)
+        try:
+            import pyarrow
+        except ImportError:
+            out_path = str(folder / f"{layer}.gpkg")
+            frame.to_file(out_path, layer=layer, engine="pyogrio")
+            return out_path
+        out_path = str(folder / f"{layer}.parquet")
+        frame.to_parquet(out_path, index=False, compression=None)
+        geometry = frame.geometry.values
+        self.np.save(folder / f"{layer}.bounds.npy", self.shapely.bounds(geometry[~self.shapely.is_missing(geometry)]))
+        return out_path
+
+    def attach(self, shared, name: str):
+        if not str(shared).endswith(".parquet"):
+            self._store(name, self._read_source(shared))
+            return name
+        self._store(name, self.gpd.read_parquet(shared))
+        self._bounds[name] = self.np.load(str(shared)[:-len(".parquet")] + ".bounds.npy", mmap_mode="r")
+        return name
+
+    def content_hash(self, layer) -> str:
+        frame = self._frame(layer)
+        attributes = frame.drop(columns=frame.geometry.name)
+        digest = hashlib.sha256()
+        digest.update(",".join(map(str, attributes.columns)).encode())
+        digest.update(self.pd.util.hash_pandas_object(attributes, index=False).values.tobytes())
+        for wkb in self.shapely.to_wkb(frame.geometry.values):
+            digest.update(wkb or b"")
+        return digest.hexdigest()
+
+    def feature_hashes(self, layer, id_field: str) -> Dict[str, str]:
+        frame = self._frame(layer)
+        attributes = frame.drop(columns=frame.geometry.name)
+        row_hashes = self.pd.util.hash_pandas_object(attributes, index=False).values
+        wkbs = self.shapely.to_wkb(frame.geometry.values)
+        digests = {}
+        for work_id, row_hash, wkb in zip(attributes[id_field].astype(str), row_hashes, wkbs):
+            digest = digests.setdefault(work_id, hashlib.sha1())
+            digest.update(row_hash.tobytes())
+            digest.update(wkb or b"")
+        return {work_id: digest.hexdigest() for work_id, digest in digests.items()}
+
+    def save_layer(self, layer, path: Path) -> str:
+        out_path = f"{path}.gpkg"
+        self._frame(layer).to_file(out_path, layer="layer", engine="pyogrio")
+        return out_path
+
+    def load_layer(self, path: str, out_name: str):
+        self._store(out_name, self._read_source(path))
+        return out_name
+
+    def envelope(self, layers: List[Any], out_name: str):
+        bounds = self.np.array([self._frame(layer).total_bounds for layer in layers])
+        box = self.shapely.box(bounds[:, 0].min(), bounds[:, 1].min(), bounds[:, 2].max(), bounds[:, 3].max())
+        self._store(out_name, self.gpd.GeoDataFrame(geometry=[box], crs=f"EPSG:{OUTPUT_WKID}"))
+        return out_name
+
+    def pin(self, layer):
+        self.pinned.add(layer)
+
+
+# ============================================================================
+# Backend Registry
+# ============================================================================
+
+BACKENDS = {
+    'arcpy': ArcpyBackend,
+    'shapely': ShapelyBackend,
+}
+
+
+def get_backend(name: str) -> GeometryBackend:
+    """Create a geometry backend by name"""
+    try:
+        return BACKENDS[name.lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown geometry backend: {name}. Options: {', '.join(BACKENDS)}")
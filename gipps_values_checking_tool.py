@@ -5,18 +5,29 @@
 # Gippsland rulz
 # ============================================================================
 
-import arcpy
-import pandas as pd
+import argparse
 import logging
 import os
+import shutil
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Union
 from dataclasses import dataclass
 
 from dataset_matrix import DATASET_MATRIX
 from qbid_matrix import QBID_MATRIX, QBID2_MATRIX
-from mitigations import FOREST_MITIGATIONS, HERITAGE_MITIGATIONS, NATIVE_TITLE_MATRIX
+from mitigation_engine import MitigationEngine
+from risk_register import RiskRegisters
+from geometry_backend import BAND_FIELD, BufferBand, get_backend, parse_distance
+from source_cache import SourceCache
+from buffer_cache import BufferCache
+from job_plan import JobPlan, OverlayJob, compile_plan, where_fields
+from incremental import (HASH_FIELD, diff_works, find_previous_run, id_where_clause,
+                         iter_carried_results, load_previous_hashes, write_run_manifest)
+from output_writers import ThemeReport, write_columnar_table
+from profiling import RunProfile
+from row_builder import ResultBatch, RowBuilder, result_columns
+from scheduler import DatasetJob, group_jobs_by_source, in_job_order, run_source_groups
 
 
 # ============================================================================
@@ -31,10 +42,28 @@ class Settings:
     mode: str = "DAP"
     themes: List[str] = None
     district: str = None
+    backend: str = "arcpy"
+    workers: int = 1
+    buffer_cache: Optional[str] = None      # folder for buffers reused across runs (None = no cache)
+    buffer_cache_max_mb: int = 2048
+    previous_run: Optional[str] = None      # folder of an earlier run to re-check incrementally against
+    output_formats: List[str] = None        # columnar copies of the CSV reports: "parquet", "feather"
+    risk_registers: Dict[str, str] = None   # risk register layers by name (dap, lrli, jfmp)
+    risk_register_field: str = "MITIGATION" # register field with the advice for each EVC/taxon
+    lod_tolerance: Optional[float] = None   # metres - simplified copies of dense polygon sources find overlay candidates (None = off)
+    spatial_index: Optional[str] = None     # folder of values source spatial index sidecars (None = read sources cold)
+    snapshots: Optional[str] = None         # folder of local GeoParquet snapshots of the values sources (None = read the sources)
+    prefetch: int = 0                       # values sources loaded ahead in the background while overlays run (0 = off)
     
     def __post_init__(self):
         if self.themes is None:
             self.themes = ["forests", "biodiversity"]
+        if self.output_formats is None:
+            self.output_formats = []
+        if self.lod_tolerance is not None:
+            smallest = min(parse_distance(config['buffer_distance']) for config in BUFFERS.values())
+            if not 0 < self.lod_tolerance < smallest:
+                raise ValueError(f"lod_tolerance must be between 0 and the smallest buffer ({smallest:g}m), got {self.lod_tolerance}")
         self.workspace = Path(self.workspace)
         self.workspace.mkdir(exist_ok=True)
 
@@ -61,12 +90,45 @@ class DatasetConfig:
 class ValuesChecker:
     """Main processing engine for values checking"""
     
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, backend=None, warm_sources=None, register_cache: Optional[Dict] = None):
+        """
+        backend, warm_sources and register_cache are shared by the runs of a batch (see batch_runner.py):
+        an already set up geometry backend, sources kept loaded across runs, and risk registers by mode
+        """
         self.settings = settings
         self.logger = self._setup_logging()
         self.start_date = datetime.now().strftime("%Y%m%d") #("%d%m%Y")
         self.temp_datasets = []
-        self._setup_arcpy_environment()
+        self.buffer_bands = {}
+        self.source_cache = None
+        self.buffer_cache = None
+        self.works_hashes = {}
+        self.previous_run = None
+        self.works_diff = None
+        self.theme_writers = {}
+        self.mitigation_engine = None   # built with the mode's risk registers in Phase 1
+        self.profile = RunProfile()
+        self.warm_sources = warm_sources
+        self.register_cache = register_cache if register_cache is not None else {}
+        self._backend = None
+        if backend is not None:
+            self._set_backend(backend)
+    
+    @property
+    def backend(self):
+        """Geometry backend, created on first use - planning a run never imports arcpy"""
+        if self._backend is None:
+            self._set_backend(get_backend(self.settings.backend))
+        return self._backend
+    
+    def _set_backend(self, backend):
+        """Instrument a backend and apply this run's settings to it"""
+        self._backend = self.profile.instrument(backend)
+        self._backend.setup_environment(self.settings.workspace)
+        self._backend.set_lod_tolerance(self.settings.lod_tolerance)
+        self._backend.set_spatial_index(self.settings.spatial_index)
+        if self.settings.snapshots:
+            self._backend.set_snapshots(self.settings.snapshots, self._source_fields())
     
     def process(self) -> Dict:
         """
@@ -78,39 +140,55 @@ class ValuesChecker:
         3. Apply mitigations to results
         4. Generate output files
         6. Cleanup temporary data
+        
+        Phases 2-3 stream: each dataset's results are mitigated and appended to
+        their theme CSV as soon as the dataset is done, so only one dataset's
+        results are held in memory at a time. Results are not returned: they are
+        in the theme CSVs listed in 'outputs', and 'counts' has the rows written per theme.
         """
         try:
             self.logger.info(f"Starting values checking - Mode: {self.settings.mode}")
             
             # Phase 1: Data Preparation
             self.logger.info("Phase 1: Preparing data...")
-            self._setup_workspace()
-            working_data = self._prepare_input_data()
-            buffered_layers = self._create_all_buffers(working_data)
-            
-            # Phase 2: Values Detection
-            self.logger.info("Phase 2: Detecting values...")
-            all_results = {}
-            for theme in self.settings.themes:
-                self.logger.info(f"Processing {theme} theme...")
-                theme_results = self._process_single_theme(theme, buffered_layers)
-                all_results[theme] = theme_results
-                self.logger.info(f"Found {len(theme_results)} values for {theme} theme")
-                print("-" * 60)
+            with self.profile.span("phase", "prepare"):
+                self._setup_workspace()
+                working_data = self._prepare_input_data()
+                check_data = self._select_works_to_check(working_data)
+                self._load_risk_registers()
+                jobs = self._build_dataset_jobs()
+                self._open_theme_writers(jobs)
+                self._carry_over_previous_results()
             
-            # Phase 3: Apply Mitigations
-            self.logger.info("Phase 3: Applying mitigations...")
-            mitigated_results = self._apply_all_mitigations(all_results)
+            if check_data:
+                with self.profile.span("phase", "buffers"):
+                    buffered_layers = self._create_all_buffers(check_data)
+                
+                # Phases 2 & 3: Values Detection, with mitigations applied as results stream to the theme CSVs
+                self.logger.info("Phase 2: Detecting values...")
+                self.logger.info("Phase 3: Applying mitigations as values are found...")
+                with self.profile.span("phase", "detect"):
+                    self._detect_all_values(jobs, check_data, buffered_layers)
+            else:
+                self.logger.info("No added or changed works - skipping buffers and values detection")
             
             # Phase 4: Generate Outputs
             self.logger.info("Phase 4: Generating outputs...")
-            outputs = self._generate_all_outputs(mitigated_results, working_data)
+            with self.profile.span("phase", "outputs"):
+                outputs = self._generate_all_outputs(working_data)
+                result_counts = {theme: writer.rows_written for theme, writer in self.theme_writers.items()}
+                self.profile.record(rows_written=sum(result_counts.values()))
+            
+            # Run profile - where the time went, per phase, theme, dataset and buffer
+            outputs.extend(self.profile.write(self.settings.workspace, f"{self.start_date}_{self.settings.mode}"))
             
             self.logger.info("Processing completed successfully")
-            return {'success': True, 'outputs': outputs, 'results': mitigated_results}
+            return {'success': True, 'outputs': outputs, 'counts': result_counts, 'profile': self.profile.summary()}
             
         except Exception as e:
             self.logger.error(f"Processing failed: {e}", exc_info=True)
+            for writer in self.theme_writers.values():
+                writer.abort()
             return {'success': False, 'error': str(e)}
             
         finally:
@@ -123,325 +201,474 @@ class ValuesChecker:
     
     def _setup_workspace(self):
         """Setup output geodatabase"""
-        output_gdb = self.settings.workspace / "Values_Checking_Output.gdb"
-        if output_gdb.exists():
-            arcpy.env.workspace = str(output_gdb)
-
-            # Clear existing data
-            self.logger.warning("Dataset deletion disabled for debugging - fix this later")
-            for fc in arcpy.ListFeatureClasses(): 
-                a = 1 # arcpy.management.Delete(fc) # !! NOTE: Temporarily disabled for faster debugging
-            for tbl in arcpy.ListTables(): 
-                arcpy.management.Delete(tbl)
-        else:
-            arcpy.management.CreateFileGDB(str(self.settings.workspace), "Values_Checking_Output.gdb")
-        
-        arcpy.env.workspace = str(output_gdb)
+        output_gdb = self.backend.setup_workspace(self.settings.workspace)
         self.logger.info(f"Workspace set up at {output_gdb}")
     
     def _prepare_input_data(self) -> str:
         """Create working copy of input data with geometry fields"""
         working_copy = "works_shapefile"
 
-        # create a copy of the input feature class, excluding features without valid ID_FIELD
-        arcpy.conversion.FeatureClassToFeatureClass(
-            self.settings.input_data, arcpy.env.workspace, working_copy,
-            f'{ID_FIELD} <> \'\''
-        )
+        # create a copy of the input feature class, excluding features without valid ID_FIELD (and other districts if one is set)
+        where_clause = f'{ID_FIELD} <> \'\''
+        if self.settings.district:
+            where_clause += f" AND {DISTRICT_FIELD} = '" + self.settings.district.replace("'", "''") + "'"
+        self.backend.copy_features(self.settings.input_data, working_copy, where_clause)
         
         # Add and calculate geometry fields
         self._add_geometry_fields(working_copy)
         self.temp_datasets.append(working_copy)
-        count_feat = arcpy.GetCount_management(working_copy)
+        count_feat = self.backend.count(working_copy)
+        if count_feat == 0:
+            raise ValueError(f"No works to check in {self.settings.input_data}" + (f" for {self.settings.district}" if self.settings.district else ""))
+        self.profile.record(rows_written=count_feat)
         self.logger.info(f"{self.settings.input_data} cleaned and copied ({count_feat} features)")
         
+        # Per-work content hashes - written to the works detail report for the next incremental run
+        self.works_hashes = self.backend.feature_hashes(working_copy, ID_FIELD)
+        
         return working_copy
     
+    def _select_works_to_check(self, working_data: str) -> Optional[str]:
+        """Works to buffer and check: all works, or only added/changed works when re-checking a previous run"""
+        if not self.settings.previous_run:
+            return working_data
+        
+        previous_run = find_previous_run(self.settings.previous_run, self.settings.mode)
+        if previous_run is None:
+            self.logger.warning(f"No previous {self.settings.mode} run found in {self.settings.previous_run} - checking all works")
+            return working_data
+        
+        missing_themes = [theme for theme in self.settings.themes if theme not in previous_run.themes]
+        if missing_themes:
+            self.logger.warning(f"Previous run did not check {', '.join(missing_themes)} - checking all works")
+            return working_data
+        
+        diff = diff_works(self.works_hashes, load_previous_hashes(previous_run.works_detail, ID_FIELD))
+        self.logger.info(
+            f"Incremental re-check against {previous_run.works_detail.name}: {len(diff.added)} added, "
+            f"{len(diff.changed)} changed, {len(diff.unchanged)} unchanged, {len(diff.deleted)} deleted"
+        )
+        self.previous_run = previous_run
+        self.works_diff = diff
+        
+        if not diff.to_check:
+            return None
+        
+        changed_works = "works_changed"
+        self.backend.copy_features(working_data, changed_works, id_where_clause(ID_FIELD, diff.to_check))
+        self.temp_datasets.append(changed_works)
+        return changed_works
+    
+    def _load_risk_registers(self):
+        """Load the risk registers for the mode once, and mitigate against them"""
+        registers = None
+        if self.settings.risk_registers:
+            registers = self.register_cache.get(self.settings.mode)
+            if registers is None:
+                registers = RiskRegisters.load(self.backend, self.settings.mode, self.settings.risk_registers,
+                                               self.settings.risk_register_field, self.logger)
+                self.register_cache[self.settings.mode] = registers
+        self.mitigation_engine = MitigationEngine(self.settings.mode, risk_registers=registers)
+    
     def _create_all_buffers(self, input_data: str) -> Dict[str, str]:
         """Create all required buffer distances for analysis"""
         buffers = {}
         buffer_names = []
+        cached_names = []
+        
+        # Buffers are cached by a hash of the works content, so edited works always get fresh buffers
+        cache_keys = {}
+        if self.settings.buffer_cache:
+            self.buffer_cache = BufferCache(self.backend, self.settings.buffer_cache, self.settings.buffer_cache_max_mb, self.logger)
+            input_hash = self.backend.content_hash(input_data)
         
         # Process buffers in dependency order
         for buffer_name, config in BUFFERS.items():
             buffer_layer = f"buffer_{buffer_name}"
-            buffer_path = os.path.join(arcpy.env.workspace, buffer_layer)
+            input_features = config['input_features']
             
-            if not arcpy.Exists(buffer_path):
-                # Determine input features - are we buffering the original features or buffering an existing buffer?
-                input_features = config['input_features']
-                if input_features == "input_layer":
-                    arcpy.analysis.Buffer(
-                    in_features=input_data,
-                    out_feature_class=buffer_layer,
-                    buffer_distance_or_field=config['buffer_distance'],
-                    line_side="FULL",
-                    line_end_type="ROUND",
-                    dissolve_option="NONE",
-                    dissolve_field=None,
-                    method="PLANAR"
-                )
+            if self.buffer_cache:
+                parent_key = cache_keys.get(input_features[len("buffer_"):]) if input_features != "input_layer" else None
+                cache_keys[buffer_name] = self.buffer_cache.key(input_hash, config, parent_key)
+            
+            with self.profile.span("buffer", buffer_name) as span:
+                if self.buffer_cache and self.buffer_cache.fetch(cache_keys[buffer_name], buffer_layer):
+                    cached_names.append(buffer_name)
+                    span['cached'] = True
                 else:
-                    # Use previously created buffer
-                    input_path = os.path.join(arcpy.env.workspace, config['input_features'])
-                    arcpy.analysis.Buffer(
-                    in_features=input_path,
-                    out_feature_class=buffer_layer,
-                    buffer_distance_or_field=config['buffer_distance'],
-                    line_side="OUTSIDE_ONLY",
-                    line_end_type="ROUND",
-                    dissolve_option="NONE",
-                    dissolve_field=None,
-                    method="PLANAR"
-                )
+                    # Determine input features - are we buffering the original features or buffering an existing buffer?
+                    if input_features == "input_layer":
+                        self.backend.buffer(input_data, buffer_layer, config['buffer_distance'], "FULL")
+                    else:
+                        # Use previously created buffer
+                        self.backend.buffer(input_features, buffer_layer, config['buffer_distance'], "OUTSIDE_ONLY")
+                    if self.buffer_cache:
+                        self.buffer_cache.store(cache_keys[buffer_name], buffer_layer)
+                    buffer_names.append(buffer_name)
+                span['rows_written'] = self.backend.count(buffer_layer)
             
             buffers[buffer_name] = buffer_layer
+            self.buffer_bands[buffer_name] = self._resolve_buffer_band(buffer_name)
             self.temp_datasets.append(buffer_layer)
             self.logger.debug(f"Created {buffer_name} buffer with type {config['buffer_type']}")
-            buffer_names.append(buffer_name)
         
-        self.logger.info(f"Buffers created: {', '.join(buffer_names)}")
+        if buffer_names:
+            self.logger.info(f"Buffers created: {', '.join(buffer_names)}")
+        if cached_names:
+            self.logger.info(f"Buffers reused from cache: {', '.join(cached_names)}")
         return buffers
     
+    @staticmethod
+    def _resolve_buffer_band(buffer_name: str) -> tuple:
+        """Distance band (inner, outer) in metres covered by a buffer, e.g. 1000m_ring -> (500, 1000)"""
+        config = BUFFERS[buffer_name]
+        distance = parse_distance(config['buffer_distance'])
+        if config['input_features'] == "input_layer":
+            return (0.0, distance)
+        
+        # Buffer of a buffer - OUTSIDE_ONLY ring starting at the outer edge of its input buffer
+        _, parent_outer = ValuesChecker._resolve_buffer_band(config['input_features'][len("buffer_"):])
+        return (parent_outer, parent_outer + distance)
+    
     # ========================================================================
     # Phase 2: Values Detection Methods
     # ========================================================================
     
-    def _process_single_theme(self, theme: str, buffered_layers: Dict[str, str]) -> List[Dict]:
-        """Process all datasets for a single theme"""
-              
-        # Get dataset configurations for this theme
-        if theme not in DATASET_MATRIX:
-            self.logger.warning(f"No datasets configured for theme: {theme}")
-            return []
+    def _detect_all_values(self, jobs: List[DatasetJob], working_data: str, buffered_layers: Dict[str, str]):
+        """Run every dataset job, in-process or across a worker pool, streaming mitigated results to the theme CSVs"""
+        plan = self._compile_plan(jobs, working_data)
+        self.logger.info(f"Job plan: {plan.summary()}")
+        if self.settings.workers > 1:
+            job_results = self._process_jobs_in_parallel(jobs, plan, working_data, buffered_layers)
+        else:
+            job_results = self._process_jobs_sequentially(jobs, plan, working_data, buffered_layers)
+        
+        found = {theme: 0 for theme in self.settings.themes}
+        for job, results in job_results:
+            found[job.theme] += self.theme_writers[job.theme].write(self._apply_mitigations(job.theme, results))
         
-        theme_datasets = DATASET_MATRIX[theme]
+        for theme in self.settings.themes:
+            self.logger.info(f"Found {found[theme]} values for {theme} theme")
+    
+    def _process_jobs_sequentially(self, jobs: List[DatasetJob], plan: JobPlan, working_data: str, buffered_layers: Dict[str, str]) -> Iterator[tuple]:
+        """Run the plan's overlays theme by theme in this process, yielding (job, results) in job order as datasets finish"""
+        overlays = plan.overlays
+        self._plan_source_reads(overlays, working_data)
         
-        # Process each dataset in the theme
-        all_theme_results = []
+        def run_themes():
+            for theme in self.settings.themes:
+                self.logger.info(f"Processing {theme} theme...")
+                with self.profile.span("theme", theme):
+                    # An overlay shared with a later theme runs with the theme of its first dataset
+                    yield from self._process_overlays([overlay for overlay in overlays if overlay.jobs[0].theme == theme],
+                                                      working_data, buffered_layers)
+                self.logger.info("-" * 60)
+        
+        try:
+            yield from in_job_order(jobs, run_themes())
+        finally:
+            self.source_cache.clear()
+    
+    def _compile_plan(self, jobs: List[DatasetJob], working_data: str) -> JobPlan:
+        """Shared overlays for the jobs (see job_plan.py)"""
+        return compile_plan(jobs, self.backend.list_fields(working_data))
+    
+    def plan(self) -> JobPlan:
+        """Compiled job plan for the mode and themes (--plan) - reads no data and loads no backend"""
+        works_fields = [ID_FIELD, NAME_FIELD, DESCRIPTION_FIELD, DISTRICT_FIELD, RISK_LEVEL_FIELD, "X", "Y", "AREA_HA", "LENGTH_KM"]
+        return compile_plan(self._build_dataset_jobs(), works_fields)
+    
+    def build_index(self) -> Dict[str, str]:
+        """
+        Build or refresh the spatial index sidecar of every distinct source in DATASET_MATRIX (--build-index)
         
-        for dataset_name, config in theme_datasets.items():
+        Every theme and mode is covered, so one build serves every run until a source changes.
+        Returns the outcome for each source path: built, up to date, missing or the error.
+        """
+        if not self.settings.spatial_index:
+            raise ValueError("No spatial index folder configured (SPATIAL_INDEX)")
+        return self._refresh_sources(self.backend.index_source)
+    
+    def build_snapshots(self) -> Dict[str, str]:
+        """Take or refresh the local snapshot of every distinct source in DATASET_MATRIX (--snapshot), as build_index does"""
+        if not self.settings.snapshots:
+            raise ValueError("No snapshot folder configured (SNAPSHOTS)")
+        return self._refresh_sources(self.backend.snapshot_source)
+    
+    def _refresh_sources(self, refresh) -> Dict[str, str]:
+        """Run refresh(path) on every source path, returning built / up to date / missing / failed for each"""
+        outcomes = {}
+        for path in self._source_fields():
+            if not self.backend.exists(path):
+                outcomes[path] = "missing"
+                continue
             try:
-                # Unpack configuration fields, applying defaults & type
+                outcomes[path] = "built" if refresh(path) else "up to date"
+            except NotImplementedError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Could not refresh {path}: {e}")
+                outcomes[path] = f"failed: {e}"
+        return outcomes
+    
+    def _source_fields(self) -> Dict[str, List[str]]:
+        """Every DATASET_MATRIX source path (any theme or mode) with the fields read from it: configured, value/id/description and where clause fields"""
+        fields = {}
+        for datasets in DATASET_MATRIX.values():
+            for config in datasets.values():
                 config = DatasetConfig(**config)
-
-                if self._is_dataset_enabled_for_mode(config):
-                    for buffer in self._get_buffer_list(config):
-                        dataset_results = self._process_single_dataset(dataset_name, config, buffer, theme)
-                        all_theme_results.extend(dataset_results)
-                        self.logger.info(f"Processed {dataset_name} with {buffer[7:]} buffer: {len(dataset_results)} values found")
-                else:
-                    self.logger.info(f"Skipped {dataset_name} as it is disabled in {MODE} mode")
+                names = fields.setdefault(config.path.format(**DATA_PATHS), set())
+                names.update(config.fields)
+                for name in (config.value_field, config.id_field, config.description_field):
+                    names.update([name] if isinstance(name, str) else name or [])
+                names.update(where_fields(config.where_clause))
+        return {path: sorted(names) for path, names in fields.items()}
+    
+    def _build_dataset_jobs(self) -> List[DatasetJob]:
+        """List the dataset jobs enabled for the current mode and themes"""
+        jobs = []
+        for theme in self.settings.themes:
+            # Get dataset configurations for this theme
+            if theme not in DATASET_MATRIX:
+                self.logger.warning(f"No datasets configured for theme: {theme}")
+                continue
+            
+            for dataset_name, config in DATASET_MATRIX[theme].items():
+                try:
+                    # Unpack configuration fields, applying defaults & type
+                    config = DatasetConfig(**config)
+                    
+                    if self._is_dataset_enabled_for_mode(config):
+                        jobs.append(DatasetJob(len(jobs), theme, dataset_name, config.path.format(**DATA_PATHS), self._get_buffer_list(config),
+                                               config.where_clause, config.high_risk_only))
+                    else:
+                        self.logger.info(f"Skipped {dataset_name} as it is disabled in {self.settings.mode} mode")
+                except Exception as e:
+                    self.logger.warning(f"Failed to process {dataset_name}: {e}")
+        return jobs
+    
+    def _plan_source_reads(self, overlays: List[OverlayJob], working_data: str):
+        """Register every source read of the overlays (in run order) so each path is loaded once, to its largest buffer"""
+        self.source_cache = SourceCache(self.backend, working_data, self.logger, warm=self.warm_sources)
+        for overlay in overlays:
+            distance = max(self.buffer_bands[name][1] for name in overlay.buffer_names)
+            self.source_cache.plan(overlay.path, distance)
+        if self.settings.prefetch and self.backend.background_reads:
+            self.source_cache.prefetch(self.settings.prefetch)
+    
+    def _process_jobs_in_parallel(self, jobs: List[DatasetJob], plan: JobPlan, working_data: str, buffered_layers: Dict[str, str]) -> Iterator[tuple]:
+        """
+        Run jobs grouped by source across a process pool, each worker in its own scratch workspace
+        
+        Yields (job, results) in job order, the same order as a sequential run regardless of
+        which group finished first - results that arrive early wait until the jobs before them are done.
+        """
+        scratch = self.settings.workspace / "scratch"
+        shared_works = self.backend.share(working_data, scratch / "shared")
+        shared_buffers = {name: self.backend.share(layer, scratch / "shared") for name, layer in buffered_layers.items()}
+        
+        groups = group_jobs_by_source(jobs, LARGE_SOURCES)
+        for group in groups:
+            # An overlay's datasets all read its source, so every overlay belongs to exactly one group
+            group.overlays = [overlay for overlay in plan.overlays if overlay.path == group.path]
+        self.logger.info(f"Running {len(jobs)} dataset jobs ({len(groups)} sources) on {self.settings.workers} workers")
+        
+        def run_groups():
+            for group, outcome in run_source_groups(
+                groups, self.settings.workers, _run_source_group,
+                initializer=_init_worker,
+                initargs=(self.settings, DATA_PATHS, shared_works, shared_buffers, self.buffer_bands),
+                logger=self.logger
+            ):
+                group_results = {}
+                if outcome is not None:     # None = group failed - already logged
+                    group_results, spans = outcome
+                    self.profile.merge(spans)
+                yield {job.order: group_results.get(job.order, ResultBatch()) for job in group.jobs}
+        
+        try:
+            yield from in_job_order(jobs, run_groups())
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+    
+    def _attach_worker(self, shared_works: str, shared_buffers: Dict[str, str], buffer_bands: Dict[str, tuple]):
+        """Set up this checker as a pool worker with its own scratch workspace"""
+        scratch = self.settings.workspace / "scratch" / f"worker_{os.getpid()}"
+        scratch.mkdir(parents=True, exist_ok=True)
+        self.backend.setup_workspace(scratch)
+        self.working_data = self.backend.attach(shared_works, "works_shapefile")
+        self.buffered_layers = {name: self.backend.attach(shared, f"buffer_{name}") for name, shared in shared_buffers.items()}
+        self.buffer_bands = buffer_bands
+    
+    def _process_source_group(self, group) -> tuple:
+        """Worker entry point: run all jobs reading one source, sharing a single read of it; returns (results, profile spans)"""
+        self.profile.reset()
+        self._plan_source_reads(group.overlays, self.working_data)
+        job_results = {}
+        try:
+            for overlay_results in self._process_overlays(group.overlays, self.working_data, self.buffered_layers):
+                job_results.update(overlay_results)
+        finally:
+            self.source_cache.clear()
+        return job_results, self.profile.spans
+    
+    def _process_overlays(self, overlays: List[OverlayJob], working_data: str, buffered_layers: Dict[str, str]) -> Iterator[Dict[int, ResultBatch]]:
+        """Run overlays one at a time, yielding {job order: results} for the datasets of each"""
+        for overlay in overlays:
+            yield self._process_overlay(overlay, working_data, buffered_layers)
+    
+    def _process_overlay(self, overlay: OverlayJob, working_data: str, buffered_layers: Dict[str, str]) -> Dict[int, ResultBatch]:
+        """Join one overlay's source to the works once, then build the results of each of its datasets"""
+        buffers = ", ".join(overlay.buffer_names)
+        results = {job.order: ResultBatch() for job in overlay.jobs}
+        try:
+            with self.profile.span("overlay", overlay.name, buffers=buffers):
+                try:
+                    join_result = self._join_overlay(overlay, working_data, buffered_layers)
+                finally:
+                    self.source_cache.release(overlay.path)
+        except Exception as e:
+            self.logger.warning(f"Failed to process {', '.join(job.dataset_name for job in overlay.jobs)}: {e}")
+            return results
+        
+        for job in overlay.jobs:
+            try:
+                config = DatasetConfig(**DATASET_MATRIX[job.theme][job.dataset_name])
+                with self.profile.span("dataset", job.dataset_name, theme=job.theme, buffers=buffers):
+                    if join_result is None:
+                        results[job.order] = ResultBatch()
+                    else:
+                        # Datasets sharing the overlay each keep only the rows their own where clause selects
+                        layer = join_result
+                        if overlay.filters[job.order]:
+                            layer = self.backend.select(join_result, overlay.filters[job.order])
+                        results[job.order] = self._extract_results_from_intersection(job.dataset_name, layer, config, job.theme)
+                    self.profile.record(rows_written=len(results[job.order]))
+                self.logger.info(f"Processed {job.dataset_name} with {buffers} buffer: {len(results[job.order])} values found")
             except Exception as e:
-                self.logger.warning(f"Failed to process {dataset_name}: {e}")
-
-        return all_theme_results
+                self.logger.warning(f"Failed to process {job.dataset_name}: {e}")
+        return results
     
-    def _process_single_dataset(self, dataset_name: str, config: DatasetConfig, buffer_name: str, theme: str) -> List[Dict]:
-        """Process a single dataset using its configuration"""
+    def _join_overlay(self, overlay: OverlayJob, working_data: str, buffered_layers: Dict[str, str]):
+        """Distance join of an overlay's source to the works for all of its buffers; None if nothing to join"""
         
         # Step 1: Resolve dataset path and check existence
-        values_layer_path = config.path.format(**DATA_PATHS)
-
-        if not arcpy.Exists(values_layer_path):
+        values_layer_path = overlay.path
+        
+        if not self.backend.exists(values_layer_path):
             self.logger.warning(f"Dataset not found: {values_layer_path}")
-            return []
+            return None
         
-        # Step 2: Apply selection criteria to values layer if specified
-        values_layer = values_layer_path
-        if config.where_clause:
-            values_layer = arcpy.management.SelectLayerByAttribute(values_layer_path, "NEW_SELECTION", config.where_clause)
+        # Step 2: Prune the cached values layer to the largest buffer around the works, then apply selection criteria if specified
+        bands = [BufferBand(name, *self.buffer_bands[name], layer=buffered_layers[name]) for name in overlay.buffer_names]
+        max_distance = max(band.outer for band in bands)
+        values_layer = self.source_cache.subset(values_layer_path, overlay.where_clause, max_distance)
+        self.profile.record(pruned=self.source_cache.pruned.get((values_layer_path, max_distance)))
 
-        # Step 3: Apply LRLI filter to works layer if specified
-        if config.high_risk_only:
-            works_layer = arcpy.management.SelectLayerByAttribute(buffer_name, "NEW_SELECTION", f"{RISK_LEVEL_FIELD} <> 'LRLI'")
-        else:
-            works_layer = buffer_name
+        # Step 3: Apply LRLI filter to works layer (and buffers used by overlay fallbacks) if specified
+        works_layer = working_data
+        if overlay.high_risk_only:
+            high_risk_clause = f"{RISK_LEVEL_FIELD} <> 'LRLI'"
+            works_layer = self.backend.select(working_data, high_risk_clause)
+            for band in bands:
+                band.layer = self.backend.select(band.layer, high_risk_clause)
 
         # Step 4: quick check of how many features remain after selection/filtering
-        values_count = int(arcpy.GetCount_management(values_layer)[0])
-        works_count = int(arcpy.GetCount_management(works_layer)[0])
+        values_count = self.backend.count(values_layer)
+        works_count = self.backend.count(works_layer)
+        self.profile.record(rows_read=values_count)
         
-        # Step 5: Perform spatial intersection
+        # Step 5: Join values to works - each works->value distance is measured once for every buffer band
         if values_count > 0 and works_count > 0:
-            intersect_output = f"intersect_{dataset_name}_{buffer_name}"
-            intersect_result = arcpy.analysis.Intersect([works_layer, values_layer], intersect_output, "ALL")
-            self.temp_datasets.append(intersect_output)
+            join_output = f"join_{overlay.jobs[0].dataset_name}"
+            join_result = self.backend.distance_join(works_layer, values_layer, bands, join_output)
+            self.temp_datasets.append(join_output)
         else:
-            self.logger.warning(f"No features after selection criteria: {dataset_name}, {config.where_clause}")
-            return []
+            self.logger.warning(f"No features after selection criteria: {overlay.name}, {overlay.where_clause}")
+            return None
 
-        # Step 6: Extract and return results
-        if intersect_result:
-            return self._extract_results_from_intersection(dataset_name, intersect_result, config, theme, buffer_name)
-        else:
-            self.logger.warning(f"No intersections between: {buffer_name}, {dataset_name}")
-            return []
+        if join_result is None:
+            self.logger.warning(f"No intersections between: {', '.join(overlay.buffer_names)}, {overlay.name}")
+        return join_result
     
-    def _extract_results_from_intersection(self, dataset_name: str, intersect_result: str, config: DatasetConfig, theme: str, buffer_layer: str) -> List[Dict]:
+    def _extract_results_from_intersection(self, dataset_name: str, intersect_result: str, config: DatasetConfig, theme: str) -> ResultBatch:
         """Extract structured results from intersection output"""
         
         # Prepare and validate fields
-        available_fields = [f.name for f in arcpy.ListFields(intersect_result)]   # List all intersecting fields
+        available_fields = self.backend.list_fields(intersect_result)   # List all intersecting fields
         valid_fields = [ID_FIELD, NAME_FIELD, DESCRIPTION_FIELD, DISTRICT_FIELD, RISK_LEVEL_FIELD]   # list standard fields
         valid_fields.extend([f for f in config.fields if f in available_fields])  # add values configuration fields that exist in intersection
+        valid_fields.append(BAND_FIELD)  # keep each buffer band separate
         
         if len(valid_fields) < 3:  # Need at least DAP_REF_NO, DAP_NAME, DISTRICT
             self.logger.warning(f"Insufficient fields available for {intersect_result}")
-            return []
-        
-        # Dissolve features to deal with e.g. multiple intersections with same SMZ
-        dissolve_result = f"dissolve_{dataset_name}"
-        arcpy.analysis.PairwiseDissolve(intersect_result, dissolve_result, dissolve_field=valid_fields, multi_part="MULTI_PART")
-        self._add_geometry_fields(dissolve_result)
-        valid_fields.extend(['X', 'Y'])  # add coordinate fields to list of fields
-        self.temp_datasets.append(dissolve_result)
-
-        # Extract data using cursor
-        results = []
-        with arcpy.da.SearchCursor(dissolve_result, valid_fields) as cursor:
-            for row in cursor:
-                if not row[0]:  # Skip if no ID_FIELD
-                    continue
-                
-                # Build result in desired format
-                result = self._build_result_row(row, valid_fields, config, theme, buffer_layer)
-                
-                # add to output
-                results.append(result)
+            return ResultBatch()
+        
+        # Group on the fields to deal with e.g. multiple intersections with same SMZ - no dissolved layer needed
+        rows = self.backend.aggregate(intersect_result, valid_fields)
+        valid_fields = valid_fields + ['X', 'Y']  # aggregate adds coordinate fields to each row
+
+        # Field positions and QBID layout are worked out once for the whole dataset
+        works_fields = [ID_FIELD, DISTRICT_FIELD, NAME_FIELD, DESCRIPTION_FIELD, RISK_LEVEL_FIELD]
+        row_builder = RowBuilder(valid_fields, config, theme, self.start_date, works_fields, QBID_MATRIX.get(self.settings.mode, {}).get(theme))
+        
+        # Extract data from the grouped rows - held as columns, not a dict per result
+        results = row_builder.new_batch()
+        for row in rows:
+            if not row[0]:  # Skip if no ID_FIELD
+                continue
+            
+            # Build result in desired format and add to output
+            results.append(row_builder.record(row))
 
         return results
     
-    def _build_result_row(self, row: tuple, valid_fields: List[str], config: DatasetConfig, theme: str, buffer_layer: str) -> Dict:
-        """Build the base result structure common to all themes"""
-        result = {
-            # Standard fields for all values datasets - from works feature class
-            'UNIQUE_ID':   row[valid_fields.index(f'{ID_FIELD}')],
-            'DISTRICT':    row[valid_fields.index(f'{DISTRICT_FIELD}')],
-            'NAME':        row[valid_fields.index(f'{NAME_FIELD}')],
-            'DESCRIPTION': row[valid_fields.index(f'{DESCRIPTION_FIELD}')],
-            'RISK_LVL':    row[valid_fields.index(f'{RISK_LEVEL_FIELD}')],
-
-            # Details of values - from overlapping values feature class
-            'Theme': theme,
-            'Value_Type': config.value_type,
-            'Buffer': buffer_layer[7:], # Shorten buffer string, removing "buffer_" prefix,
-            'Value': None,
-            'Value_Description': None,
-            'Value_ID': None,
-            'X': int(row[valid_fields.index('X')] or 0),
-            'Y': int(row[valid_fields.index('Y')] or 0),
-            'QBID': None,
-            'QBID_Alt': None,
-            'DATE_CHECKED': self.start_date
-            # Any remaining fields specified by 'fields' in values dataset configuration will be appended here
-        }
-        
-        # Update value field data from value field or fields
-        if isinstance(config.value_field, str): 
-            # single value field; return single value to 'Value' field
-            result['Value'] = row[valid_fields.index(config.value_field)]
-        elif isinstance(config.value_field, list): 
-            # multiple value fields; concatenate into 'Value' field with ', ' separator
-            vf_values = []
-            for vf in config.value_field:
-                vf_values.append(row[valid_fields.index(vf)])
-            vf_string = ", ".join(str(item) for item in vf_values)
-            result['Value'] = vf_string
-
-        # Update Value_ID field data from specified field, if specified
-        if config.id_field:
-            result['Value_ID'] = row[valid_fields.index(config.id_field)]
-        
-        # Update Value_Description field data from specified field, if specified
-        if config.description_field:
-            result['Value_Description'] = row[valid_fields.index(config.description_field)]
-        
-        # Add any aditional fields specified in dataset configuration
-        for fieldname in config.fields:
-            if fieldname not in result: 
-                if fieldname not in filter(None, [config.value_field, config.id_field, config.description_field]):
-                    result[fieldname] = row[valid_fields.index(fieldname)] or 'Field not found'
-
-        # calculate quickbase id code
-        result['QBID_Test'] = self._build_quickbase_id(result, theme)
-
-        # alternative QBID
-        qbid_fields = ["UNIQUE_ID", "Value_Type", "Value", "Value_ID", "X", "Y"]
-        qbid_string = "|".join(str(result[item]) for item in qbid_fields if result[item] not in [None, "", 0])
-        result['QBID_Alt'] = qbid_string
-        
-        return result
-    
-    
     # ========================================================================
     # Phase 3: Mitigation Application Methods
     # ========================================================================
     
-    def _apply_all_mitigations(self, all_results: Dict) -> Dict:
-        """Apply appropriate mitigations to all theme results"""
-        mitigated_results = {}
-        
-        for theme, theme_results in all_results.items():
-            self.logger.info(f"Applying mitigations for {theme} theme...")
-            mitigated_results[theme] = []
-            
-            for result in theme_results:
-                # mitigation = self._determine_mitigation(theme, result)
-                if theme == "forests":
-                    # return self._get_forest_mitigation(result)
-                    """Get forest-specific mitigation"""
-                    value_type = result.get('Value_Type', '')
-                    mitigation = FOREST_MITIGATIONS.get(value_type, "Standard work practices apply")
-                elif theme == "heritage":
-                    # return self._get_heritage_mitigation(result)
-                    risk_level = result.get('RISK_LVL', 'DAP')
-                    sites_exist = 'Yes' if result.get('ACHRIS_ID') else 'No'
-                    sensitivity = result.get('CH_SENS', 'No')
-                    
-                    matrix_key = (risk_level, sites_exist, sensitivity)
-                    mitigation = HERITAGE_MITIGATIONS.get(matrix_key, "Heritage assessment required")
-                elif theme == "summary":
-                    # return self._get_native_title_mitigation(result)
-                    nt_status = result.get('NT_STATUS', '')
-                    risk_level = result.get('RISK_LVL', 'DAP')
-                    
-                    if 'EXTINGUISHED' in nt_status:
-                        mitigation = NATIVE_TITLE_MATRIX['NT_EXTINGUISHED']
-                    elif risk_level == 'LRLI':
-                        mitigation = NATIVE_TITLE_MATRIX['LOW_IMPACT']
-                    else:
-                        mitigation = NATIVE_TITLE_MATRIX['CONSULT']
-                elif theme == "biodiversity":
-                    mitigation = "Refer to NEP team. Standard biodiversity protection measures apply"
-                elif theme == "water":
-                    mitigation = "Ensure works comply with waterway protection requirements"
-                else:
-                    mitigation = "Standard work practices apply"
-                
-                result['mitigation'] = mitigation
-                mitigated_results[theme].append(result)
+    def _apply_mitigations(self, theme: str, theme_results: ResultBatch) -> ResultBatch:
+        """Apply appropriate mitigations to a batch of theme results, in bulk (see mitigation_engine)"""
+        return self.mitigation_engine.apply(theme, theme_results)
+    
+    def _carry_over_previous_results(self):
+        """Stream previous results for unchanged works into the theme CSVs (incremental re-check only)"""
+        if self.previous_run is None:
+            return
         
-        return mitigated_results
+        for theme in self.settings.themes:
+            theme_report = self.previous_run.theme_reports.get(theme)
+            if theme_report is None or not theme_report.exists():
+                continue
+            carried = self.theme_writers[theme].write(iter_carried_results(theme_report, self.works_diff.unchanged))
+            self.logger.info(f"Carried over {carried} {theme} values for unchanged works")
 
     
     # ========================================================================
     # Phase 4: Output Generation Methods
     # ========================================================================
     
-    def _generate_all_outputs(self, mitigated_results: Dict, working_data: str) -> List[str]:
+    def _generate_all_outputs(self, working_data: str) -> List[str]:
         """Generate all output files"""
         outputs = []
+        theme_reports = {}
         
-        # Generate CSV reports for each theme that has results
-        for theme, theme_results in mitigated_results.items():
-            if theme_results:
-                csv_file = self._create_theme_csv_report(theme, theme_results)
-                outputs.append(csv_file)
+        # Finish the reports of each theme that has results
+        for theme, writer in self.theme_writers.items():
+            report_files = writer.close()
+            if report_files:
+                self.logger.info(f"Created {theme} report: {', '.join(report_files)}")
+                theme_reports[theme] = report_files[0]     # CSV - carried over from by incremental runs
+                outputs.extend(report_files)
         
         # Generate works detail report
-        works_csv = self._create_works_detail_report(working_data)
-        outputs.append(works_csv)
+        works_reports = self._create_works_detail_report(working_data)
+        works_csv = works_reports[0]
+        outputs.extend(works_reports)
+        
+        # Record the run so the next one can re-check incrementally
+        manifest = self.settings.workspace / f"{self.start_date}_{self.settings.mode}_run_manifest.json"
+        write_run_manifest(manifest, self.settings.mode, self.settings.themes, works_csv, theme_reports)
 
         # Generate QuickBase reports
         
@@ -451,26 +678,24 @@ class ValuesChecker:
         
         return outputs
     
-    def _create_theme_csv_report(self, theme: str, results: List[Dict]) -> str:
-        """Create CSV report for a specific theme"""
-        df = pd.DataFrame(results)
-        
-        filename = f"{self.start_date}_{self.settings.mode}_{theme}_values.csv"
-        filepath = self.settings.workspace / filename
-        
-        df.to_csv(filepath, index=False)
-        self.logger.info(f"Created {theme} report: {filepath}")
-        
-        return str(filepath)
+    def _open_theme_writers(self, jobs: List[DatasetJob]):
+        """Create the report writers of each theme, with columns for every dataset the theme will run"""
+        for theme in self.settings.themes:
+            configs = [DatasetConfig(**DATASET_MATRIX[job.theme][job.dataset_name]) for job in jobs if job.theme == theme]
+            stem = self.settings.workspace / f"{self.start_date}_{self.settings.mode}_{theme}_values"
+            self.theme_writers[theme] = ThemeReport(stem, result_columns(configs) + ['mitigation'], self.settings.output_formats)
     
-    def _create_works_detail_report(self, working_data: str) -> str:
-        """Create detailed CSV report of all works"""
+    def _create_works_detail_report(self, working_data: str) -> List[str]:
+        """Create detailed CSV report of all works, plus any columnar copies; returns their paths, CSV first"""
+        import pandas as pd
+
         works_data = []
         fields = [ID_FIELD, NAME_FIELD, DESCRIPTION_FIELD, RISK_LEVEL_FIELD, DISTRICT_FIELD, "AREA_HA", "X", "Y"]
         
-        with arcpy.da.SearchCursor(working_data, fields) as cursor:
-            for row in cursor:
-                works_data.append(dict(zip(fields, row)))
+        for row in self.backend.search(working_data, fields):
+            work = dict(zip(fields, row))
+            work[HASH_FIELD] = self.works_hashes.get(str(work[ID_FIELD]))
+            works_data.append(work)
         
         df = pd.DataFrame(works_data)
         
@@ -480,16 +705,12 @@ class ValuesChecker:
         df.to_csv(filepath, index=False)
         self.logger.info(f"Created works detail report: {filepath}")
         
-        return str(filepath)
+        return [str(filepath)] + write_columnar_table(df, filepath.with_suffix(""), self.settings.output_formats)
     
     def _create_output_shapefile(self, working_data: str) -> str:
         """Create output shapefile of processed works"""
         filename = f"{self.start_date}_{self.settings.mode}_works"
-        filepath = self.settings.workspace / f"{filename}.shp"
-        
-        arcpy.conversion.FeatureClassToFeatureClass(
-            working_data, str(self.settings.workspace), filename
-        )
+        filepath = self.backend.export(working_data, str(self.settings.workspace), filename)
         
         self.logger.info(f"Created output shapefile: {filepath}")
         return str(filepath)
@@ -498,95 +719,11 @@ class ValuesChecker:
     # Utility and Helper Methods
     # ========================================================================
     
-    def _build_quickbase_id(self, rowdata:dict, theme:str) -> str:
-        try:        
-            qbid_fields = QBID_MATRIX[MODE][theme]
-            qbid_string = "|".join(str(rowdata[item]) for item in qbid_fields if rowdata[item] not in [None, "", 0])
-            
-            return qbid_string
-        
-        except Exception as e:
-            a=1
-            # self.logger.warning(f"Failed to generate QBID: {e}")
-        
-        try:
-            qbid_fields = ["UNIQUE_ID", "Value_Type", "Value", "Value_ID"]
-            qbid_string = "|".join(str(rowdata[item]) for item in qbid_fields if rowdata[item] not in [None, "", 0])
-
-            return qbid_string
-        
-        except Exception as e:
-            # self.logger.warning(f"Failed to generate QBID: {e}")
-            
-            return rowdata['UNIQUE_ID']
-
-    def _setup_arcpy_environment(self):
-        """Configure ArcPy environment settings"""
-        arcpy.env.overwriteOutput = True
-        arcpy.env.scriptWorkspace = str(self.settings.workspace)
-        arcpy.env.parallelProcessingFactor = "85%"
-        arcpy.SetLogHistory(False)
-        
-        # Set spatial reference to VICGRID2020
-        sr = arcpy.SpatialReference(7899)
-        arcpy.env.outputCoordinateSystem = sr
-    
     def _add_geometry_fields(self, feature_class: str):
         """Add and calculate geometry fields for the feature class based on geometry type"""
         try:
-            # Add coordinate fields to all feature classes
-            arcpy.management.AddField(feature_class, "X", "DOUBLE")
-            arcpy.management.AddField(feature_class, "Y", "DOUBLE")
-            
-            # Get the geometry type of the feature class
-            desc = arcpy.Describe(feature_class)
-            geometry_type = desc.shapeType.upper()
-            
-            # Add and populate appropriate fields based on geometry type
-            if geometry_type in ["POINT", "MULTIPOINT"]:
-
-                # Calculate point coordinates
-                with arcpy.da.UpdateCursor(feature_class, ["X", "SHAPE@X", "Y", "SHAPE@Y"]) as cursor:
-                    for row in cursor:
-                        row[0] = int(row[1]) if row[1] else 0  # Easting
-                        row[2] = int(row[3]) if row[3] else 0  # Northing
-                        cursor.updateRow(row)
-                        
-            elif geometry_type == "POLYGON":
-                arcpy.management.AddField(feature_class, "AREA_HA", "DOUBLE")
-                
-                # Calculate polygon centroid and area
-                with arcpy.da.UpdateCursor(feature_class, ["X", "Y", "AREA_HA", "SHAPE@"]) as cursor:
-                    for row in cursor:
-                        if row[3]:  # Check if geometry exists
-                            centroid = row[3].centroid
-                            # row[0] = int(centroid.X) if centroid.X else 0  # Easting
-                            # row[1] = int(centroid.Y) if centroid.Y else 0  # Northing
-                            row[2] = row[3].getArea('GEODESIC', 'HECTARES')  # Area in hectares
-                        else:
-                            row[0] = row[1] = row[2] = 0
-                        cursor.updateRow(row)
-                        
-            elif geometry_type == "POLYLINE":
-                arcpy.management.AddField(feature_class, "LENGTH_KM", "DOUBLE")
-
-                # Calculate line midpoint and length
-                with arcpy.da.UpdateCursor(feature_class, ["X", "Y", "LENGTH_KM", "SHAPE@"]) as cursor:
-                    for row in cursor:
-                        if row[3]:  # Check if geometry exists
-                            # Get midpoint of the line
-                            midpoint = row[3].positionAlongLine(0.5, True).firstPoint
-                            row[0] = int(midpoint.X) if midpoint.X else 0  # Easting
-                            row[1] = int(midpoint.Y) if midpoint.Y else 0  # Northing
-                            row[2] = row[3].getLength('GEODESIC', 'KILOMETERS')  # Length 
-                        else:
-                            row[0] = row[1] = row[2] = 0
-                        cursor.updateRow(row)
-            else:
-                self.logger.warning(f"Unsupported geometry type: {geometry_type}")
-                return
-                
-            # self.logger.info(f"Added geometry fields for {geometry_type} feature class: {feature_class}")
+            geometry_type = self.backend.add_geometry_fields(feature_class)
+            self.logger.debug(f"Added geometry fields for {geometry_type} feature class: {feature_class}")
             
         except Exception as e:
             self.logger.warning(f"Could not add geometry fields: {e}")
@@ -609,37 +746,37 @@ class ValuesChecker:
         return self.settings.mode in config.modes
 
     def _get_buffer_list(self, config:Dict) -> list:
-        """Determine buffer distance or distances for given mode and dataset"""
+        """Determine buffer name or names (e.g. '500m', '1000m_ring') for given mode and dataset"""
         
         # If buffer is a string, return as-is regardless of mode
         if isinstance(config.buffer, str):
-            return [f'buffer_{config.buffer}']
+            return [config.buffer]
         
         # If buffer is a dict, get mode-specific value or values
         if isinstance(config.buffer, dict):
-            return ['buffer_' + value for value in config.buffer[self.settings.mode]]
+            mode_buffers = config.buffer[self.settings.mode]
+            if isinstance(mode_buffers, str):
+                return [mode_buffers]
+            return [name for name in BUFFERS if name in mode_buffers]  # sets have no order - use BUFFERS order
         
     def _is_point_dataset(self, dataset_path: str) -> bool:
         """Check if a dataset has point geometry"""
         try:
-            desc = arcpy.Describe(dataset_path)
-            return desc.shapeType == 'Point'
+            return self.backend.shape_type(dataset_path) == 'POINT'
         except:
             return False
         
     def _is_polygon_dataset(self, dataset_path: str) -> bool:
         """Check if a dataset has polygon geometry"""
         try:
-            desc = arcpy.Describe(dataset_path)
-            return desc.shapeType == 'Polygon'
+            return self.backend.shape_type(dataset_path) == 'POLYGON'
         except:
             return False
     
     def _is_line_dataset(self, dataset_path: str) -> bool:
         """Check if a dataset has polygon geometry"""
         try:
-            desc = arcpy.Describe(dataset_path)
-            return desc.shapeType == 'Polyline'
+            return self.backend.shape_type(dataset_path) == 'POLYLINE'
         except:
             return False
     
@@ -655,12 +792,10 @@ class ValuesChecker:
     def _cleanup_temp_data(self):
         """Clean up all temporary datasets"""
         self.logger.info("Cleaning up temporary datasets...")
-        print("Dataset deletion disabled for debugging - fix this later")
         for dataset in self.temp_datasets:
             try:
-                if arcpy.Exists(dataset):
-                    # arcpy.management.Delete(dataset)          # !! NOTE: Temporarily disabled for faster debugging (don't build buffers every time)
-                    a = 1
+                if self.backend.exists(dataset):
+                    self.backend.delete(dataset)
             except Exception as e:
                 self.logger.warning(f"Could not delete {dataset}: {e}")
 
@@ -681,8 +816,18 @@ MODE = "JFMP"                                       # Options: "DAP", "JFMP", "N
 THEMES = ["forests", "biodiversity", "water", "heritage", "summary"]     # Options: "summary", "forests", "biodiversity", "water", "heritage"
 DISTRICT = None                                     # Optional: specify district name or leave as None
 VERBOSE_LOGGING = True                              # Set to True for detailed logging
-
-# Paths to risk register data - maintained by NEP(?)
+BACKEND = "arcpy"                                   # Options: "arcpy" (ArcGIS Pro), "shapely" (GeoPandas/Shapely, no licence needed)
+BUFFER_CACHE = None                                 # Folder of buffers reused across runs on unchanged works, e.g. WORKSPACE + r"\buffer_cache" - None always rebuilds
+BUFFER_CACHE_MAX_MB = 2048                          # Least recently used buffers are evicted past this size
+PREVIOUS_RUN = None                                 # Folder of an earlier run (e.g. WORKSPACE) - only re-check works added or changed since
+OUTPUT_FORMATS = []                                 # Typed copies of the CSV reports, e.g. ["parquet", "feather"] (needs pyarrow)
+LOD_TOLERANCE = None                                # Metres, e.g. 0.5 - dense polygon sources (EVCs, tenure) are simplified to find overlay candidates, exact geometry decides borderline hits
+SPATIAL_INDEX = None                                # Folder of sidecar R-trees of the values sources (shapely backend), e.g. WORKSPACE + r"\spatial_index" - rebuilt when a source changes
+SNAPSHOTS = None                                    # Folder of local GeoParquet copies of the values sources (shapely backend), e.g. WORKSPACE + r"\snapshots" - taken/refreshed with --snapshot
+PREFETCH = 0                                        # Values sources read ahead in the background while the previous dataset is overlaid - 0 to read one at a time
+
+# Paths to risk register data - maintained by NEP(?). Biodiversity results are looked up on VEG_CODE/TAXON_ID
+RISK_REGISTER_FIELD = "MITIGATION"                  # register field holding the advice
 RISK_REGISTERS = {
     'dap': WORKSPACE + r"\RiskRegister.gdb\NBFTDAP_RiskRegister",  # use this for DAP or NBFT, full risk register with all EVCs
     'lrli': WORKSPACE + r"\RiskRegister.gdb\LRLI_RiskRegister",    # filtered out values that won't be threatened under LRLI (additional EVCs removed)
@@ -697,6 +842,16 @@ DATA_PATHS = {
     'regional': "C:\\Data\\CSDL"
 }
 
+# Parallel processing - number of worker processes for Phase 2 (1 = run in this process)
+WORKERS = 1
+
+# Statewide sources that are too big to hold in memory twice - never processed concurrently
+LARGE_SOURCES = [
+    "VBA_FAUNA25", "VBA_FLORA25", "VBA_FAUNA_THREATENED", "VBA_FLORA_THREATENED",
+    "VBA_FAUNA_RESTRICTED", "VBA_FLORA_RESTRICTED", "NV2005_EVCBCS", "V_CL_TENURE_POLY",
+    "HY_WATERCOURSE", "PLM25", "PLAN_ZONE"
+]
+
 # Buffer distances
 BUFFERS = {
     '1m':    {'input_features': "input_layer", 'buffer_distance': "1 meter", 'buffer_type': "FULL"},
@@ -710,41 +865,136 @@ BUFFERS = {
     '1000m_ring': {'input_features': "buffer_500m", 'buffer_distance': "500 meters", 'buffer_type': "OUTSIDE_ONLY"},
 }
 
+# ============================================================================
+# Parallel Worker Entry Points
+# ============================================================================
+
+# Checker used by this worker process (set by _init_worker)
+_worker_checker = None
+
+def _init_worker(settings: Settings, data_paths: Dict[str, str], shared_works: str, shared_buffers: Dict[str, str], buffer_bands: Dict[str, tuple]):
+    """Process pool initializer - one checker per worker, attached to the shared works and buffers"""
+    global _worker_checker
+    DATA_PATHS.update(data_paths)
+    _worker_checker = ValuesChecker(settings)
+    _worker_checker._attach_worker(shared_works, shared_buffers, buffer_bands)
+
+def _run_source_group(group) -> tuple:
+    """Process pool task - run one source group in this worker"""
+    return _worker_checker._process_source_group(group)
+
 # ============================================================================
 # Main Entry Point
 # ============================================================================
 
-def main():
+def print_plan(plan: JobPlan, settings: Settings):
+    """Print a compiled job plan from ValuesChecker.plan, theme by theme"""
+    print(f"Job plan - Mode: {settings.mode}, Themes: {', '.join(settings.themes)}")
+    overlays = {job.order: overlay for overlay in plan.overlays for job in overlay.jobs}
+    for theme in settings.themes:
+        jobs = sorted((job for overlay in plan.overlays for job in overlay.jobs if job.theme == theme), key=lambda job: job.order)
+        print("-" * 60)
+        print(f"{theme} ({len(jobs)} datasets)")
+        for job in jobs:
+            print(f"  {job.dataset_name:<40}{', '.join(job.buffer_names):<20}{job.path}")
+            if job.where_clause:
+                print(f"  {'':<40}where {job.where_clause}")
+            if job.high_risk_only:
+                print(f"  {'':<40}high risk works only")
+            if len(overlays[job.order].jobs) > 1:
+                print(f"  {'':<40}shares overlay {overlays[job.order].name}")
+    print("=" * 60)
+    print(plan.summary())
+
+
+def main(argv=None):
     """
     Main entry point for the Values Checking Tool
     
-    1. Creates settings from the configuration above
+    1. Creates settings from the configuration above (command line options override it)
     2. Initializes the ValuesChecker with those settings
-    3. Runs the processing workflow
+    3. Runs the processing workflow, or only prints the job plan with --plan
     4. Reports results to the user
     """
+    parser = argparse.ArgumentParser(description="Check planned works against the values datasets")
+    parser.add_argument("--input", default=INPUT_DATA, help="works layer to check")
+    parser.add_argument("--workspace", default=WORKSPACE, help="folder for outputs")
+    parser.add_argument("--mode", default=MODE, choices=["DAP", "JFMP", "NBFT"])
+    parser.add_argument("--themes", nargs="+", default=THEMES, help="themes to check")
+    parser.add_argument("--district", default=DISTRICT, help="only check works in this district")
+    parser.add_argument("--backend", default=BACKEND, choices=["arcpy", "shapely"])
+    parser.add_argument("--workers", type=int, default=WORKERS, help="worker processes for Phase 2")
+    parser.add_argument("--buffer-cache", default=BUFFER_CACHE, help="folder of buffers reused across runs on unchanged works")
+    parser.add_argument("--previous-run", default=PREVIOUS_RUN, help="folder of an earlier run - only re-check works added or changed since")
+    parser.add_argument("--output-formats", nargs="*", default=OUTPUT_FORMATS, choices=["parquet", "feather"],
+                        help="typed copies of the CSV reports (needs pyarrow)")
+    parser.add_argument("--lod-tolerance", type=float, default=LOD_TOLERANCE, help="simplification tolerance (metres) for finding overlay candidates on dense polygon sources")
+    parser.add_argument("--spatial-index", default=SPATIAL_INDEX, help="folder of values source spatial index sidecars (shapely backend)")
+    parser.add_argument("--snapshots", default=SNAPSHOTS, help="folder of local GeoParquet snapshots of the values sources (shapely backend)")
+    parser.add_argument("--prefetch", type=int, default=PREFETCH, help="values sources read ahead in the background (0 = one at a time)")
+    parser.add_argument("--plan", "--dry-run", dest="plan", action="store_true",
+                        help="print the (dataset, buffer, where clause) job plan for the mode and exit - no data is read")
+    parser.add_argument("--build-index", action="store_true",
+                        help="build or refresh the spatial index sidecars of every DATASET_MATRIX source and exit")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="take or refresh local GeoParquet snapshots of every DATASET_MATRIX source and exit")
+    args = parser.parse_args(argv)
     
     # Create settings from configuration
     settings = Settings(
-        input_data=INPUT_DATA,
-        workspace=Path(WORKSPACE),
-        mode=MODE,
-        themes=THEMES,
-        district=DISTRICT
+        input_data=args.input,
+        workspace=Path(args.workspace),
+        mode=args.mode,
+        themes=args.themes,
+        district=args.district,
+        backend=args.backend,
+        workers=args.workers,
+        buffer_cache=args.buffer_cache,
+        buffer_cache_max_mb=BUFFER_CACHE_MAX_MB,
+        previous_run=args.previous_run,
+        output_formats=args.output_formats,
+        risk_registers=RISK_REGISTERS,
+        risk_register_field=RISK_REGISTER_FIELD,
+        lod_tolerance=args.lod_tolerance,
+        spatial_index=args.spatial_index,
+        snapshots=args.snapshots,
+        prefetch=args.prefetch
     )
     
+    # Job plan only - the backend (arcpy) is never loaded
+    if args.plan:
+        print_plan(ValuesChecker(settings).plan(), settings)
+        return 0
+    
+    # Source sidecars only - works are not read
+    if args.build_index:
+        outcomes = ValuesChecker(settings).build_index()
+        for path, outcome in outcomes.items():
+            print(f"  {outcome:<12}{path}")
+        print(f"{sum(outcome == 'built' for outcome in outcomes.values())} of {len(outcomes)} source indexes built in {settings.spatial_index}")
+        return 0
+    
+    # Source snapshots only - works are not read
+    if args.snapshot:
+        outcomes = ValuesChecker(settings).build_snapshots()
+        for path, outcome in outcomes.items():
+            print(f"  {outcome:<12}{path}")
+        print(f"{sum(outcome == 'built' for outcome in outcomes.values())} of {len(outcomes)} source snapshots taken in {settings.snapshots}")
+        return 0
+    
     # Configure logging level
     if VERBOSE_LOGGING:
         logging.getLogger().setLevel(logging.DEBUG)
     
     # Display startup information
     print(f"Starting Values Checking Tool")
-    print(f"Input: {INPUT_DATA}")
-    print(f"Workspace: {WORKSPACE}")
-    print(f"Mode: {MODE}")
-    print(f"Themes: {', '.join(THEMES)}")
-    if DISTRICT:
-        print(f"District: {DISTRICT}")
+    print(f"Input: {settings.input_data}")
+    print(f"Workspace: {settings.workspace}")
+    print(f"Mode: {settings.mode}")
+    print(f"Backend: {settings.backend}")
+    print(f"Themes: {', '.join(settings.themes)}")
+    if settings.district:
+        print(f"District: {settings.district}")
     print("=" * 60)
     
     # Run the processing workflow
@@ -758,7 +1008,7 @@ def main():
         print(f"Outputs created: {len(result['outputs'])}")
         for output in result['outputs']:
             print(f"  {Path(output).name}")
-        print(f"All outputs saved to: {WORKSPACE}")
+        print(f"All outputs saved to: {settings.workspace}")
     else:
         print(f"Processing failed!")
         print(f"Error: {result['error']}")
@@ -0,0 +1,109 @@
+# ============================================================================
+# Incremental Re-check
+# ============================================================================
+
+"""
+Diff the works against a previous run so only added or modified works are re-checked.
+
+Every works detail report carries a WORKS_HASH column (geometry + attributes of
+each work, see GeometryBackend.feature_hashes). On the next run the current
+hashes are compared to the previous report by ID_FIELD:
+    - added / changed works     -> buffered and checked again
+    - unchanged works           -> previous theme CSV rows carried over as-is
+    - deleted works             -> previous rows dropped
+
+Each run also writes {date}_{mode}_run_manifest.json listing the themes it
+checked and its reports, so a theme with no values (and no CSV) is told apart
+from a theme that was never checked.
+"""
+
+import csv
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+
+HASH_FIELD = "WORKS_HASH"
+
+
+@dataclass
+class WorksDiff:
+    """Work IDs grouped by how they changed since the previous run"""
+    added: Set[str] = field(default_factory=set)
+    changed: Set[str] = field(default_factory=set)
+    unchanged: Set[str] = field(default_factory=set)
+    deleted: Set[str] = field(default_factory=set)
+
+    @property
+    def to_check(self) -> Set[str]:
+        return self.added | self.changed
+
+
+@dataclass
+class PreviousRun:
+    """Output files of an earlier run"""
+    themes: List[str]
+    works_detail: Path
+    theme_reports: Dict[str, Path]
+
+
+def write_run_manifest(path: Path, mode: str, themes: List[str], works_detail: str, theme_reports: Dict[str, str]):
+    """Record what a run checked and where its reports are, for the next incremental run"""
+    manifest = {
+        'mode': mode,
+        'themes': list(themes),
+        'works_detail': Path(works_detail).name,
+        'theme_reports': {theme: Path(report).name for theme, report in theme_reports.items()},
+    }
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def find_previous_run(folder: Path, mode: str) -> Optional[PreviousRun]:
+    """Latest run of this mode in folder, or None if there is none to diff against"""
+    folder = Path(folder)
+    manifests = sorted(folder.glob(f"*_{mode}_run_manifest.json"))
+    if not manifests:
+        return None
+
+    with open(manifests[-1]) as f:
+        manifest = json.load(f)
+    works_detail = folder / manifest['works_detail']
+    if not works_detail.exists():
+        return None
+    theme_reports = {theme: folder / name for theme, name in manifest['theme_reports'].items()}
+    return PreviousRun(manifest['themes'], works_detail, theme_reports)
+
+
+def load_previous_hashes(works_detail: Path, id_field: str) -> Dict[str, str]:
+    """Work ID -> WORKS_HASH from a previous works detail report"""
+    with open(works_detail, newline="") as f:
+        return {row[id_field]: row[HASH_FIELD] for row in csv.DictReader(f)}
+
+
+def diff_works(current: Dict[str, str], previous: Dict[str, str]) -> WorksDiff:
+    """Compare current and previous work hashes by ID"""
+    diff = WorksDiff()
+    for work_id, work_hash in current.items():
+        if work_id not in previous:
+            diff.added.add(work_id)
+        elif previous[work_id] != work_hash:
+            diff.changed.add(work_id)
+        else:
+            diff.unchanged.add(work_id)
+    diff.deleted = set(previous) - set(current)
+    return diff
+
+
+def iter_carried_results(theme_report: Path, keep_ids: Set[str], id_column: str = "UNIQUE_ID") -> Iterator[Dict]:
+    """Stream the rows of a previous theme report for the given work IDs, values kept as written"""
+    with open(theme_report, newline="") as f:
+        for row in csv.DictReader(f):
+            if row[id_column] in keep_ids:
+                yield row
+
+
+def id_where_clause(id_field: str, ids: Set[str]) -> str:
+    """SQL where clause selecting works by ID"""
+    quoted = ", ".join("'" + str(work_id).replace("'", "''") + "'" for work_id in sorted(ids))
+    return f"{id_field} IN ({quoted})"
@@ -0,0 +1,127 @@
+# ============================================================================
+# Job Plan
+# ============================================================================
+
+"""
+Compiles the dataset jobs of a run into the overlays that actually need to run.
+
+Once DATASET_MATRIX is resolved for a mode, many datasets overlay the same
+thing: plm25 is in two themes, the VBA owl/bat/goshawk/sea-eagle datasets all
+read the same VBA layer with the same buffers and only differ in where clause,
+and so do the species recovery overlays. Each dataset already joins all of its
+buffers in one distance join (so 1000m_ring costs nothing on top of 500m).
+
+An OverlayJob is one distance join for every dataset reading the same source
+with the same buffers and high_risk_only:
+    - the source is read with the OR of the datasets' where clauses (or none
+      if any dataset reads all of it)
+    - each dataset's own where clause is then applied to the join output
+      before its results are built, so every dataset gets the same rows it
+      would from its own join
+
+Where clauses naming a works field (e.g. DISTRICT) cannot be applied to the
+join output unambiguously, so those datasets keep an overlay of their own
+unless another dataset has exactly the same clause.
+
+Usage:
+    plan = compile_plan(jobs, works_fields)
+    for overlay in plan.overlays:
+        ...                     # join once, then overlay.filters[job.order] per dataset
+    print(plan.summary())
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from scheduler import DatasetJob
+
+# Quoted literals, removed before looking for field names in a where clause
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+@dataclass
+class OverlayJob:
+    """One distance join shared by every dataset job it fans out to"""
+    order: int                          # position in run order (order of its first dataset job)
+    path: str
+    buffer_names: List[str]
+    high_risk_only: bool
+    where_clause: Optional[str]         # clause the source is read with
+    jobs: List[DatasetJob] = field(default_factory=list)
+    filters: Dict[int, Optional[str]] = field(default_factory=dict)    # job order -> clause applied to the join output
+
+    @property
+    def name(self) -> str:
+        """First dataset's name, plus how many others share the overlay"""
+        extra = f" +{len(self.jobs) - 1}" if len(self.jobs) > 1 else ""
+        return self.jobs[0].dataset_name + extra
+
+
+@dataclass
+class JobPlan:
+    """Overlays for a run, plus how many overlay operations were saved"""
+    overlays: List[OverlayJob]
+    dataset_jobs: int
+    buffer_overlays: int                # one overlay per dataset and buffer, as the matrix is written
+    source_reads: int
+
+    @property
+    def joins_saved(self) -> int:
+        """Distance joins saved by sharing overlays between datasets"""
+        return self.dataset_jobs - len(self.overlays)
+
+    @property
+    def overlays_saved(self) -> int:
+        """Overlay operations saved against one per dataset and buffer"""
+        return self.buffer_overlays - len(self.overlays)
+
+    def summary(self) -> str:
+        return (f"{self.dataset_jobs} dataset jobs ({self.buffer_overlays} dataset/buffer overlays) compiled to "
+                f"{len(self.overlays)} overlays on {self.source_reads} sources - "
+                f"{self.overlays_saved} overlays eliminated ({self.joins_saved} by sharing joins between datasets)")
+
+
+def where_fields(where_clause: Optional[str]) -> set:
+    """Upper-cased names in a where clause (field names plus SQL keywords), ignoring quoted literals"""
+    if not where_clause:
+        return set()
+    return {name.upper() for name in _NAME.findall(_LITERAL.sub("", where_clause))}
+
+
+def combine_where(clauses: Sequence[Optional[str]]) -> Optional[str]:
+    """OR of the distinct clauses; None if any of them is None (that dataset reads the whole source)"""
+    if any(not clause for clause in clauses):
+        return None
+    distinct = list(dict.fromkeys(clauses))
+    if len(distinct) == 1:
+        return distinct[0]
+    return " OR ".join(f"({clause})" for clause in distinct)
+
+
+def compile_plan(jobs: List[DatasetJob], works_fields: Sequence[str]) -> JobPlan:
+    """Group dataset jobs into shared overlays, in order of their first dataset job"""
+    works_fields = {name.upper() for name in works_fields}
+    groups: Dict[tuple, List[DatasetJob]] = {}
+    for job in jobs:
+        key = (job.path, tuple(job.buffer_names), job.high_risk_only)
+        if where_fields(job.where_clause) & works_fields:
+            key += (job.where_clause,)  # only shared with an identical clause
+        groups.setdefault(key, []).append(job)
+
+    overlays = []
+    for group in groups.values():
+        where_clause = combine_where([job.where_clause for job in group])
+        overlay = OverlayJob(group[0].order, group[0].path, group[0].buffer_names, group[0].high_risk_only, where_clause, group)
+        for job in group:
+            overlay.filters[job.order] = job.where_clause if job.where_clause != where_clause else None
+        overlays.append(overlay)
+    overlays.sort(key=lambda overlay: overlay.order)
+
+    return JobPlan(
+        overlays=overlays,
+        dataset_jobs=len(jobs),
+        buffer_overlays=sum(len(job.buffer_names) for job in jobs),
+        source_reads=len({job.path for job in jobs}),
+    )
@@ -0,0 +1,132 @@
+# ============================================================================
+# Mitigation Engine
+# ============================================================================
+
+"""
+Table-driven mitigations, applied to a batch of results at a time.
+
+The rules live in mitigations.py (MITIGATION_RULES). Each lookup table is
+compiled once into a DataFrame. A batch (one dataset's ResultBatch, see
+row_builder.py) is then mitigated with one left merge per lookup, instead of
+running an if/elif chain for every result, and gets a mitigation column:
+    1. the key columns the theme's lookups need are pulled out of the batch's columns
+    2. risk register layers for the mode (risk_register.py) - biodiversity only
+    3. MITIGATIONS entries for the mode (Value_Type + RISK_REGISTER_KEYS column)
+    4. theme lookups in order - first match wins
+    5. theme default for anything unmatched
+
+Key values are compared as text, so a TAXON_ID read as 500002.0 still
+matches the register key '500002'.
+
+pandas is only imported when an engine is created.
+"""
+
+from typing import Callable, Dict, List, Sequence
+
+from mitigations import (DEFAULT_MITIGATION, MITIGATION_KEY_DEFAULTS, MITIGATION_RULES, MITIGATIONS,
+                         RISK_REGISTER_KEYS)
+from risk_register import REGISTER_THEMES, RiskRegisters, key_text as _key_text
+from row_builder import ResultBatch
+
+REGISTER_FIELD = 'REGISTER_FIELD'
+REGISTER_KEY = 'REGISTER_KEY'
+REGISTER = 'REGISTER'
+
+
+def _sites_exist(results: ResultBatch) -> List[str]:
+    return ['Yes' if site else 'No' for site in results.column('ACHRIS_ID')]
+
+
+def _nt_extinguished(results: ResultBatch) -> List[str]:
+    return ['Yes' if 'EXTINGUISHED' in str(status) else 'No'
+            for status in results.column('NT_STATUS', MITIGATION_KEY_DEFAULTS['NT_STATUS'])]
+
+
+def _register_field(results: ResultBatch) -> List:
+    return [RISK_REGISTER_KEYS.get(value_type, (None, None))[0] for value_type in results.column('Value_Type')]
+
+
+def _register_key(results: ResultBatch) -> List:
+    key_columns = [RISK_REGISTER_KEYS.get(value_type, (None, None))[1] for value_type in results.column('Value_Type')]
+    values = {column: results.column(column) for column in set(key_columns) if column}
+    return [values[column][i] if column else None for i, column in enumerate(key_columns)]
+
+
+# Key columns worked out from each batch's columns rather than read straight from them
+DERIVED_COLUMNS: Dict[str, Callable[[ResultBatch], Sequence]] = {
+    'SITES_EXIST': _sites_exist,
+    'NT_EXTINGUISHED': _nt_extinguished,
+    REGISTER_FIELD: _register_field,
+    REGISTER_KEY: _register_key,
+}
+
+
+class MitigationEngine:
+    """Applies the mode's risk registers, MITIGATIONS and MITIGATION_RULES to batches of results"""
+
+    def __init__(self, mode: str, rules: Dict = None, mitigations: Dict = None, risk_registers: RiskRegisters = None):
+        import pandas as pd
+        self.pd = pd
+        rules = MITIGATION_RULES if rules is None else rules
+        mitigations = MITIGATIONS.get(mode, {}) if mitigations is None else mitigations
+        self.defaults = {}
+        self.lookups = {}   # theme -> [(key columns, lookup DataFrame)]
+
+        # Which register a result is checked against depends on its works' risk level
+        self.derived = dict(DERIVED_COLUMNS)
+        if risk_registers:
+            self.derived[REGISTER] = lambda results: [risk_registers.register_for(level) for level in results.column('RISK_LVL')]
+            register_columns = [REGISTER, REGISTER_FIELD, REGISTER_KEY]
+            register_frame = self._lookup_frame(register_columns, risk_registers.lookup_table())
+
+        for theme in set(rules) | set(mitigations) | set(REGISTER_THEMES):
+            lookups = []
+            if risk_registers and theme in REGISTER_THEMES:
+                lookups.append((register_columns, register_frame))
+            entries = {(value_type, key): mitigation
+                       for value_type, keys in mitigations.get(theme, {}).items()
+                       for key, mitigation in keys.items()}
+            if entries:
+                lookups.append((['Value_Type', REGISTER_KEY], self._lookup_frame(['Value_Type', REGISTER_KEY], entries)))
+            for columns, table in rules.get(theme, {}).get('lookups', []):
+                lookups.append((columns, self._lookup_frame(columns, table)))
+            self.lookups[theme] = lookups
+            self.defaults[theme] = rules.get(theme, {}).get('default', DEFAULT_MITIGATION)
+
+    def apply(self, theme: str, results: ResultBatch) -> ResultBatch:
+        """Add the mitigation column to a batch of one theme's results; returns the same batch"""
+        default = self.defaults.get(theme, DEFAULT_MITIGATION)
+        lookups = self.lookups.get(theme)
+        if not len(results) or not lookups:
+            results.set_constant('mitigation', default)
+            return results
+
+        # Key columns for every lookup, as text
+        columns = []
+        for keys, _ in lookups:
+            columns.extend(column for column in keys if column not in columns)
+        keys_frame = self.pd.DataFrame({column: [_key_text(value) for value in self._column_values(results, column)]
+                                        for column in columns},
+                                       dtype=object)
+
+        # One left merge per lookup - row order is kept, first match wins
+        mitigation = self.pd.Series([None] * len(results), dtype=object)
+        for keys, frame in lookups:
+            matched = keys_frame[keys].merge(frame, how='left', on=keys)['mitigation']
+            mitigation = mitigation.where(mitigation.notna(), matched)
+
+        results.set_column('mitigation', mitigation.where(mitigation.notna(), default).tolist())
+        return results
+
+    def _column_values(self, results: ResultBatch, column: str) -> Sequence:
+        if column in self.derived:
+            return self.derived[column](results)
+        return results.column(column, MITIGATION_KEY_DEFAULTS.get(column))
+
+    def _lookup_frame(self, columns: List[str], table: Dict):
+        """Lookup dict as a DataFrame of key columns + mitigation"""
+        rows = []
+        for key, mitigation in table.items():
+            key = key if isinstance(key, tuple) else (key,)
+            rows.append([_key_text(value) for value in key] + [mitigation])
+        return self.pd.DataFrame(rows, columns=columns + ['mitigation'], dtype=object)
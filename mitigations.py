@@ -61,6 +61,60 @@ MITIGATIONS = {
     }
 }
 
+# Risk register key for each Value_Type: (register field, result column holding the same key)
+RISK_REGISTER_KEYS = {
+    'EVC': ('VEG_CODE', 'Value_Description'),
+    'Flora': ('TAXON_ID', 'TAXON_ID'),
+    'Flora_Threatened': ('TAXON_ID', 'TAXON_ID'),
+    'Flora_Restricted': ('TAXON_ID', 'TAXON_ID'),
+    'Fauna': ('TAXON_ID', 'TAXON_ID'),
+    'Fauna - Owl': ('TAXON_ID', 'TAXON_ID'),
+    'Fauna - WBSE': ('TAXON_ID', 'TAXON_ID'),
+    'Fauna - G': ('TAXON_ID', 'TAXON_ID'),
+    'Fauna_Threatened': ('TAXON_ID', 'TAXON_ID'),
+    'Fauna_Restricted': ('TAXON_ID', 'TAXON_ID'),
+    'Aquatic': ('TAXON_ID', 'TAXON_ID'),
+}
+
+# Mitigation rules per theme, applied in bulk by mitigation_engine.MitigationEngine.
+# Each lookup is (result columns, table keyed on their values - a tuple for several columns).
+# The risk register layers for the mode (risk_register.py) are tried first, then the MITIGATIONS
+# entries for the mode (keyed on Value_Type + RISK_REGISTER_KEYS column), then the lookups in order
+# (first match wins); anything still unmatched gets the theme default.
+# Columns worked out by the engine: SITES_EXIST ('Yes' if ACHRIS_ID is set) and
+# NT_EXTINGUISHED ('Yes' if NT_STATUS contains EXTINGUISHED)
+MITIGATION_RULES = {
+    'forests': {
+        'lookups': [(['Value_Type'], FOREST_MITIGATIONS)],
+        'default': "Standard work practices apply",
+    },
+    'heritage': {
+        'lookups': [(['RISK_LVL', 'SITES_EXIST', 'CH_SENS'], HERITAGE_MITIGATIONS)],
+        'default': "Heritage assessment required",
+    },
+    'summary': {
+        'lookups': [
+            (['NT_EXTINGUISHED'], {'Yes': NATIVE_TITLE_MATRIX['NT_EXTINGUISHED']}),
+            (['RISK_LVL'], {'LRLI': NATIVE_TITLE_MATRIX['LOW_IMPACT']}),
+        ],
+        'default': NATIVE_TITLE_MATRIX['CONSULT'],
+    },
+    'biodiversity': {
+        'lookups': [],
+        'default': "Refer to NEP team. Standard biodiversity protection measures apply",
+    },
+    'water': {
+        'lookups': [],
+        'default': "Ensure works comply with waterway protection requirements",
+    },
+}
+
+# Mitigation for themes without rules
+DEFAULT_MITIGATION = "Standard work practices apply"
+
+# Values used when a result has no such key
+MITIGATION_KEY_DEFAULTS = {'RISK_LVL': 'DAP', 'CH_SENS': 'No', 'NT_STATUS': ''}
+
 # Example option to remove hard-coded stuff from main script using multi-level lookup
 # MITIGATIONS = {
 #     ('JFMP', 'forests', 'biodiversity', 'EVC', Actual_EVC_goes_here): "Mitigation here",
@@ -0,0 +1,274 @@
+# ============================================================================
+# Output Writers
+# ============================================================================
+
+"""
+Incremental writers for theme result reports.
+
+Results are streamed from Phase 2 one dataset batch at a time, so a theme
+report is appended to as batches arrive instead of being built from one big
+list at the end. Each theme has a fixed column schema (see
+row_builder.result_columns), so every batch lines up no matter which datasets
+found values. Missing values are written empty, and keys outside the schema
+(e.g. carried over from an older run) are dropped.
+
+Files are written under a .partial name and renamed on close, so a failed run
+never leaves a truncated report, and an incremental run can read the previous
+report of the same name while writing the new one.
+
+The CSV is always written (QuickBase imports it and incremental runs carry
+rows over from it). OUTPUT_FORMATS can add typed columnar copies:
+    - parquet   smallest on disk, for notebooks and archiving
+    - feather   Arrow IPC file, fastest to load
+Columnar copies keep X/Y as integers and DATE_CHECKED as a date, and
+dictionary-encode the low-cardinality columns. Other columns are strings,
+since their type varies between the datasets of a theme. Requires pyarrow.
+"""
+
+import csv
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Columnar formats and their file extensions
+COLUMNAR_FORMATS = {"parquet": ".parquet", "feather": ".feather"}
+
+# Column types in columnar copies - any column not listed is a string
+DICTIONARY_COLUMNS = ['DISTRICT', 'RISK_LVL', 'Theme', 'Value_Type', 'Buffer', 'mitigation']
+INTEGER_COLUMNS = ['X', 'Y']
+DATE_COLUMNS = ['DATE_CHECKED']
+DATE_FORMAT = "%Y%m%d"
+
+# Rows buffered per columnar record batch / Parquet row group
+BATCH_ROWS = 50_000
+
+
+class ThemeWriter:
+    """Base class for writers that append result batches for one theme to a report"""
+
+    def __init__(self, path: Path, columns: List[str]):
+        self.path = Path(path)
+        self.columns = columns
+        self.partial_path = self.path.with_name(self.path.name + ".partial")
+        self.rows_written = 0
+
+    def write(self, rows: Iterable[Dict]) -> int:
+        """Append rows; the file is only created once there is something to write"""
+        count = 0
+        for row in rows:
+            self.write_row(row)
+            count += 1
+        return count
+
+    def write_row(self, row: Dict):
+        raise NotImplementedError
+
+    def close(self) -> Optional[str]:
+        """Finish the report; returns its path, or None if no rows were written"""
+        raise NotImplementedError
+
+    def abort(self):
+        """Discard a report that was not closed"""
+        raise NotImplementedError
+
+
+class CsvThemeWriter(ThemeWriter):
+    """Appends result batches for one theme to its CSV report"""
+
+    def __init__(self, path: Path, columns: List[str]):
+        super().__init__(path, columns)
+        self._file = None
+        self._writer = None
+
+    def write_row(self, row: Dict):
+        if self._writer is None:
+            self._open()
+        self._writer.writerow(row)
+        self.rows_written += 1
+
+    def _open(self):
+        self._file = open(self.partial_path, "w", newline="")
+        # Same line endings and quoting as DataFrame.to_csv
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, restval="", extrasaction="ignore",
+                                      lineterminator=os.linesep)
+        self._writer.writeheader()
+
+    def close(self) -> Optional[str]:
+        if self._file is None:
+            return None
+        self._file.close()
+        self._file = None
+        os.replace(self.partial_path, self.path)
+        return str(self.path)
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self.partial_path)
+
+
+def _to_string(value) -> Optional[str]:
+    return None if value is None or value == "" else str(value)
+
+
+def _to_integer(value) -> Optional[int]:
+    return None if value is None or value == "" else int(value)
+
+
+def _to_date(value):
+    if value is None or value == "":
+        return None
+    return datetime.strptime(str(value), DATE_FORMAT).date()
+
+
+class ArrowThemeWriter(ThemeWriter):
+    """
+    Appends result batches for one theme to a Parquet or Feather report
+
+    Rows are buffered per column and flushed every BATCH_ROWS rows. Dictionary
+    columns keep one growing dictionary for the whole file, so each batch only
+    adds new values (Feather files cannot replace a dictionary between batches).
+    """
+
+    def __init__(self, path: Path, columns: List[str], file_format: str):
+        import pyarrow as pa
+
+        super().__init__(path, columns)
+        self.file_format = file_format
+        self._pa = pa
+        self._schema = pa.schema([(name, self._column_type(name)) for name in columns])
+        self._converters = [self._converter(name) for name in columns]
+        self._dictionaries = {name: {} for name in columns if name in DICTIONARY_COLUMNS}
+        self._buffer = [[] for _ in columns]
+        self._sink = None
+        self._writer = None
+
+    def _column_type(self, name: str):
+        pa = self._pa
+        if name in DICTIONARY_COLUMNS:
+            return pa.dictionary(pa.int32(), pa.string())
+        if name in INTEGER_COLUMNS:
+            return pa.int64()
+        if name in DATE_COLUMNS:
+            return pa.date32()
+        return pa.string()
+
+    def _converter(self, name: str):
+        if name in INTEGER_COLUMNS:
+            return _to_integer
+        if name in DATE_COLUMNS:
+            return _to_date
+        return _to_string
+
+    def write_row(self, row: Dict):
+        for column, name, convert in zip(self._buffer, self.columns, self._converters):
+            column.append(convert(row.get(name)))
+        self.rows_written += 1
+        if len(self._buffer[0]) >= BATCH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer[0]:
+            return
+        if self._writer is None:
+            self._open()
+        arrays = [self._array(name, values) for name, values in zip(self.columns, self._buffer)]
+        self._writer.write_batch(self._pa.record_batch(arrays, schema=self._schema))
+        self._buffer = [[] for _ in self.columns]
+
+    def _array(self, name: str, values: List):
+        pa = self._pa
+        if name not in self._dictionaries:
+            return pa.array(values, type=self._schema.field(name).type)
+        codes = self._dictionaries[name]
+        indices = [None if value is None else codes.setdefault(value, len(codes)) for value in values]
+        return pa.DictionaryArray.from_arrays(pa.array(indices, type=pa.int32()), pa.array(list(codes), type=pa.string()))
+
+    def _open(self):
+        if self.file_format == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(str(self.partial_path), self._schema)
+        else:
+            import pyarrow.ipc as ipc
+            self._sink = self._pa.OSFile(str(self.partial_path), "wb")
+            self._writer = ipc.new_file(self._sink, self._schema, options=ipc.IpcWriteOptions(compression="lz4", emit_dictionary_deltas=True))
+
+    def close(self) -> Optional[str]:
+        self._flush()
+        if self._writer is None:
+            return None
+        self._close_file()
+        os.replace(self.partial_path, self.path)
+        return str(self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._close_file()
+            os.remove(self.partial_path)
+
+    def _close_file(self):
+        self._writer.close()
+        self._writer = None
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+
+
+class ThemeReport:
+    """A theme's CSV report plus any columnar copies, written from the same stream of rows"""
+
+    def __init__(self, stem: Path, columns: List[str], formats: Iterable[str] = ()):
+        """stem: report path without extension"""
+        stem = Path(stem)
+        self.csv = CsvThemeWriter(stem.with_name(stem.name + ".csv"), columns)
+        self.writers = [self.csv] + [ArrowThemeWriter(stem.with_name(stem.name + COLUMNAR_FORMATS[file_format]), columns, file_format)
+                                     for file_format in formats]
+
+    @property
+    def rows_written(self) -> int:
+        return self.csv.rows_written
+
+    def write(self, rows: Iterable[Dict]) -> int:
+        """Append rows to every format of the report"""
+        count = 0
+        for row in rows:
+            for writer in self.writers:
+                writer.write_row(row)
+            count += 1
+        return count
+
+    def close(self) -> List[str]:
+        """Finish every format; returns the paths written, CSV first (none if there were no rows)"""
+        return [path for path in (writer.close() for writer in self.writers) if path]
+
+    def abort(self):
+        for writer in self.writers:
+            writer.abort()
+
+
+def write_columnar_table(df, stem: Path, formats: Iterable[str]) -> List[str]:
+    """Write a DataFrame (e.g. the works detail) in each columnar format, dictionary-encoding DICTIONARY_COLUMNS"""
+    if not formats:
+        return []
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for name in DICTIONARY_COLUMNS:
+        if name in table.column_names:
+            i = table.column_names.index(name)
+            table = table.set_column(i, name, table.column(name).cast(pa.string()).dictionary_encode())
+
+    stem = Path(stem)
+    paths = []
+    for file_format in formats:
+        path = stem.with_name(stem.name + COLUMNAR_FORMATS[file_format])
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(table, str(path))
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, str(path))
+        paths.append(str(path))
+    return paths
@@ -0,0 +1,186 @@
+# ============================================================================
+# Run Profiling
+# ============================================================================
+
+"""
+Structured timings for a values checking run.
+
+A RunProfile records nested spans (phase > theme > dataset, plus one span per
+Phase 1 buffer). Each span has:
+    - wall_seconds      elapsed time
+    - tool_seconds      time spent inside geometry backend calls
+    - rows_read         values features read after prefilter/where clause (datasets)
+    - rows_written      features/results produced
+    - pruned            values features dropped by the prefilter (datasets)
+    - rss_mb            resident memory of the process when the span ended
+    - rss_delta_mb      change in resident memory over the span (its children
+                        included) - memory it still held, not its transient peak
+
+Tool time comes from wrapping the backend (ProfiledBackend), so every backend
+call made while a span is open counts towards it and all of its parents.
+
+The profile is written next to the theme CSVs as {date}_{mode}_run_profile.json
+and .csv (one row per span) and returned from ValuesChecker.process(), with
+the peak memory of the whole run.
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+import types
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# CSV columns, in order
+PROFILE_FIELDS = [
+    'kind', 'name', 'path', 'theme', 'buffers', 'cached', 'wall_seconds', 'tool_seconds',
+    'rows_read', 'rows_written', 'pruned', 'rss_mb', 'rss_delta_mb'
+]
+
+
+def peak_memory_mb() -> Optional[float]:
+    """Peak resident memory of this process so far (resource on Linux/macOS, psutil on Windows)"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        memory = psutil.Process().memory_info()
+        return round(getattr(memory, "peak_wset", memory.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+def current_memory_mb() -> Optional[float]:
+    """Resident memory of this process now (/proc on Linux, psutil elsewhere)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+class ProfiledBackend:
+    """Geometry backend wrapper that adds the time of every call to the profile's tool time"""
+
+    def __init__(self, backend, profile: "RunProfile"):
+        self._backend = backend
+        self._profile = profile
+
+    @property
+    def untimed(self):
+        """The backend itself, for calls made off the main thread (e.g. source prefetch) that are not tool time of its spans"""
+        return self._backend
+
+    def __getattr__(self, name):
+        attribute = getattr(self._backend, name)
+        if not callable(attribute):
+            return attribute
+
+        profile = self._profile
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = attribute(*args, **kwargs)
+            finally:
+                profile.tool_seconds += time.perf_counter() - start
+            # Cursors do their work while being iterated
+            if isinstance(result, types.GeneratorType):
+                return profile.timed_iter(result)
+            return result
+
+        return timed
+
+
+class RunProfile:
+    """Nested timing spans for one run"""
+
+    def __init__(self):
+        self.spans: List[Dict] = []
+        self.tool_seconds = 0.0
+        self._stack: List[Dict] = []
+
+    def instrument(self, backend) -> ProfiledBackend:
+        """Wrap a geometry backend so its calls count as tool time"""
+        return ProfiledBackend(backend, self)
+
+    def timed_iter(self, iterator):
+        """Iterate, adding the time spent producing each item to tool time"""
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.tool_seconds += time.perf_counter() - start
+            yield item
+
+    @contextmanager
+    def span(self, kind: str, name: str, **fields):
+        """Time a block as a span of the given kind (phase, theme, dataset, buffer)"""
+        record = {field: None for field in PROFILE_FIELDS}
+        record.update(fields, kind=kind, name=name, path="/".join([span['name'] for span in self._stack] + [name]))
+        self.spans.append(record)
+        self._stack.append(record)
+        start = time.perf_counter()
+        tool_start = self.tool_seconds
+        rss_start = current_memory_mb()
+        try:
+            yield record
+        finally:
+            record['wall_seconds'] = round(time.perf_counter() - start, 4)
+            record['tool_seconds'] = round(self.tool_seconds - tool_start, 4)
+            record['rss_mb'] = current_memory_mb()
+            if record['rss_mb'] is not None and rss_start is not None:
+                record['rss_delta_mb'] = round(record['rss_mb'] - rss_start, 1)
+            self._stack.pop()
+
+    def record(self, **fields):
+        """Set counters (rows_read, rows_written, pruned ...) on the innermost open span"""
+        if self._stack:
+            self._stack[-1].update(fields)
+
+    def merge(self, spans: List[Dict]):
+        """Add spans recorded in a worker process under the innermost open span"""
+        prefix = self._stack[-1]['path'] + "/" if self._stack else ""
+        for span in spans:
+            self.spans.append({**span, 'path': prefix + span['path']})
+
+    def reset(self):
+        """Drop recorded spans (workers send theirs back once per task)"""
+        self.spans = []
+
+    def summary(self) -> Dict:
+        """Profile as a dict: top-level totals plus every span"""
+        phases = [span for span in self.spans if span['kind'] == "phase"]
+        return {
+            'wall_seconds': round(sum(span['wall_seconds'] or 0 for span in phases), 4),
+            'tool_seconds': round(sum(span['tool_seconds'] or 0 for span in phases), 4),
+            'peak_rss_mb': peak_memory_mb(),
+            'spans': self.spans,
+        }
+
+    def write(self, folder: Path, prefix: str) -> List[str]:
+        """Write {prefix}_run_profile.json and .csv to folder; returns their paths"""
+        json_path = Path(folder) / f"{prefix}_run_profile.json"
+        csv_path = Path(folder) / f"{prefix}_run_profile.csv"
+        with open(json_path, "w") as f:
+            json.dump(self.summary(), f, indent=2, default=str)
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=PROFILE_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(self.spans)
+        return [str(json_path), str(csv_path)]
@@ -0,0 +1,123 @@
+# ============================================================================
+# Risk Registers
+# ============================================================================
+
+"""
+Biodiversity risk registers, loaded once per run and held in memory.
+
+RISK_REGISTERS names the register layers maintained by NEP:
+    - dap   full register with all EVCs - DAP and NBFT
+    - lrli  values that can still be threatened by low risk/low impact works
+    - jfmp  combined EC/AGG BRL advice - JFMP
+MODE_REGISTERS says which register a result is checked against, by mode and
+the RISK_LVL of its works. In DAP/NBFT mode LRLI works are only checked
+against the lrli register, since values left out of it are not threatened
+by LRLI works.
+
+Each register is read with a single cursor pass and indexed with a dict per
+key field (VEG_CODE for EVCs, TAXON_ID for flora and fauna). Lookups for a
+batch of results are then one merge in MitigationEngine, with no queries
+against the register layer per result.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+# Register fields results are looked up on (see mitigations.RISK_REGISTER_KEYS)
+REGISTER_KEY_FIELDS = ['VEG_CODE', 'TAXON_ID']
+
+# Themes whose results are checked against the registers
+REGISTER_THEMES = ['biodiversity']
+
+# Register used for each mode: {RISK_LVL: register}, None = any other risk level
+MODE_REGISTERS = {
+    'DAP': {None: 'dap', 'LRLI': 'lrli'},
+    'NBFT': {None: 'dap', 'LRLI': 'lrli'},
+    'JFMP': {None: 'jfmp'},
+}
+
+
+def key_text(value) -> Optional[str]:
+    """Lookup key as text (None stays None; whole floats lose their .0)"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+class RiskRegister:
+    """One risk register layer, held in memory with a hash index per key field"""
+
+    def __init__(self, name: str, indexes: Dict[str, Dict[str, str]]):
+        self.name = name
+        self.indexes = indexes      # key field -> {key: advice}
+
+    @classmethod
+    def load(cls, backend, name: str, path: str, advice_field: str, logger: logging.Logger = None) -> "RiskRegister":
+        """Read a register layer once and index its advice on every key field it has"""
+        available = backend.list_fields(path)
+        if advice_field not in available:
+            raise ValueError(f"Risk register {name} has no {advice_field} field")
+        key_fields = [field for field in REGISTER_KEY_FIELDS if field in available]
+        indexes = {field: {} for field in key_fields}
+
+        for row in backend.search(path, key_fields + [advice_field]):
+            advice = row[-1]
+            if not advice:
+                continue
+            for field, value in zip(key_fields, row):
+                key = key_text(value)
+                if key:
+                    indexes[field].setdefault(key, advice)    # first entry wins, as for a cursor lookup
+
+        register = cls(name, indexes)
+        if logger:
+            logger.info(f"Loaded {name} risk register: " + ", ".join(f"{len(index)} {field}" for field, index in indexes.items()))
+        return register
+
+    def lookup(self, field: str, key) -> Optional[str]:
+        """Advice for a single key, or None"""
+        return self.indexes.get(field, {}).get(key_text(key))
+
+    def __len__(self) -> int:
+        return sum(len(index) for index in self.indexes.values())
+
+
+class RiskRegisters:
+    """The risk registers of one mode, and which of them applies to a result"""
+
+    def __init__(self, registers: Dict[str, RiskRegister], by_risk_level: Dict[Optional[str], str]):
+        self.registers = registers
+        # Only levels whose register was loaded - a missing one falls back to the mode's default register
+        self.by_risk_level = {level: name for level, name in by_risk_level.items() if name in registers}
+
+    @classmethod
+    def load(cls, backend, mode: str, paths: Dict[str, str], advice_field: str, logger: logging.Logger) -> "RiskRegisters":
+        """Load the registers the mode needs; missing or unreadable registers are skipped with a warning"""
+        by_risk_level = MODE_REGISTERS.get(mode, {})
+        registers = {}
+        for name in dict.fromkeys(by_risk_level.values()):
+            path = (paths or {}).get(name)
+            if not path or not backend.exists(path):
+                logger.warning(f"Risk register not found for {mode} mode: {name} ({path})")
+                continue
+            try:
+                registers[name] = RiskRegister.load(backend, name, path, advice_field, logger)
+            except Exception as e:
+                logger.warning(f"Could not load {name} risk register: {e}")
+        return cls(registers, by_risk_level)
+
+    def register_for(self, risk_level) -> Optional[str]:
+        """Name of the register results of works with this RISK_LVL are checked against"""
+        return self.by_risk_level.get(risk_level, self.by_risk_level.get(None))
+
+    def lookup_table(self) -> Dict[Tuple[str, str, str], str]:
+        """All advice keyed on (register, key field, key), for MitigationEngine"""
+        return {(register.name, field, key): advice
+                for register in self.registers.values()
+                for field, index in register.indexes.items()
+                for key, advice in index.items()}
+
+    def __bool__(self) -> bool:
+        return bool(self.registers)
@@ -0,0 +1,257 @@
+# ============================================================================
+# Result Row Builder
+# ============================================================================
+
+"""
+Turns rows of a dataset's aggregated join into results.
+
+All field positions, the Value/extra-field layout and the QBID field lists
+depend only on the dataset configuration and the row's field list, so they are
+resolved once per dataset instead of with list.index lookups on every row.
+
+A dataset's results are held in a ResultBatch: one list per column rather
+than a dict per result, which costs several times less memory (see
+benchmarks/bench_result_store.py) on large JFMP biodiversity runs:
+    - Theme, Value_Type, QBID and DATE_CHECKED are the same for the whole
+      dataset and are stored once
+    - DISTRICT, RISK_LVL and Buffer values are interned
+    - X/Y are packed into arrays of 64-bit integers
+Iterating a batch gives one result dict at a time, so the theme writers take
+batches as they are.
+
+Result layout (CSV column order):
+    UNIQUE_ID, DISTRICT, NAME, DESCRIPTION, RISK_LVL, Theme, Value_Type, Buffer,
+    Value, Value_Description, Value_ID, X, Y, QBID, QBID_Alt, DATE_CHECKED,
+    <extra dataset fields...>, QBID_Test
+
+Theme CSVs use result_columns: the same layout with the extra fields of every
+dataset in the theme, so the schema is known before any results are found.
+"""
+
+from array import array
+from itertools import repeat
+from operator import itemgetter
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from geometry_backend import BAND_FIELD
+
+# Keys of every result before the dataset's extra fields are added
+RESULT_FIELDS = [
+    'UNIQUE_ID', 'DISTRICT', 'NAME', 'DESCRIPTION', 'RISK_LVL', 'Theme', 'Value_Type', 'Buffer',
+    'Value', 'Value_Description', 'Value_ID', 'X', 'Y', 'QBID', 'QBID_Alt', 'DATE_CHECKED'
+]
+
+# QBID used when QBID_MATRIX has no usable entry for the mode and theme
+QBID_FALLBACK_FIELDS = ["UNIQUE_ID", "Value_Type", "Value", "Value_ID"]
+QBID_ALT_FIELDS = ["UNIQUE_ID", "Value_Type", "Value", "Value_ID", "X", "Y"]
+
+# Values left out of QBID strings
+QBID_SKIP = [None, "", 0]
+
+# Result columns with few distinct values, interned in a ResultBatch
+INTERNED_COLUMNS = ['DISTRICT', 'RISK_LVL', 'Buffer']
+
+# Result columns of whole metres, packed into int64 arrays in a ResultBatch
+PACKED_COLUMNS = ['X', 'Y']
+
+# Results appended to a ResultBatch are moved into its columns this many at a time
+BATCH_CHUNK = 4096
+
+
+def _tuple_getter(keys: Sequence) -> Callable:
+    """itemgetter that always returns a tuple, even for a single key"""
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda item: (item[key],)
+    return itemgetter(*keys)
+
+
+def _qbid_formatter(keys: Sequence) -> Callable[[Sequence], str]:
+    """Join the non-empty values of keys (positions in a result record) with '|'"""
+    getter = _tuple_getter(keys)
+    return lambda result: "|".join(str(value) for value in getter(result) if value not in QBID_SKIP)
+
+
+def extra_fields(config) -> List[str]:
+    """Extra dataset fields, in config order, skipping result keys and the single-field value/id/description"""
+    mapped = [name for name in [config.value_field, config.id_field, config.description_field] if isinstance(name, str) and name]
+    fields = []
+    for name in config.fields:
+        if name not in RESULT_FIELDS and name not in mapped and name not in fields:
+            fields.append(name)
+    return fields
+
+
+def result_columns(configs) -> List[str]:
+    """Column schema for a theme: result keys, then every dataset's extra fields in dataset order, then QBID_Test"""
+    columns = list(RESULT_FIELDS)
+    for config in configs:
+        columns.extend(name for name in extra_fields(config) if name not in columns)
+    columns.append('QBID_Test')
+    return columns
+
+
+class ResultBatch:
+    """
+    One dataset's results, held as columns instead of a dict per result
+
+    Results are appended as records (a value for every column, in order) and
+    are only turned back into dicts one at a time when the batch is iterated.
+    """
+
+    def __init__(self, columns: Sequence[str] = (), constants: Optional[Dict] = None):
+        """constants: columns with the same value for every result, stored once"""
+        self.columns = list(columns)
+        self.constants = dict(constants or {})
+        self._stored = [name for name in self.columns if name not in self.constants]
+        self._getter = _tuple_getter([self.columns.index(name) for name in self._stored]) if self._stored else None
+        self._data = {name: array('q') if name in PACKED_COLUMNS else [] for name in self._stored}
+        self._interned = {name: {} for name in INTERNED_COLUMNS if name in self._data}
+        self._pending = []
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, record: Sequence):
+        """Add one result, given as a value for every column"""
+        self._pending.append(self._getter(record))
+        self._length += 1
+        if len(self._pending) >= BATCH_CHUNK:
+            self._flush()
+
+    def _flush(self):
+        """Move pending records into the columns"""
+        if not self._pending:
+            return
+        for name, values in zip(self._stored, zip(*self._pending)):
+            if name in self._interned:
+                interned = self._interned[name]
+                values = [interned.setdefault(value, value) for value in values]
+            self._data[name].extend(values)
+        self._pending = []
+
+    def column(self, name: str, default=None) -> Sequence:
+        """Values of one column for every result (default for every result if the column is missing)"""
+        self._flush()
+        if name in self._data:
+            return self._data[name]
+        return [self.constants.get(name, default)] * self._length
+
+    def set_column(self, name: str, values: Sequence):
+        """Add or replace a column with a value per result"""
+        self._flush()
+        self._add_name(name)
+        self.constants.pop(name, None)
+        self._data[name] = list(values)
+
+    def set_constant(self, name: str, value):
+        """Add or replace a column with the same value for every result"""
+        self._add_name(name)
+        self._data.pop(name, None)
+        self.constants[name] = value
+
+    def _add_name(self, name: str):
+        if name not in self.columns:
+            self.columns.append(name)
+        self._stored = [name for name in self.columns if name not in self.constants]
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Result dicts, one at a time, with keys in column order"""
+        self._flush()
+        columns = [self._data[name] if name in self._data else repeat(self.constants[name], self._length)
+                   for name in self.columns]
+        for values in zip(*columns):
+            yield dict(zip(self.columns, values))
+
+
+class RowBuilder:
+    """Builds results for one dataset, with field positions resolved up front"""
+
+    def __init__(self, valid_fields: List[str], config, theme: str, date_checked: str,
+                 works_fields: Sequence[str], qbid_fields: Optional[List[str]] = None):
+        """
+        valid_fields:   field names of each row (first occurrence wins for repeated names)
+        works_fields:   works field names for UNIQUE_ID, DISTRICT, NAME, DESCRIPTION and RISK_LVL
+        qbid_fields:    QBID_MATRIX fields for the mode/theme, or None
+        """
+        self.theme = theme
+        self.value_type = config.value_type
+        self.date_checked = date_checked
+        self.missing = []   # fields the config needs that are not in the rows
+
+        positions = {}
+        for i, name in enumerate(valid_fields):
+            positions.setdefault(name, i)
+
+        def index(name):
+            if name not in positions:
+                self.missing.append(name)
+                return 0
+            return positions[name]
+
+        self._works = itemgetter(*[index(name) for name in works_fields], index(BAND_FIELD))
+        self._x = index('X')
+        self._y = index('Y')
+
+        # Value: single field, or several joined with ', '
+        self._value = None
+        self._value_list = None
+        if isinstance(config.value_field, str):
+            self._value = index(config.value_field)
+        elif isinstance(config.value_field, list):
+            self._value_list = _tuple_getter([index(name) for name in config.value_field])
+
+        self._value_id = index(config.id_field) if config.id_field else None
+        self._description = index(config.description_field) if config.description_field else None
+
+        self.extra_fields = extra_fields(config)
+        self._extras = [index(name) for name in self.extra_fields]
+
+        # Result keys in order, and those that are the same for the whole dataset
+        self.columns = RESULT_FIELDS + self.extra_fields + ['QBID_Test']
+        self.constants = {'Theme': theme, 'Value_Type': config.value_type, 'QBID': None, 'DATE_CHECKED': date_checked}
+        self._qbid_test_at = self.columns.index('QBID_Test')
+        self._qbid_alt_at = self.columns.index('QBID_Alt')
+
+        # QBID_MATRIX fields can only be used if every one of them is a result key
+        result_keys = set(RESULT_FIELDS) | set(self.extra_fields)
+        if not qbid_fields or any(name not in result_keys for name in qbid_fields):
+            qbid_fields = QBID_FALLBACK_FIELDS
+        self._qbid = _qbid_formatter([self.columns.index(name) for name in qbid_fields])
+        self._qbid_alt = _qbid_formatter([self.columns.index(name) for name in QBID_ALT_FIELDS])
+
+    def record(self, row: tuple) -> list:
+        """Values of every result column for one row, in column order"""
+        if self.missing:
+            raise ValueError(f"'{self.missing[0]}' is not in list")
+
+        unique_id, district, name, description, risk_level, band = self._works(row)
+        if self._value is not None:
+            value = row[self._value]
+        elif self._value_list is not None:
+            value = ", ".join(str(item) for item in self._value_list(row))
+        else:
+            value = None
+
+        record = [
+            unique_id, district, name, description, risk_level, self.theme, self.value_type, band, value,
+            row[self._description] if self._description is not None else None,
+            row[self._value_id] if self._value_id is not None else None,
+            int(row[self._x] or 0), int(row[self._y] or 0),
+            None, None, self.date_checked,
+        ]
+        record.extend(row[i] or 'Field not found' for i in self._extras)
+        record.append(None)
+
+        record[self._qbid_test_at] = self._qbid(record)
+        record[self._qbid_alt_at] = self._qbid_alt(record)
+        return record
+
+    def build(self, row: tuple) -> Dict:
+        """Result dict for one row"""
+        return dict(zip(self.columns, self.record(row)))
+
+    def new_batch(self) -> ResultBatch:
+        """Empty ResultBatch for this dataset's results"""
+        return ResultBatch(self.columns, self.constants)
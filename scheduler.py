@@ -0,0 +1,110 @@
+# ============================================================================
+# Dataset Job Scheduler
+# ============================================================================
+
+"""
+Runs Phase 2 dataset jobs across a pool of worker processes.
+
+Jobs that read the same source path are grouped so each worker still loads a
+source once (see source_cache.py). Groups reading a large statewide source
+(LARGE_SOURCES) are never run concurrently, which bounds peak memory.
+Workers return results keyed by job order so the caller can merge them
+deterministically regardless of completion order.
+"""
+
+import logging
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class DatasetJob:
+    """One dataset to check, for all of its buffers"""
+    order: int                  # position in DATASET_MATRIX order, used for deterministic merge
+    theme: str
+    dataset_name: str
+    path: str                   # resolved values source path
+    buffer_names: List[str]
+    where_clause: Optional[str] = None
+    high_risk_only: bool = False
+
+
+@dataclass
+class SourceGroup:
+    """Jobs reading the same values source"""
+    path: str
+    jobs: List[DatasetJob] = field(default_factory=list)
+    large: bool = False
+    overlays: list = field(default_factory=list)    # job_plan.OverlayJob of the jobs, compiled once by the caller
+
+
+def source_name(path: str) -> str:
+    """Last component of a source path, e.g. VBA_FAUNA25"""
+    return re.split(r"[\\/]", path)[-1]
+
+
+def group_jobs_by_source(jobs: List[DatasetJob], large_sources: List[str]) -> List[SourceGroup]:
+    """Group jobs by source path, in order of first use; flag groups on large sources"""
+    large_sources = {name.upper() for name in large_sources}
+    groups: Dict[str, SourceGroup] = {}
+    for job in jobs:
+        if job.path not in groups:
+            groups[job.path] = SourceGroup(job.path, large=source_name(job.path).upper() in large_sources)
+        groups[job.path].jobs.append(job)
+    return list(groups.values())
+
+
+def run_source_groups(groups: List[SourceGroup], max_workers: int, worker: Callable,
+                      initializer: Optional[Callable] = None, initargs: tuple = (),
+                      max_large: int = 1, logger: Optional[logging.Logger] = None) -> Iterator[Tuple[SourceGroup, Dict]]:
+    """
+    Run worker(group) for every group in a process pool
+
+    Yields (group, worker result) as groups complete, or (group, None) if the
+    worker failed. At most max_workers groups are in flight, and at most
+    max_large of them read a large source.
+    """
+    logger = logger or logging.getLogger(__name__)
+    pending = list(groups)
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer, initargs=initargs) as executor:
+        while pending or running:
+            # Fill free worker slots with the next group allowed to start
+            large_running = sum(group.large for group in running.values())
+            for group in list(pending):
+                if len(running) >= max_workers:
+                    break
+                if group.large and large_running >= max_large:
+                    continue
+                pending.remove(group)
+                running[executor.submit(worker, group)] = group
+                large_running += group.large
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                group = running.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.warning(f"Failed to process {source_name(group.path)} jobs: {e}")
+                    results = None
+                yield group, results
+
+
+def in_job_order(jobs: List[DatasetJob], batches: Iterator[Dict[int, List]]) -> Iterator[Tuple[DatasetJob, List]]:
+    """
+    Yield (job, results) in job order from batches of {job order: results} arriving in any order
+
+    Results that arrive early wait until the jobs before them are done. Every job
+    must turn up in some batch (failed jobs with empty results).
+    """
+    pending = {}    # job order -> results, for finished jobs not yet yielded
+    next_job = 0
+    for batch in batches:
+        pending.update(batch)
+        while next_job < len(jobs) and jobs[next_job].order in pending:
+            yield jobs[next_job], pending.pop(jobs[next_job].order)
+            next_job += 1
@@ -0,0 +1,275 @@
+# ============================================================================
+# Source Layer Cache
+# ============================================================================
+
+"""
+Per-run cache of values source layers.
+
+Several DATASET_MATRIX entries read the same source with different where
+clauses (e.g. vba_fauna25, vba_fauna_owl, vba_fauna_wbse ... all read
+VBA_FAUNA25). The cache loads each distinct path once, spatially prefiltered
+to the works extent grown by the largest buffer any dataset needs from that
+source, then hands out where-clause subsets of the in-memory copy.
+
+Each dataset can also ask for the copy pruned to values near individual works
+(R-tree of value envelopes against works envelopes grown by the dataset's
+largest buffer) before its where clause and overlay run. Works spread across
+a district leave most of their bounding box empty, so this prunes far more
+than the extent read alone. Pruned copies are cached per distance.
+
+In a batch of runs (batch_runner.py) sources used by more than one run can
+instead come from WarmSources, which reads each of them once for the extent of
+every input in the batch and keeps it loaded (and spatially indexed) from one
+run to the next, until no later run needs it. Each run then only prunes the
+warm copy to its own works.
+
+Planned reads can also be prefetched: a background thread loads and prunes
+them in planned order while the overlays before them run, so reading a source
+off a network share overlaps the previous overlay's CPU work. It runs at most
+depth reads ahead of the last released one, which caps how many prefetched
+sources are held in memory. A read the thread has not started yet when it is
+needed is done in the calling thread instead, and a load either thread needs
+while the other is already doing it waits for that load rather than reading
+the source a second time.
+
+Usage:
+    cache = SourceCache(backend, working_data)
+    cache.plan(path, 1000)          # once per dataset that will read the path, in run order
+    cache.prefetch(1)               # optional - load one planned read ahead in the background
+    layer = cache.subset(path, where_clause, distance=500)
+    cache.release(path)             # after each dataset; freed after the last planned use
+    cache.clear()                   # stops the prefetch thread
+"""
+
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Set, Tuple
+
+from scheduler import source_name
+
+
+class _LoadOnce:
+    """Loads each key into a dict at most once across threads - a thread needing a key another is loading waits for it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loading: Dict[object, Future] = {}   # key -> load in progress
+
+    def get(self, loaded: Dict, key, load):
+        """loaded[key], calling load() to fill it unless it is loaded or being loaded already"""
+        with self._lock:
+            if key in loaded:
+                return loaded[key]
+            future = self._loading.get(key)
+            loading = future is None
+            if loading:
+                future = self._loading[key] = Future()
+        if not loading:
+            return future.result()
+
+        try:
+            value = load()
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            loaded[key] = value
+            del self._loading[key]
+        future.set_result(value)
+        return value
+
+
+class SourceCache:
+    """Loads each values source once per run and fans out where-clause subsets"""
+
+    def __init__(self, backend, extent_layer, logger: Optional[logging.Logger] = None, warm: Optional["WarmSources"] = None):
+        self.backend = backend
+        self.extent_layer = extent_layer
+        self.logger = logger or logging.getLogger(__name__)
+        self.warm = warm
+        self.distances: Dict[str, float] = {}   # path -> largest buffer distance needed
+        self.uses: Dict[str, int] = {}          # path -> remaining planned reads
+        self.layers: Dict[str, str] = {}        # path -> loaded in-memory layer
+        self.nearby: Dict[Tuple[str, float], str] = {}  # (path, distance) -> layer pruned to near works
+        self.pruned: Dict[Tuple[str, float], int] = {}  # (path, distance) -> features dropped by the prefilter
+        self.loads = 0
+        self.reads: List[Tuple[str, float]] = []         # planned (path, distance) reads, in run order
+        self.released = 0                               # planned reads released so far
+        self.prefetched: Dict[Tuple[str, float], Future] = {}  # (path, distance) -> background load
+        self._prefetch_thread = None
+        self._stopping = False
+        self._progress = threading.Condition()
+        self._names = threading.Lock()
+        self._loads = _LoadOnce()   # layers and nearby, loaded once whichever thread gets there first
+
+    def plan(self, path: str, distance: float):
+        """Register an upcoming read of path needing values within distance of the works"""
+        self.distances[path] = max(distance, self.distances.get(path, 0))
+        self.uses[path] = self.uses.get(path, 0) + 1
+        self.reads.append((path, distance))
+
+    def prefetch(self, depth: int = 1):
+        """Load and prune the planned reads in a background thread, at most depth reads ahead of the last released one"""
+        for key in self.reads:
+            self.prefetched.setdefault(key, Future())
+        # Calls from the prefetch thread are not tool time of whatever the main thread is timing
+        backend = getattr(self.backend, "untimed", self.backend)
+        self._prefetch_thread = threading.Thread(target=self._prefetch_reads, args=(depth, backend),
+                                                 name="source-prefetch", daemon=True)
+        self._prefetch_thread.start()
+
+    def _prefetch_reads(self, depth: int, backend):
+        # A read planned more than once (same path and distance) is loaded at its first position
+        first_reads = {}
+        for i, key in enumerate(self.reads):
+            first_reads.setdefault(key, i)
+        for key, i in first_reads.items():
+            with self._progress:
+                self._progress.wait_for(lambda: self._stopping or self.released >= i - depth)
+                if self._stopping:
+                    return
+            future = self.prefetched[key]
+            if not future.set_running_or_notify_cancel():
+                continue    # already needed, so loaded by the main thread
+            try:
+                self._prefilter(*key, backend)
+                future.set_result(None)
+            except BaseException as e:
+                future.set_exception(e)
+
+    def _wait_for_prefetch(self, key: Tuple[str, float]):
+        """Wait for a read the prefetch thread has started (re-raising its error); take over one it has not"""
+        future = self.prefetched.get(key)
+        if future is not None and not future.cancel():
+            future.result()
+
+    def _next_name(self) -> str:
+        with self._names:
+            self.loads += 1
+            return f"source_{self.loads}"
+
+    def get(self, path: str):
+        """Return the in-memory copy of a source, loading it on first use"""
+        return self._get(path, self.backend)
+
+    def _get(self, path: str, backend):
+        if self.warm is not None and self.warm.keeps(path):
+            return self.warm.get(path)
+        return self._loads.get(self.layers, path, lambda: self._load(path, backend))
+
+    def _load(self, path: str, backend):
+        distance = self.distances.get(path, 0)
+        layer = backend.load_source(path, self.extent_layer, distance, self._next_name())
+        self.logger.info(
+            f"Loaded {path} for {self.uses.get(path, 1)} dataset(s): "
+            f"{backend.count(layer)} features within {distance:g}m extent of works"
+        )
+        return layer
+
+    def prefilter(self, path: str, distance: float):
+        """Return the cached source pruned to values within distance of individual works"""
+        self._wait_for_prefetch((path, distance))
+        return self._prefilter(path, distance, self.backend)
+
+    def _prefilter(self, path: str, distance: float, backend):
+        return self._loads.get(self.nearby, (path, distance), lambda: self._load_nearby(path, distance, backend))
+
+    def _load_nearby(self, path: str, distance: float, backend):
+        source = self._get(path, backend)
+        nearby = backend.prefilter(source, self.extent_layer, distance, self._next_name())
+        total = backend.count(source)
+        kept = backend.count(nearby)
+        self.pruned[(path, distance)] = total - kept
+        self.logger.info(f"Prefiltered {source_name(path)} to {distance:g}m of works: {total - kept} of {total} features pruned")
+        return nearby
+
+    def subset(self, path: str, where_clause: Optional[str] = None, distance: Optional[float] = None):
+        """Return the cached source, pruned to distance of the works and filtered by where_clause if given"""
+        layer = self.get(path) if distance is None else self.prefilter(path, distance)
+        if where_clause:
+            return self.backend.select(layer, where_clause)
+        return layer
+
+    def release(self, path: str):
+        """Mark one planned read as done; drop the cached copy once nothing else needs it"""
+        self.uses[path] = self.uses.get(path, 1) - 1
+        if self.uses[path] <= 0:
+            if path in self.layers:
+                self.backend.delete(self.layers.pop(path))
+            for key in [key for key in list(self.nearby) if key[0] == path]:   # list() - the prefetch thread may be adding
+                self.backend.delete(self.nearby.pop(key))
+        with self._progress:
+            self.released += 1
+            self._progress.notify_all()
+
+    def clear(self):
+        """Stop prefetching and drop all cached sources"""
+        if self._prefetch_thread is not None:
+            with self._progress:
+                self._stopping = True
+                self._progress.notify_all()
+            self._prefetch_thread.join()
+            self._prefetch_thread = None
+        for layer in list(self.layers.values()) + list(self.nearby.values()):
+            self.backend.delete(layer)
+        self.layers.clear()
+        self.nearby.clear()
+        self.distances.clear()
+        self.uses.clear()
+        self.pruned.clear()
+        self.reads.clear()
+        self.prefetched.clear()
+        self.released = 0
+        self._stopping = False
+
+
+class WarmSources:
+    """Sources kept loaded across the runs of a batch, read once for the extent of every input"""
+
+    def __init__(self, backend, extent_layer, distance: float, logger: Optional[logging.Logger] = None,
+                 shared: Optional[Set[str]] = None):
+        """
+        extent_layer should cover the works of every run; distance is the largest buffer any run uses
+
+        shared lists the source paths worth keeping warm (read by more than one run); None keeps every source.
+        """
+        self.backend = backend
+        self.extent_layer = extent_layer
+        self.distance = distance
+        self.logger = logger or logging.getLogger(__name__)
+        self.shared = shared
+        self.layers: Dict[str, str] = {}        # path -> loaded in-memory layer
+        self.hits = 0
+        self._loads = _LoadOnce()   # a run's prefetch thread and main thread may both ask for a source
+
+    def get(self, path: str):
+        """Return the warm copy of a source, loading it on first use"""
+        if path in self.layers:
+            self.hits += 1
+            return self.layers[path]
+        return self._loads.get(self.layers, path, lambda: self._load(path))
+
+    def _load(self, path: str):
+        layer = self.backend.load_source(path, self.extent_layer, self.distance, f"warm_{len(self.layers) + 1}")
+        self.backend.pin(layer)
+        self.logger.info(f"Loaded {path} for the batch: {self.backend.count(layer)} features within {self.distance:g}m extent of all works")
+        return layer
+
+    def keeps(self, path: str) -> bool:
+        """Whether a source is kept warm (others are read by each run's SourceCache)"""
+        return self.shared is None or path in self.shared
+
+    def release(self, needed: Set[str]):
+        """Drop the warm sources no later run needs"""
+        for path in [path for path in self.layers if path not in needed]:
+            self.backend.delete(self.layers.pop(path))
+            self.logger.info(f"Released {source_name(path)} - no later batch job reads it")
+
+    def clear(self):
+        """Drop all warm sources"""
+        for layer in self.layers.values():
+            self.backend.delete(layer)
+        self.layers.clear()
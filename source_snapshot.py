@@ -0,0 +1,108 @@
+# ============================================================================
+# Source Snapshots
+# ============================================================================
+
+"""
+Local GeoParquet snapshots of values sources.
+
+The CSDL sources live on network shares and every run read them from there,
+every column of them. A snapshot is a local GeoParquet copy of one source
+layer holding only what DATASET_MATRIX needs from it:
+    - the configured fields, value/id/description fields and the fields of
+      the where clauses of every dataset reading the source (any theme, any mode)
+    - geometry, projected to VICGRID2020
+    - SNAPSHOT_ROW, the feature's position in the source, so reads come back
+      in source order
+
+Rows are written in Hilbert order of their geometry with a bbox covering
+column, so a read of the works extent only decodes the row groups near it.
+Features without geometry are left out (a bbox read of the source never
+returns them either).
+
+index.json in the snapshot folder records each snapshot's file, columns and
+the stamp of the source it was taken from (see spatial_index.source_stamp).
+Runs use a snapshot while its field list still matches, without looking at the
+source again - Phase 2 reads stay local. Refresh the snapshots of changed
+sources (the stamp is compared, only stale ones are taken again) with:
+    python gipps_values_checking_tool.py --backend shapely --snapshot
+
+NOTE:   A run after a source changes uses the old snapshot until --snapshot is
+        run. Each snapshot's age is logged the first time a run reads it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from scheduler import source_name
+
+# Column holding each feature's position in the source
+SNAPSHOT_ROW = "SNAPSHOT_ROW"
+
+# Rows per Parquet row group - the unit a bbox read skips or decodes
+SNAPSHOT_ROW_GROUP = 10_000
+
+
+class SnapshotStore:
+    """Folder of GeoParquet snapshots, one per source path, with an index of what each was taken from"""
+
+    def __init__(self, folder: Path, logger: Optional[logging.Logger] = None):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.logger = logger or logging.getLogger(__name__)
+        self.index_path = self.folder / "index.json"
+        self.index = self._load_index()
+        self.logged = set()     # paths whose snapshot age has been logged
+
+    def snapshot_path(self, path: str) -> Path:
+        """Snapshot file of a source path, e.g. VBA_FAUNA25_1f3a9c0d2b7e.parquet"""
+        digest = hashlib.sha1(os.path.normcase(os.path.normpath(str(path))).encode()).hexdigest()[:12]
+        return self.folder / f"{source_name(str(path))}_{digest}.parquet"
+
+    def get(self, path: str, fields: List[str], stamp: Optional[Dict] = None) -> Optional[Dict]:
+        """Index entry of a snapshot with the same fields (and taken from the source as stamped, if given); None if missing or stale"""
+        entry = self.index.get(path)
+        if entry is None or not os.path.exists(entry['path']):
+            return None
+        if entry['fields'] != fields or (stamp is not None and entry['stamp'] != stamp):
+            self.logger.info(f"Snapshot of {source_name(path)} is out of date - reading the source")
+            return None
+        if stamp is None and path not in self.logged:
+            self.logged.add(path)
+            self.logger.info(f"Reading {source_name(path)} from its snapshot taken {(time.time() - entry['taken']) / 86400:.1f} days ago")
+        return entry
+
+    def put(self, path: str, stamp: Dict, fields: List[str], columns: List[str], features: int):
+        """Record a snapshot just written to snapshot_path(path)"""
+        snapshot_path = self.snapshot_path(path)
+        self.index = self._load_index()     # another process may have refreshed other snapshots meanwhile
+        self.index[path] = {
+            'path': str(snapshot_path),
+            'stamp': stamp,
+            'fields': fields,
+            'columns': columns,
+            'features': features,
+            'size': snapshot_path.stat().st_size,
+            'taken': time.time(),
+        }
+        self._save_index()
+        self.logger.info(f"Snapshot of {source_name(path)}: {features} features, {len(columns)} fields, "
+                         f"{self.index[path]['size'] / 1e6:.1f} MB")
+
+    def _load_index(self) -> Dict:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        # Write then swap, so a crashed or concurrent run never leaves a half-written index
+        temp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(temp_path, self.index_path)
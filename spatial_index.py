@@ -0,0 +1,198 @@
+# ============================================================================
+# Spatial Index Sidecars
+# ============================================================================
+
+"""
+Persistent packed R-trees over the features of values sources.
+
+CSDL sources change at most weekly, but every run used to read them cold: the
+works extent was pushed down to the reader as a bbox, and an STRtree was built
+over whatever came back before pruning it to the works. A sidecar holds, for
+one source layer:
+    - the bbox (in VICGRID2020) and feature id of every feature
+    - a packed R-tree over those boxes (STR order, NODE_SIZE entries per node)
+    - a stamp of the source: layer name, output spatial reference, and the
+      size and modification time of every file in its container
+
+With a sidecar the shapely backend reads only the features whose boxes fall
+near individual works (by feature id), and prunes them to each dataset's
+buffer with the sidecar's tree instead of building one per run.
+
+Sidecars are kept in one folder, named from the source path. The stamp is
+checked every time a sidecar is opened, and one that no longer matches its
+source (or is missing) is rebuilt from a full read of the source. Build or
+refresh them all ahead of a season's runs with:
+    python gipps_values_checking_tool.py --backend shapely --build-index
+
+NOTE:   The stamp is a hash of file sizes and modification times, not of file
+        contents - hashing a statewide geodatabase would cost more than reading it.
+        A change to any layer of a geodatabase rebuilds the sidecars of all its layers.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from geometry_backend import OUTPUT_WKID
+from scheduler import source_name
+
+# Entries per R-tree node
+NODE_SIZE = 16
+
+
+class PackedRTree:
+    """Static R-tree of feature boxes, packed bottom-up in STR order"""
+
+    def __init__(self, levels: list, ids, node_size: int = NODE_SIZE):
+        """levels[0] holds the feature boxes in packed order, each level above the boxes of its nodes, up to the root"""
+        self.levels = levels
+        self.ids = ids
+        self.node_size = node_size
+
+    @classmethod
+    def build(cls, boxes, ids, node_size: int = NODE_SIZE) -> "PackedRTree":
+        """Pack (xmin, ymin, xmax, ymax) boxes of features with the given ids; empty geometries (NaN boxes) are left out"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        ids = np.asarray(ids, dtype=np.int64)
+        valid = ~np.isnan(boxes).any(axis=1)
+        boxes, ids = boxes[valid], ids[valid]
+
+        # Sort-tile-recursive: vertical slices by box centre x, then by centre y within each slice
+        if len(boxes):
+            slice_size = node_size * math.ceil(math.sqrt(len(boxes) / node_size))
+            order = np.argsort(boxes[:, 0] + boxes[:, 2], kind="stable")
+            slices = np.arange(len(boxes)) // slice_size
+            order = order[np.lexsort((boxes[order, 1] + boxes[order, 3], slices))]
+            boxes, ids = boxes[order], ids[order]
+
+        levels = [boxes]
+        while len(levels[-1]) > 1:
+            below = levels[-1]
+            starts = np.arange(0, len(below), node_size)
+            levels.append(np.column_stack([
+                np.minimum.reduceat(below[:, 0], starts), np.minimum.reduceat(below[:, 1], starts),
+                np.maximum.reduceat(below[:, 2], starts), np.maximum.reduceat(below[:, 3], starts),
+            ]))
+        return cls(levels, ids, node_size)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def query(self, envelopes) -> Tuple[np.ndarray, np.ndarray]:
+        """(envelope index, feature id) of every feature box intersecting one of the (xmin, ymin, xmax, ymax) envelopes"""
+        envelopes = np.asarray(envelopes, dtype=np.float64).reshape(-1, 4)
+        if not len(self.ids):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        # Walk down from the root one level at a time, every envelope at once
+        query_idx = np.arange(len(envelopes))
+        node_idx = np.zeros(len(envelopes), dtype=np.int64)
+        query_idx, node_idx = self._intersecting(envelopes, self.levels[-1], query_idx, node_idx)
+        children = np.arange(self.node_size)
+        for boxes in reversed(self.levels[:-1]):
+            child_idx = (node_idx[:, None] * self.node_size + children).ravel()
+            query_idx = np.repeat(query_idx, self.node_size)
+            inside = child_idx < len(boxes)
+            query_idx, node_idx = self._intersecting(envelopes, boxes, query_idx[inside], child_idx[inside])
+        return query_idx, self.ids[node_idx]
+
+    def _intersecting(self, envelopes, boxes, query_idx, node_idx):
+        """The (envelope, box) pairs whose boxes intersect (edges touching count)"""
+        query, box = envelopes[query_idx], boxes[node_idx]
+        hit = ((query[:, 0] <= box[:, 2]) & (box[:, 0] <= query[:, 2]) &
+               (query[:, 1] <= box[:, 3]) & (box[:, 1] <= query[:, 3]))
+        return query_idx[hit], node_idx[hit]
+
+    def save(self, path: Path, stamp: Dict):
+        """Write the tree and its source stamp to path (.npz) - written then swapped, so readers never see half a sidecar"""
+        path = Path(path)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp.npz")
+        np.savez(temp_path, boxes=np.concatenate(self.levels), level_sizes=np.array([len(level) for level in self.levels]),
+                 ids=self.ids, node_size=self.node_size, stamp=json.dumps(stamp, sort_keys=True))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Tuple["PackedRTree", Dict]:
+        """(tree, source stamp) saved at path"""
+        with np.load(path, allow_pickle=False) as data:
+            boxes = data['boxes']
+            bounds = np.cumsum(data['level_sizes'])[:-1]
+            tree = cls(np.split(boxes, bounds), data['ids'], int(data['node_size']))
+            return tree, json.loads(str(data['stamp']))
+
+
+def source_stamp(container: str, layer: Optional[str], cache: Optional[Dict] = None) -> Dict:
+    """
+    Stamp of a source layer: the sizes and modification times of its container's files
+
+    cache (container -> (modified, signature)), kept for a run, saves listing and stating every file of a
+    geodatabase again for each of its layers.
+    """
+    cache = {} if cache is None else cache
+    if container not in cache:
+        cache[container] = _files_stamp(Path(container))
+    modified, signature = cache[container]
+    return {
+        'layer': layer,
+        'wkid': OUTPUT_WKID,
+        'modified': modified,
+        'files': signature,
+    }
+
+
+def _files_stamp(container: Path) -> Tuple[int, str]:
+    """(latest modification time, hash of names, sizes and modification times) of a container's files"""
+    if container.is_dir():
+        files = [path for path in container.rglob("*") if path.is_file() and not path.name.lower().endswith(".lock")]
+    else:
+        files = list(container.parent.glob(f"{container.stem}.*"))  # shapefile sidecars (.dbf, .prj ...) included
+    signature = hashlib.sha256()
+    modified = 0
+    for path in sorted(files):
+        stat = path.stat()
+        signature.update(f"{path.name}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+        modified = max(modified, stat.st_mtime_ns)
+    return modified, signature.hexdigest()
+
+
+class SpatialIndexStore:
+    """Folder of packed R-tree sidecars, one per source path, rebuilt when their source changes"""
+
+    def __init__(self, folder: Path, logger: Optional[logging.Logger] = None):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.logger = logger or logging.getLogger(__name__)
+        self.trees: Dict[str, Tuple[PackedRTree, Dict]] = {}   # path -> (tree, stamp) opened by this process
+
+    def sidecar_path(self, path: str) -> Path:
+        """Sidecar file of a source path, e.g. VBA_FAUNA25_1f3a9c0d2b7e.npz"""
+        digest = hashlib.sha1(os.path.normcase(os.path.normpath(str(path))).encode()).hexdigest()[:12]
+        return self.folder / f"{source_name(str(path))}_{digest}.npz"
+
+    def get(self, path: str, stamp: Dict) -> Optional[PackedRTree]:
+        """Tree of a source if its sidecar matches stamp; None if it is missing or stale"""
+        if path in self.trees and self.trees[path][1] == stamp:
+            return self.trees[path][0]
+
+        sidecar = self.sidecar_path(path)
+        try:
+            tree, saved_stamp = PackedRTree.load(sidecar)
+        except (OSError, ValueError, KeyError):
+            return None
+        if saved_stamp != stamp:
+            self.logger.info(f"Spatial index of {source_name(path)} is out of date")
+            return None
+        self.trees[path] = (tree, stamp)
+        return tree
+
+    def put(self, path: str, tree: PackedRTree, stamp: Dict):
+        """Save a tree built for a source, stamped with the source it was built from"""
+        tree.save(self.sidecar_path(path), stamp)
+        self.trees[path] = (tree, stamp)
+        self.logger.info(f"Built spatial index of {source_name(path)}: {len(tree)} features")
@@ -0,0 +1,65 @@
+# ============================================================================
+# Test Fixtures
+# ============================================================================
+
+"""
+Small synthetic fixtures (benchmarks/fixtures.py) shared by the tests, and a
+run_checker fixture running ValuesChecker.process() on them with the shapely
+backend.
+
+Requires geopandas, shapely and pyogrio with the OpenFileGDB driver.
+"""
+
+import csv
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+import gipps_values_checking_tool as tool
+from benchmarks.fixtures import build_fixtures
+
+THEMES = ["forests", "biodiversity", "water", "heritage", "summary"]
+
+
+@pytest.fixture(scope="session")
+def fixtures(tmp_path_factory) -> Dict:
+    """Works and every values source, box polygons"""
+    return build_fixtures(tmp_path_factory.mktemp("fixtures"), works=150, values=4000, spread=15_000)
+
+
+@pytest.fixture(scope="session")
+def dense_fixtures(tmp_path_factory) -> Dict:
+    """As fixtures, with densely digitised polygon sources (for the level-of-detail stage)"""
+    return build_fixtures(tmp_path_factory.mktemp("dense_fixtures"), works=100, values=1500, spread=15_000,
+                          polygon_vertices=96)
+
+
+@pytest.fixture
+def run_checker(monkeypatch):
+    """
+    run_checker(fixtures, workspace, mode="JFMP", input_data=None, **settings) runs process() and returns
+    the rows of each theme CSV and the works detail, keyed by report (e.g. water_values)
+
+    DATA_PATHS points at the fixtures for the test only.
+    """
+    def run(fixtures: Dict, workspace: Path, mode: str = "JFMP", input_data: str = None, **settings) -> Dict:
+        for key, path in fixtures['data_paths'].items():
+            monkeypatch.setitem(tool.DATA_PATHS, key, path)
+        result = tool.ValuesChecker(tool.Settings(
+            input_data=input_data or fixtures['works'], workspace=workspace, mode=mode, themes=THEMES, backend="shapely", **settings
+        )).process()
+        assert result['success'], result.get('error')
+        return read_reports(result['outputs'])
+
+    return run
+
+
+def read_reports(outputs) -> Dict:
+    """Rows of each CSV report among a run's outputs (run profile left out - it holds timings)"""
+    reports = {}
+    for path in map(Path, outputs):
+        if path.suffix == ".csv" and not path.stem.endswith("run_profile"):
+            with open(path, newline="") as f:
+                reports[path.stem.split("_", 2)[-1]] = list(csv.reader(f))   # 20250707_JFMP_water_values -> water_values
+    return reports
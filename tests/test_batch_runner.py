@@ -0,0 +1,38 @@
+"""Batch runs (batch_runner.py) against each job run on its own"""
+
+import geopandas as gpd
+
+import batch_runner
+import gipps_values_checking_tool as tool
+from tests.conftest import THEMES, read_reports
+
+
+def first_works(works_path: str, count: int, out_path) -> str:
+    """Copy of the first count works - a smaller input"""
+    works = gpd.read_file(works_path, engine="pyogrio").head(count)
+    works.to_file(out_path, layer="works", engine="pyogrio")
+    return str(out_path)
+
+
+def test_batch_jobs_match_single_runs(fixtures, run_checker, tmp_path, monkeypatch):
+    small = first_works(fixtures['works'], 40, tmp_path / "small.gpkg")
+    jobs = [{'input_data': small, 'mode': "DAP", 'name': "small_dap"},
+            {'input_data': fixtures['works'], 'mode': "JFMP", 'name': "all_jfmp"},
+            {'input_data': fixtures['works'], 'mode': "DAP", 'name': "all_dap"}]
+    manifest = {'workspace': str(tmp_path / "batch"), 'jobs': jobs,
+                'defaults': {'themes': THEMES, 'backend': "shapely", 'risk_registers': None, 'output_formats': []}}
+    for key, path in fixtures['data_paths'].items():
+        monkeypatch.setitem(tool.DATA_PATHS, key, path)
+    started = []
+    run = batch_runner.BatchWorker.run
+    monkeypatch.setattr(batch_runner.BatchWorker, "run", lambda worker, job, *args: started.append(job['name']) or run(worker, job, *args))
+
+    summaries = batch_runner.run_batch(manifest)
+
+    # Summaries in manifest order, jobs run largest input first
+    assert [summary['name'] for summary in summaries] == ["small_dap", "all_jfmp", "all_dap"]
+    assert all(summary['success'] for summary in summaries)
+    assert started[-1] == "small_dap"
+    for job in jobs:
+        batch = read_reports(sorted((tmp_path / "batch" / job['name']).glob("*.csv")))
+        assert batch == run_checker(fixtures, tmp_path / job['name'], mode=job['mode'], input_data=job['input_data']), job['name']
@@ -0,0 +1,60 @@
+"""BufferCache: runs on cached buffers match runs that build them; a cache folder shared between processes"""
+
+import os
+
+import geopandas as gpd
+import shapely
+
+from buffer_cache import BufferCache
+from geometry_backend import OUTPUT_WKID, get_backend
+
+BUFFER = {'buffer_distance': "100 meters", 'buffer_type': "FULL"}
+
+
+def test_cached_buffers_match_built_buffers(fixtures, run_checker, tmp_path):
+    cache = tmp_path / "buffer_cache"
+    built = run_checker(fixtures, tmp_path / "built")
+    run_checker(fixtures, tmp_path / "filling", buffer_cache=str(cache))
+
+    assert run_checker(fixtures, tmp_path / "cached", buffer_cache=str(cache)) == built
+
+
+def stored_layer(backend, name: str, size: float):
+    backend._store(name, gpd.GeoDataFrame(geometry=[shapely.box(0, 0, size, size)], crs=f"EPSG:{OUTPUT_WKID}"))
+    return name
+
+
+def test_caches_sharing_a_folder_keep_each_others_entries(tmp_path):
+    backend = get_backend("shapely")
+    first, second = BufferCache(backend, tmp_path), BufferCache(backend, tmp_path)
+    first.store(first.key("works a", BUFFER), stored_layer(backend, "a", 10))
+    second.store(second.key("works b", BUFFER), stored_layer(backend, "b", 20))
+
+    # The second cache never saw the first's entry in memory, but the index on disk holds both
+    third = BufferCache(backend, tmp_path)
+    assert set(third.index) == {first.key("works a", BUFFER), second.key("works b", BUFFER)}
+    assert third.fetch(first.key("works a", BUFFER), "restored")
+    assert backend.count("restored") == 1
+
+
+def test_size_limit_counts_entries_of_every_process(tmp_path):
+    backend = get_backend("shapely")
+    first, second = BufferCache(backend, tmp_path), BufferCache(backend, tmp_path)
+    first.store(first.key("works a", BUFFER), stored_layer(backend, "a", 10))
+    entry_mb = first.index[first.key("works a", BUFFER)]['size'] / 1024 / 1024
+    second.max_bytes = int(1.5 * entry_mb * 1024 * 1024)     # room for one entry
+    second.store(second.key("works b", BUFFER), stored_layer(backend, "b", 10))
+
+    assert list(BufferCache(backend, tmp_path).index) == [second.key("works b", BUFFER)]
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".gpkg")]) == 1
+
+
+def test_buffer_evicted_by_another_process_is_a_miss(tmp_path):
+    backend = get_backend("shapely")
+    cache = BufferCache(backend, tmp_path)
+    key = cache.key("works a", BUFFER)
+    cache.store(key, stored_layer(backend, "a", 10))
+    os.remove(cache.index[key]['path'])
+
+    assert not cache.fetch(key, "restored")
+    assert key not in BufferCache(backend, tmp_path).index
@@ -0,0 +1,68 @@
+"""Single-pass distance_join against one Intersect per materialised buffer, as the tool ran before"""
+
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+from benchmarks.fixtures import make_works
+from geometry_backend import BAND_FIELD, BUFFER_CHORD_ERROR, BufferBand, get_backend
+from gipps_values_checking_tool import BUFFERS, ValuesChecker
+
+BAND_NAMES = ["1m", "10m", "100m", "500m", "1000m_ring"]
+
+
+def make_values(geometry_type: str, bounds, count: int, rng):
+    """Points, lines or boxes scattered over bounds"""
+    xmin, ymin, xmax, ymax = bounds
+    x, y = rng.uniform(xmin - 1500, xmax + 1500, count), rng.uniform(ymin - 1500, ymax + 1500, count)
+    if geometry_type == "point":
+        return shapely.points(x, y)
+    if geometry_type == "line":
+        steps = rng.normal(0, 300, (count, 3, 2)).cumsum(axis=1)
+        return shapely.linestrings(steps + np.column_stack([x, y])[:, None, :])
+    size = rng.uniform(20, 800, count)
+    return shapely.box(x, y, x + size, y + size)
+
+
+def borderline(works, values, band: BufferBand) -> bool:
+    """Whether a pair is within the buffer chord error of a band edge, where buffers and exact distances may disagree"""
+    distance = shapely.distance(works, values)
+    for edge in (band.inner, band.outer):
+        margin = edge * BUFFER_CHORD_ERROR + 1e-6
+        if edge and abs(distance - edge) <= margin:
+            return True
+        if edge == band.inner and edge and shapely.get_dimensions(values) > 0:
+            # Whether a line or polygon reaches past a ring's inner edge
+            if shapely.covers(shapely.buffer(works, edge + margin), values) and not shapely.covers(shapely.buffer(works, edge - margin), values):
+                return True
+    return False
+
+
+@pytest.mark.parametrize("geometry_type", ["point", "line", "polygon"])
+def test_distance_join_matches_buffer_overlays(geometry_type):
+    rng = np.random.default_rng(2)
+    backend = get_backend("shapely")
+    works = make_works(40, 1, 4000, "polygon", rng)
+    works["WORK"] = np.arange(len(works))
+    values = gpd.GeoDataFrame({"VALUE": np.arange(1500)}, geometry=make_values(geometry_type, works.total_bounds, 1500, rng), crs=works.crs)
+    backend._store("works", works)
+    backend._store("values", values)
+    bands = {name: BufferBand(name, *ValuesChecker._resolve_buffer_band(name)) for name in BAND_NAMES}
+
+    joined = backend._frame(backend.distance_join("works", "values", list(bands.values()), "joined"))
+    single_pass = set(zip(joined[BAND_FIELD], joined["WORK"], joined["VALUE"]))
+
+    overlays = set()
+    for name in BAND_NAMES:
+        config = BUFFERS[name]
+        in_layer = "works" if config['input_features'] == "input_layer" else config['input_features']
+        buffered = backend.buffer(in_layer, f"buffer_{name}", config['buffer_distance'], config['buffer_type'])
+        overlay = backend._frame(backend.intersect([buffered, "values"], f"overlay_{name}"))
+        overlays.update((name, work, value) for work, value in zip(overlay["WORK"], overlay["VALUE"]))
+
+    work_geometry, value_geometry = works.geometry.values, values.geometry.values
+    differing = {(name, work, value) for name, work, value in single_pass ^ overlays
+                 if not borderline(work_geometry[work], value_geometry[value], bands[name])}
+    assert len(single_pass) > 100
+    assert not differing, sorted(differing)[:5]
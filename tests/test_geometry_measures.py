@@ -0,0 +1,35 @@
+"""Shapely backend AREA_HA/LENGTH_KM against the geodesic measures arcpy reports (getArea/getLength 'GEODESIC')"""
+
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+from pyproj import CRS, Proj, Transformer
+
+from geometry_backend import GEOGRAPHIC_WKID, OUTPUT_WKID, get_backend
+
+# Works-sized shapes across Victoria, in VICGRID2020 metres
+CENTRES = [(2500000, 2400000), (2950000, 2450000), (2700000, 2800000)]
+
+
+def scale_factors(x, y):
+    """VICGRID2020 (conformal) point scale factor at a point - planar measures are this much larger than geodesic ones"""
+    lon, lat = Transformer.from_crs(OUTPUT_WKID, GEOGRAPHIC_WKID, always_xy=True).transform(x, y)
+    return Proj(CRS.from_epsg(OUTPUT_WKID)).get_factors(lon, lat).meridional_scale
+
+
+@pytest.mark.parametrize("x, y", CENTRES)
+def test_area_is_geodesic(x, y):
+    frame = gpd.GeoDataFrame(geometry=[shapely.box(x - 500, y - 300, x + 500, y + 300), None], crs=f"EPSG:{OUTPUT_WKID}")
+    get_backend("shapely").add_geometry_fields(frame)
+
+    assert frame["AREA_HA"][0] == pytest.approx(60 / scale_factors(x, y) ** 2, rel=1e-5)
+    assert frame["AREA_HA"][1] == 0
+
+
+@pytest.mark.parametrize("x, y", CENTRES)
+def test_length_is_geodesic(x, y):
+    frame = gpd.GeoDataFrame(geometry=[shapely.LineString([(x - 1000, y), (x, y + 500), (x + 1000, y)])], crs=f"EPSG:{OUTPUT_WKID}")
+    get_backend("shapely").add_geometry_fields(frame)
+
+    assert frame["LENGTH_KM"][0] == pytest.approx(2 * np.hypot(1, 0.5) / scale_factors(x, y), rel=1e-5)
@@ -0,0 +1,41 @@
+"""Incremental re-check (incremental.py) against a full run on the same works"""
+
+import geopandas as gpd
+import shapely
+import shapely.affinity
+
+
+def edit_works(works_path: str, out_path) -> str:
+    """Copy of the works with one moved, one renamed, one deleted and one added work"""
+    works = gpd.read_file(works_path, engine="pyogrio")
+    works.loc[0, "geometry"] = shapely.affinity.translate(works.geometry[0], 800, 400)
+    works.loc[1, "DAP_NAME"] = "Renamed works"
+    works = works.drop(index=2)
+    added = works.iloc[[3]].copy()
+    added["DAP_REF_NO"] = "BM999999"
+    added["geometry"] = added.geometry.translate(-1500, 250)
+    works = gpd.GeoDataFrame(gpd.pd.concat([works, added], ignore_index=True), crs=works.crs)
+    works.to_file(out_path, layer="works", engine="pyogrio")
+    return str(out_path)
+
+
+def sort_rows(reports: dict) -> dict:
+    """Reports with their data rows sorted - carried-over rows are written ahead of re-checked ones"""
+    return {name: rows[:1] + sorted(rows[1:]) for name, rows in reports.items()}
+
+
+def test_incremental_run_matches_full_run(fixtures, run_checker, tmp_path):
+    previous = tmp_path / "previous"
+    run_checker(fixtures, previous)
+    edited = edit_works(fixtures['works'], tmp_path / "edited.gpkg")
+
+    incremental = run_checker(fixtures, tmp_path / "incremental", input_data=edited, previous_run=str(previous))
+    full = run_checker(fixtures, tmp_path / "full", input_data=edited)
+
+    assert sort_rows(incremental) == sort_rows(full)
+
+
+def test_incremental_run_on_unchanged_works_carries_everything(fixtures, run_checker, tmp_path):
+    previous = run_checker(fixtures, tmp_path / "previous")
+
+    assert sort_rows(run_checker(fixtures, tmp_path / "again", previous_run=str(tmp_path / "previous"))) == sort_rows(previous)
@@ -0,0 +1,30 @@
+"""Shared overlays (job_plan.py) against one overlay per dataset"""
+
+import pytest
+
+import gipps_values_checking_tool as tool
+from job_plan import JobPlan, compile_plan
+
+
+def unshared_plan(jobs, works_fields) -> JobPlan:
+    """One overlay per dataset job, as runs were before overlays were shared"""
+    plan = compile_plan(jobs, works_fields)
+    plan.overlays = [compile_plan([job], works_fields).overlays[0] for job in jobs]
+    return plan
+
+
+@pytest.mark.parametrize("mode", ["JFMP", "DAP"])
+def test_plan_shares_overlays(mode, tmp_path):
+    # Otherwise the comparison below compares a run with itself
+    settings = tool.Settings(input_data="works.shp", workspace=tmp_path, mode=mode,
+                             themes=["forests", "biodiversity", "water", "heritage", "summary"], backend="shapely")
+
+    assert tool.ValuesChecker(settings).plan().joins_saved > 0
+
+
+@pytest.mark.parametrize("mode", ["JFMP", "DAP"])
+def test_shared_overlays_match_one_overlay_per_dataset(mode, fixtures, run_checker, tmp_path, monkeypatch):
+    shared = run_checker(fixtures, tmp_path / "shared", mode=mode)
+    monkeypatch.setattr(tool, "compile_plan", unshared_plan)
+
+    assert run_checker(fixtures, tmp_path / "unshared", mode=mode) == shared
@@ -0,0 +1,7 @@
+"""Level-of-detail stage (GeometryBackend.set_lod_tolerance) against exact geometry only"""
+
+
+def test_lod_matches_exact_overlays(dense_fixtures, run_checker, tmp_path):
+    exact = run_checker(dense_fixtures, tmp_path / "exact")
+
+    assert run_checker(dense_fixtures, tmp_path / "lod", lod_tolerance=0.5) == exact
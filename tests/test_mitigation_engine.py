@@ -0,0 +1,59 @@
+"""MitigationEngine against the per-result if/elif chain it replaced"""
+
+import itertools
+
+import pytest
+
+from mitigation_engine import MitigationEngine
+from mitigations import FOREST_MITIGATIONS, HERITAGE_MITIGATIONS, NATIVE_TITLE_MATRIX
+from row_builder import ResultBatch
+
+
+def chain_mitigation(theme: str, result: dict) -> str:
+    """Mitigation of one result as the if/elif chain in ValuesChecker._apply_mitigations worked it out"""
+    if theme == "forests":
+        return FOREST_MITIGATIONS.get(result.get('Value_Type', ''), "Standard work practices apply")
+    if theme == "heritage":
+        matrix_key = (result.get('RISK_LVL', 'DAP'), 'Yes' if result.get('ACHRIS_ID') else 'No', result.get('CH_SENS', 'No'))
+        return HERITAGE_MITIGATIONS.get(matrix_key, "Heritage assessment required")
+    if theme == "summary":
+        if 'EXTINGUISHED' in result.get('NT_STATUS', ''):
+            return NATIVE_TITLE_MATRIX['NT_EXTINGUISHED']
+        if result.get('RISK_LVL', 'DAP') == 'LRLI':
+            return NATIVE_TITLE_MATRIX['LOW_IMPACT']
+        return NATIVE_TITLE_MATRIX['CONSULT']
+    if theme == "biodiversity":
+        return "Refer to NEP team. Standard biodiversity protection measures apply"
+    if theme == "water":
+        return "Ensure works comply with waterway protection requirements"
+    return "Standard work practices apply"
+
+
+def sample_results() -> list:
+    """Every combination of the values the chain branches on, plus values it has no entry for"""
+    value_types = list(FOREST_MITIGATIONS) + ["EVC", "Flora", "Not a forest value"]
+    combinations = itertools.product(value_types, ["DAP", "LRLI", "NBFT"], ["", "ACH-1234"], ["No", "Yes"],
+                                     ["", "NATIVE TITLE EXTINGUISHED", "DETERMINED"])
+    return [{'Value_Type': value_type, 'RISK_LVL': risk_level, 'ACHRIS_ID': site, 'CH_SENS': sensitivity, 'NT_STATUS': status,
+             'VEG_CODE': "GIPP0016", 'TAXON_ID': "500002"}
+            for value_type, risk_level, site, sensitivity, status in combinations]
+
+
+@pytest.mark.parametrize("theme", ["forests", "biodiversity", "water", "heritage", "summary", "unknown"])
+def test_engine_matches_chain_without_registers(theme):
+    # MITIGATIONS and risk registers are lookups the chain never had, so they are left out
+    results = sample_results()
+    columns = list(results[0])
+    batch = ResultBatch(columns)
+    for result in results:
+        batch.append([result[column] for column in columns])
+
+    mitigated = MitigationEngine("JFMP", mitigations={}).apply(theme, batch)
+
+    assert list(mitigated.column('mitigation')) == [chain_mitigation(theme, result) for result in results]
+
+
+def test_engine_mitigates_empty_batch_with_default():
+    batch = MitigationEngine("DAP").apply("water", ResultBatch(['Value_Type']))
+
+    assert len(batch) == 0
@@ -0,0 +1,66 @@
+"""Theme report writers against the whole-list DataFrame reports they replaced, and columnar copies against the CSVs"""
+
+import datetime
+
+import pandas as pd
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import pytest
+
+from benchmarks.bench_result_store import build_dicts
+from benchmarks.bench_row_builder import DATE_CHECKED, MODE, make_rows
+from dataset_matrix import DATASET_MATRIX
+from geometry_backend import BAND_FIELD
+from gipps_values_checking_tool import (DESCRIPTION_FIELD, DISTRICT_FIELD, ID_FIELD, NAME_FIELD, RISK_LEVEL_FIELD,
+                                        DatasetConfig)
+from mitigation_engine import MitigationEngine
+from output_writers import COLUMNAR_FORMATS, DATE_FORMAT, ThemeReport
+from qbid_matrix import QBID_MATRIX
+from row_builder import RowBuilder, result_columns
+
+THEME = "biodiversity"
+DATASETS = ["vba_fauna25", "evc"]
+
+
+def dataset_results(dataset_name: str, count: int) -> list:
+    """Mitigated result dicts of one biodiversity dataset, as Phase 3 hands them to the writers"""
+    config = DatasetConfig(**DATASET_MATRIX[THEME][dataset_name])
+    valid_fields = [ID_FIELD, NAME_FIELD, DESCRIPTION_FIELD, DISTRICT_FIELD, RISK_LEVEL_FIELD] + config.fields + [BAND_FIELD, 'X', 'Y']
+    works_fields = [ID_FIELD, DISTRICT_FIELD, NAME_FIELD, DESCRIPTION_FIELD, RISK_LEVEL_FIELD]
+    builder = RowBuilder(valid_fields, config, THEME, DATE_CHECKED, works_fields, QBID_MATRIX.get(MODE, {}).get(THEME))
+    return build_dicts(builder, make_rows(valid_fields, count), MitigationEngine(MODE), THEME)
+
+
+def test_streamed_csv_matches_dataframe_csv(tmp_path):
+    batches = [dataset_results(dataset_name, 300) for dataset_name in DATASETS]
+    columns = result_columns([DatasetConfig(**DATASET_MATRIX[THEME][name]) for name in DATASETS]) + ['mitigation']
+
+    report = ThemeReport(tmp_path / "streamed", columns)
+    for batch in batches:
+        report.write(batch)
+    [streamed] = report.close()
+    pd.DataFrame([result for batch in batches for result in batch]).to_csv(tmp_path / "dataframe.csv", index=False)
+
+    with open(streamed, newline="") as f, open(tmp_path / "dataframe.csv", newline="") as g:
+        assert f.read() == g.read()
+
+
+def as_csv_text(value) -> str:
+    """A columnar value as the CSV report writes it"""
+    if value is None:
+        return ""
+    if isinstance(value, datetime.date):
+        return value.strftime(DATE_FORMAT)
+    return str(value)
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather"])
+def test_columnar_copies_match_csv(fixtures, run_checker, tmp_path, file_format):
+    reports = run_checker(fixtures, tmp_path, output_formats=[file_format])
+
+    copies = sorted(tmp_path.glob(f"*{COLUMNAR_FORMATS[file_format]}"))
+    assert len(copies) == len(reports)
+    for path in copies:
+        table = pq.read_table(path) if file_format == "parquet" else feather.read_table(path)
+        rows = [[as_csv_text(value) for value in row.values()] for row in table.to_pylist()]
+        assert [table.column_names] + rows == reports[path.stem.split("_", 2)[-1]], path.name
@@ -0,0 +1,16 @@
+"""Values sources pruned to each dataset's largest buffer around the works (SourceCache.prefilter) against unpruned sources"""
+
+import logging
+import re
+
+from source_cache import SourceCache
+
+
+def test_pruned_run_matches_unpruned_run(fixtures, run_checker, tmp_path, monkeypatch, caplog):
+    with caplog.at_level(logging.INFO):
+        pruned = run_checker(fixtures, tmp_path / "pruned")
+    assert any(int(count) for count in re.findall(r": (\d+) of \d+ features pruned", caplog.text))
+
+    # Every overlay gets the whole source as read for the extent of the works
+    monkeypatch.setattr(SourceCache, "prefilter", lambda cache, path, distance: cache.get(path))
+    assert run_checker(fixtures, tmp_path / "unpruned") == pruned
@@ -0,0 +1,20 @@
+"""RunProfile spans record the memory each one took, not the process peak so far"""
+
+import numpy as np
+
+from profiling import RunProfile
+
+
+def test_span_records_memory_it_took():
+    profile = RunProfile()
+    held = []
+    with profile.span("phase", "allocate"):
+        held.append(np.ones(64 * 1024 * 1024 // 8))     # 64 MB, touched
+    del held[:]
+    with profile.span("phase", "idle"):
+        pass
+
+    allocate, idle = profile.spans
+    assert allocate['rss_delta_mb'] >= 60
+    assert abs(idle['rss_delta_mb']) < 5
+    assert idle['rss_mb'] < allocate['rss_mb']
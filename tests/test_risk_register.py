@@ -0,0 +1,70 @@
+"""Risk register hash indexes against a cursor query of the register per result"""
+
+import itertools
+import logging
+
+import geopandas as gpd
+import pytest
+import shapely
+
+from geometry_backend import OUTPUT_WKID, get_backend
+from mitigation_engine import MitigationEngine
+from mitigations import RISK_REGISTER_KEYS
+from risk_register import MODE_REGISTERS, RiskRegisters, key_text
+from row_builder import ResultBatch
+
+REGISTER_ROWS = {
+    'dap': [("GIPP0016", None, "Avoid EVC 16"), (None, 500002, "Survey for 500002"), (None, 500002, "Second entry loses"),
+            ("GIPP0055", None, ""), (None, 500010.0, "Float key 500010"), ("GIPP0016", 500011, "Both keys")],
+    'lrli': [(None, 500002, "LRLI advice for 500002"), ("GIPP0099", None, "LRLI EVC 99")],
+    'jfmp': [("GIPP0016", 500010, "JFMP advice")],
+}
+
+
+def cursor_lookup(rows, field: str, key):
+    """Advice of the first register row with this key and any advice, as a SearchCursor with a where clause finds it"""
+    column = ['VEG_CODE', 'TAXON_ID'].index(field)
+    for row in rows:
+        if row[2] and key_text(row[column]) is not None and key_text(row[column]) == key_text(key):
+            return row[2]
+    return None
+
+
+def sample_results() -> list:
+    value_types = ["EVC", "Flora", "Fauna", "Not in the register keys"]
+    keys = ["GIPP0016", "GIPP0055", "GIPP0099", 500002, "500002", 500010, 500011.0, None]
+    return [{'Value_Type': value_type, 'Value_Description': key, 'TAXON_ID': key, 'RISK_LVL': risk_level}
+            for value_type, key, risk_level in itertools.product(value_types, keys, ["DAP", "LRLI", "NBFT"])]
+
+
+@pytest.mark.parametrize("mode", ["DAP", "JFMP"])
+def test_indexed_registers_match_cursor_lookups(mode):
+    backend = get_backend("shapely")
+    paths = {}
+    for name, rows in REGISTER_ROWS.items():
+        backend._store(name, gpd.GeoDataFrame({'VEG_CODE': [row[0] for row in rows], 'TAXON_ID': [row[1] for row in rows],
+                                               'MITIGATION': [row[2] for row in rows]},
+                                              geometry=[shapely.Point(0, 0)] * len(rows), crs=f"EPSG:{OUTPUT_WKID}"))
+        paths[name] = name
+    registers = RiskRegisters.load(backend, mode, paths, "MITIGATION", logging.getLogger(__name__))
+    results = sample_results()
+    columns = list(results[0])
+
+    def batch():
+        results_batch = ResultBatch(columns)
+        for result in results:
+            results_batch.append([result[column] for column in columns])
+        return results_batch
+
+    with_registers = MitigationEngine(mode, mitigations={}, risk_registers=registers).apply("biodiversity", batch()).column('mitigation')
+    without = MitigationEngine(mode, mitigations={}).apply("biodiversity", batch()).column('mitigation')
+
+    by_level = MODE_REGISTERS[mode]
+    expected = []
+    for result, fallback in zip(results, without):
+        field, key_column = RISK_REGISTER_KEYS.get(result['Value_Type'], (None, None))
+        register = by_level.get(result['RISK_LVL'], by_level[None])
+        advice = cursor_lookup(REGISTER_ROWS[register], field, result[key_column]) if field else None
+        expected.append(advice or fallback)
+    assert list(with_registers) == expected
+    assert any(advice != fallback for advice, fallback in zip(with_registers, without))
@@ -0,0 +1,29 @@
+"""ResultBatch against the dict per result it replaced"""
+
+import pytest
+
+from benchmarks.bench_result_store import build_batch, build_dicts
+from benchmarks.bench_row_builder import DATASETS, DATE_CHECKED, MODE, make_rows
+from dataset_matrix import DATASET_MATRIX
+from geometry_backend import BAND_FIELD
+from gipps_values_checking_tool import (DESCRIPTION_FIELD, DISTRICT_FIELD, ID_FIELD, NAME_FIELD, RISK_LEVEL_FIELD,
+                                        DatasetConfig)
+from mitigation_engine import MitigationEngine
+from qbid_matrix import QBID_MATRIX
+from row_builder import RowBuilder
+
+
+@pytest.mark.parametrize("theme, dataset_name", DATASETS)
+def test_batch_iterates_to_the_same_results_as_dicts(theme, dataset_name):
+    config = DatasetConfig(**DATASET_MATRIX[theme][dataset_name])
+    valid_fields = [ID_FIELD, NAME_FIELD, DESCRIPTION_FIELD, DISTRICT_FIELD, RISK_LEVEL_FIELD] + config.fields + [BAND_FIELD, 'X', 'Y']
+    works_fields = [ID_FIELD, DISTRICT_FIELD, NAME_FIELD, DESCRIPTION_FIELD, RISK_LEVEL_FIELD]
+    builder = RowBuilder(valid_fields, config, theme, DATE_CHECKED, works_fields, QBID_MATRIX.get(MODE, {}).get(theme))
+    rows = make_rows(valid_fields, 500)
+    engine = MitigationEngine(MODE)
+
+    expected = build_dicts(builder, rows, engine, theme)
+    actual = list(build_batch(builder, rows, engine, theme))
+
+    # Same results, same key order
+    assert [list(result.items()) for result in actual] == [list(result.items()) for result in expected]
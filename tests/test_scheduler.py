@@ -0,0 +1,5 @@
+"""Dataset jobs run across a process pool (scheduler.py) against a sequential run"""
+
+
+def test_parallel_run_matches_sequential(fixtures, run_checker, tmp_path):
+    assert run_checker(fixtures, tmp_path / "parallel", workers=2) == run_checker(fixtures, tmp_path / "sequential")
@@ -0,0 +1,28 @@
+"""Layers handed to worker processes (share/attach) against the layers they were shared from"""
+
+import geopandas as gpd
+import numpy as np
+
+from geometry_backend import get_backend
+
+
+def test_attached_layer_matches_shared_layer(fixtures, tmp_path):
+    backend = get_backend("shapely")
+    works = gpd.read_file(fixtures['works'], engine="pyogrio")
+    works.loc[3, "geometry"] = None     # features without geometry are left out of the bounds
+    backend._store("works", works)
+
+    shared = backend.share("works", tmp_path)
+    worker = get_backend("shapely")
+    attached = worker.attach(shared, "works_shapefile")
+
+    assert worker._frame(attached).equals(works)
+    # The worker's envelopes come from the memory-mapped bounds, not its geometry
+    assert isinstance(worker._bounds[attached], np.memmap)
+    np.testing.assert_array_equal(worker._envelopes(attached, 250), backend._envelopes("works", 250))
+    # Values prefiltered against the attached works keep the same rows as against the works themselves
+    values = backend._read_source(fixtures['data_paths']['csdl'] + r"\FLORAFAUNA1.GDB\NV2005_EVCBCS")
+    worker._store("values", values)
+    backend._store("values", values)
+    assert worker._frame(worker.prefilter("values", attached, 500, "near")).equals(
+        backend._frame(backend.prefilter("values", "works", 500, "near")))
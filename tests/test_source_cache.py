@@ -0,0 +1,57 @@
+"""SourceCache prefetching: each source loaded once, same results as reading in order"""
+
+import threading
+import time
+
+import pytest
+
+from source_cache import SourceCache
+
+
+class SlowBackend:
+    """Records loads; each one takes long enough for the prefetch thread and the caller to overlap"""
+    background_reads = True
+
+    def __init__(self):
+        self.loads = []
+        self.deleted = []
+        self.lock = threading.Lock()
+
+    def load_source(self, path, extent_layer, distance, out_name):
+        with self.lock:
+            self.loads.append(path)
+        time.sleep(0.2)
+        return out_name
+
+    def prefilter(self, values, works, distance, out_name):
+        time.sleep(0.05)
+        return out_name
+
+    def count(self, layer):
+        return 1
+
+    def delete(self, layer):
+        self.deleted.append(layer)
+
+
+@pytest.mark.filterwarnings("error::pytest.PytestUnhandledThreadExceptionWarning")
+def test_prefetch_loads_each_source_once():
+    backend = SlowBackend()
+    cache = SourceCache(backend, "works")
+    reads = [("VBA_FAUNA25", 500), ("VBA_FAUNA25", 1000), ("EVC", 100), ("VBA_FAUNA25", 500)]
+    for path, distance in reads:
+        cache.plan(path, distance)
+
+    cache.prefetch(2)
+    for path, distance in reads:
+        cache.subset(path, distance=distance)
+        cache.release(path)
+    cache.clear()
+
+    assert sorted(backend.loads) == ["EVC", "VBA_FAUNA25"]
+    # Every layer loaded was freed: 2 sources and 3 distinct (path, distance) prunes
+    assert len(set(backend.deleted)) == len(backend.deleted) == 5
+
+
+def test_prefetch_matches_reading_in_order(fixtures, run_checker, tmp_path):
+    assert run_checker(fixtures, tmp_path / "prefetch", prefetch=2) == run_checker(fixtures, tmp_path / "in_order")
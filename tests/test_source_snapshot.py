@@ -0,0 +1,41 @@
+"""Runs reading GeoParquet snapshots (bbox reads) against runs reading the sources, and snapshot refreshes"""
+
+from pathlib import Path
+
+import geopandas as gpd
+
+import gipps_values_checking_tool as tool
+from benchmarks.fixtures import build_fixtures
+from tests.conftest import THEMES
+
+
+def build_snapshots(fixtures, folder, monkeypatch) -> dict:
+    """--snapshot against the fixtures: outcome for each source path"""
+    for key, path in fixtures['data_paths'].items():
+        monkeypatch.setitem(tool.DATA_PATHS, key, path)
+    settings = tool.Settings(input_data=fixtures['works'], workspace=folder, themes=THEMES, backend="shapely", snapshots=str(folder))
+    return tool.ValuesChecker(settings).build_snapshots()
+
+
+def test_snapshot_run_matches_source_run(fixtures, run_checker, tmp_path, monkeypatch):
+    outcomes = build_snapshots(fixtures, tmp_path / "snapshots", monkeypatch)
+    assert "built" in outcomes.values()
+
+    assert run_checker(fixtures, tmp_path / "snapshot", snapshots=str(tmp_path / "snapshots")) == run_checker(fixtures, tmp_path / "source")
+
+
+def test_snapshot_refreshes_only_changed_sources(tmp_path, monkeypatch):
+    fixtures = build_fixtures(tmp_path / "fixtures", works=20, values=200)
+    folder = tmp_path / "snapshots"
+    assert "built" in build_snapshots(fixtures, folder, monkeypatch).values()
+    assert set(build_snapshots(fixtures, folder, monkeypatch).values()) <= {"up to date", "missing"}
+
+    # Edit one source held in its own GeoPackage
+    edited_path, edited_file = next((path, source) for path, source in fixtures['sources'].items() if source.endswith(".gpkg"))
+    frame = gpd.read_file(edited_file, engine="pyogrio")
+    frame.iloc[: len(frame) // 2].to_file(edited_file, layer=Path(edited_file).stem, engine="pyogrio")
+
+    refreshed = build_snapshots(fixtures, folder, monkeypatch)
+    edited = edited_path.format(**tool.DATA_PATHS)
+    assert refreshed[edited] == "built"
+    assert {outcome for path, outcome in refreshed.items() if path != edited} <= {"up to date", "missing"}
@@ -0,0 +1,43 @@
+"""PackedRTree against a brute-force box test, and source stamps kept for a run"""
+
+import numpy as np
+import pytest
+
+from spatial_index import PackedRTree, source_stamp
+
+
+def brute_force(boxes, ids, envelopes) -> set:
+    """(envelope index, feature id) of every box intersecting an envelope, edges touching included"""
+    return {(i, feature_id) for i, (xmin, ymin, xmax, ymax) in enumerate(envelopes)
+            for feature_id, box in zip(ids, boxes)
+            if box[0] <= xmax and box[2] >= xmin and box[1] <= ymax and box[3] >= ymin}
+
+
+@pytest.mark.parametrize("count", [0, 1, 15, 16, 17, 2000])
+def test_query_matches_brute_force(count):
+    rng = np.random.default_rng(count)
+    corners = rng.uniform(0, 10_000, (count, 2))
+    boxes = np.hstack([corners, corners + rng.uniform(0, 300, (count, 2))])
+    boxes[::7] = np.nan     # empty geometries
+    ids = rng.permutation(count * 3)[:count]
+    envelope_corners = rng.uniform(-500, 10_000, (50, 2))
+    envelopes = np.hstack([envelope_corners, envelope_corners + rng.uniform(0, 800, (50, 2))])
+    if count > 1:
+        envelopes[0] = boxes[1]     # exactly one feature's box
+
+    envelope_idx, feature_ids = PackedRTree.build(boxes, ids).query(envelopes)
+
+    assert sorted(zip(envelope_idx.tolist(), feature_ids.tolist())) == sorted(brute_force(boxes, ids, envelopes))
+
+
+def test_stamp_is_kept_for_the_run(tmp_path):
+    gdb = tmp_path / "values.gdb"
+    gdb.mkdir()
+    (gdb / "a00000009.gdbtable").write_bytes(b"features")
+    stamps = {}
+    first = source_stamp(str(gdb), "FIRST", stamps)
+    (gdb / "a00000009.gdbtable").write_bytes(b"edited features")
+
+    # Other layers of the container reuse its stamp for the run; a new run sees the edit
+    assert source_stamp(str(gdb), "SECOND", stamps)['files'] == first['files']
+    assert source_stamp(str(gdb), "FIRST")['files'] != first['files']